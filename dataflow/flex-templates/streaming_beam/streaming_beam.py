@@ -30,6 +30,7 @@ from typing import Any
 
 import apache_beam as beam
 from apache_beam.options.pipeline_options import PipelineOptions
+import apache_beam.transforms.trigger as trigger
 import apache_beam.transforms.window as window
 
 # Defines the BigQuery schema for the output table.
@@ -54,11 +55,108 @@ def parse_json_message(message: str) -> dict[str, Any]:
     }
 
 
+WINDOW_TYPES = ["fixed", "sliding", "sessions"]
+
+
+class ReviewStatsFn(beam.CombineFn):
+    """Combines the messages of a URL into its review statistics.
+
+    The accumulator is a (num_reviews, score_sum, first_date, last_date) tuple,
+    so partial results can be combined before the shuffle instead of
+    grouping all the messages of a URL into a single worker.
+    """
+
+    def create_accumulator(self) -> tuple[int, float, int | None, int | None]:
+        return (0, 0.0, None, None)
+
+    def add_input(
+        self,
+        accumulator: tuple[int, float, int | None, int | None],
+        message: dict[str, Any],
+    ) -> tuple[int, float, int | None, int | None]:
+        num_reviews, score_sum, first_date, last_date = accumulator
+        date = message["processing_time"]
+        return (
+            num_reviews + 1,
+            score_sum + message["score"],
+            date if first_date is None else min(first_date, date),
+            date if last_date is None else max(last_date, date),
+        )
+
+    def merge_accumulators(
+        self, accumulators: list[tuple[int, float, int | None, int | None]]
+    ) -> tuple[int, float, int | None, int | None]:
+        num_reviews, score_sum, first_dates, last_dates = zip(*accumulators)
+        first_dates = [date for date in first_dates if date is not None]
+        last_dates = [date for date in last_dates if date is not None]
+        return (
+            sum(num_reviews),
+            sum(score_sum),
+            min(first_dates, default=None),
+            max(last_dates, default=None),
+        )
+
+    def extract_output(
+        self, accumulator: tuple[int, float, int | None, int | None]
+    ) -> dict[str, Any]:
+        num_reviews, score_sum, first_date, last_date = accumulator
+        return {
+            "num_reviews": num_reviews,
+            "score": score_sum / num_reviews if num_reviews else 0.0,
+            "first_date": first_date,
+            "last_date": last_date,
+        }
+
+
+def make_windows(
+    window_type: str = "fixed",
+    window_interval_sec: int = 60,
+    window_period_sec: int | None = None,
+    early_firing_sec: int | None = None,
+) -> beam.WindowInto:
+    """Make the windowing transform for the messages.
+
+    Args:
+        window_type: One of "fixed", "sliding" or "sessions".
+        window_interval_sec: Window size, or the gap between sessions, in seconds.
+        window_period_sec: How often a sliding window starts, in seconds.
+        early_firing_sec: Emit early results this often before the window closes.
+
+    Returns: A WindowInto transform.
+    """
+    if window_type == "fixed":
+        windowfn = window.FixedWindows(window_interval_sec, 0)
+    elif window_type == "sliding":
+        period = window_period_sec or window_interval_sec
+        windowfn = window.SlidingWindows(window_interval_sec, period)
+    elif window_type == "sessions":
+        windowfn = window.Sessions(window_interval_sec)
+    else:
+        raise ValueError(f"window_type must be one of {WINDOW_TYPES}: {window_type}")
+
+    if not early_firing_sec:
+        return beam.WindowInto(windowfn)
+
+    # Each firing only includes the messages since the previous firing, so the
+    # rows written for a window don't count any message twice. Adding up their
+    # `num_reviews` gives the window's total.
+    return beam.WindowInto(
+        windowfn,
+        trigger=trigger.AfterWatermark(
+            early=trigger.AfterProcessingTime(early_firing_sec)
+        ),
+        accumulation_mode=trigger.AccumulationMode.DISCARDING,
+    )
+
+
 def run(
     input_subscription: str,
     output_table: str,
     window_interval_sec: int = 60,
     beam_args: list[str] = None,
+    window_type: str = "fixed",
+    window_period_sec: int | None = None,
+    early_firing_sec: int | None = None,
 ) -> None:
     """Build and run the pipeline."""
     options = PipelineOptions(beam_args, save_main_session=True, streaming=True)
@@ -72,20 +170,13 @@ def run(
             ).with_output_types(bytes)
             | "UTF-8 bytes to string" >> beam.Map(lambda msg: msg.decode("utf-8"))
             | "Parse JSON messages" >> beam.Map(parse_json_message)
-            | "Fixed-size windows"
-            >> beam.WindowInto(window.FixedWindows(window_interval_sec, 0))
-            | "Add URL keys" >> beam.WithKeys(lambda msg: msg["url"])
-            | "Group by URLs" >> beam.GroupByKey()
-            | "Get statistics"
-            >> beam.MapTuple(
-                lambda url, messages: {
-                    "url": url,
-                    "num_reviews": len(messages),
-                    "score": sum(msg["score"] for msg in messages) / len(messages),
-                    "first_date": min(msg["processing_time"] for msg in messages),
-                    "last_date": max(msg["processing_time"] for msg in messages),
-                }
+            | "Windows"
+            >> make_windows(
+                window_type, window_interval_sec, window_period_sec, early_firing_sec
             )
+            | "Add URL keys" >> beam.WithKeys(lambda msg: msg["url"])
+            | "Get statistics" >> beam.CombinePerKey(ReviewStatsFn())
+            | "Add URLs" >> beam.MapTuple(lambda url, stats: {"url": url, **stats})
         )
 
         # Output the results into BigQuery table.
@@ -112,7 +203,25 @@ if __name__ == "__main__":
         "--window_interval_sec",
         default=60,
         type=int,
-        help="Window interval in seconds for grouping incoming messages.",
+        help="Window interval in seconds for grouping incoming messages. "
+        "For session windows, this is the gap between sessions.",
+    )
+    parser.add_argument(
+        "--window_type",
+        default="fixed",
+        choices=WINDOW_TYPES,
+        help="Type of windows for grouping incoming messages.",
+    )
+    parser.add_argument(
+        "--window_period_sec",
+        type=int,
+        help="How often a sliding window starts in seconds, "
+        "defaults to the window interval.",
+    )
+    parser.add_argument(
+        "--early_firing_sec",
+        type=int,
+        help="Write early results this often in seconds, before each window closes.",
     )
     args, beam_args = parser.parse_known_args()
 
@@ -121,4 +230,7 @@ if __name__ == "__main__":
         output_table=args.output_table,
         window_interval_sec=args.window_interval_sec,
         beam_args=beam_args,
+        window_type=args.window_type,
+        window_period_sec=args.window_period_sec,
+        early_firing_sec=args.early_firing_sec,
     )
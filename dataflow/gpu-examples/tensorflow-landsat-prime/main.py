@@ -51,6 +51,7 @@ The overall workflow of the pipeline is the following:
 from __future__ import annotations
 
 import argparse
+import functools
 import logging
 import os
 import re
@@ -190,6 +191,10 @@ def load_as_rgb(
     The values are reshaped into (width, height, band), the values are clamped
     to integers between 0 and 255, and a gamma correction value is applied.
 
+    Unsigned integer values, like Landsat 8 uint16 bands, can only take a
+    bounded number of values, so they go through a precomputed lookup table.
+    Any other values go through `rescale_pixels` as a single fused operation.
+
     Args:
         scene: Landsat 8 scene ID.
         band_paths: A list of the [Red, Green, Blue] band paths.
@@ -207,7 +212,7 @@ def load_as_rgb(
     def read_band(band_path: str) -> np.ndarray:
         # Use rasterio to read the GeoTIFF values from the band files.
         with tf.io.gfile.GFile(band_path, "rb") as f, rasterio.open(f) as data:
-            return data.read(1).astype(np.float32)
+            return data.read(1)
 
     logging.info(
         f"{scene}: load_as_image({band_paths}, min={min_value}, max={max_value}, gamma={gamma})"
@@ -217,19 +222,62 @@ def load_as_rgb(
     band_values = [read_band(band_path) for band_path in band_paths]
 
     # We get the band values into the shape (width, height, band).
-    pixels = np.stack(band_values, axis=-1)
+    values = np.stack(band_values, axis=-1)
+
+    if values.dtype in (np.uint8, np.uint16):
+        lookup_table = pixels_lookup_table(values.dtype, min_value, max_value, gamma)
+        return scene, np.take(lookup_table, values)
+
+    return scene, rescale_pixels(values, min_value, max_value, gamma).numpy()
+
+
+@tf.function(jit_compile=True)
+def rescale_pixels(
+    values: tf.Tensor, min_value: float, max_value: float, gamma: float
+) -> tf.Tensor:
+    """Rescales, clamps and gamma corrects band values into RGB pixels.
+
+    This is compiled with XLA, so all the operations are fused into a single
+    kernel instead of allocating a full-scene intermediate tensor for each one.
+
+    Args:
+        values: Band values in the shape (width, height, band).
+        min_value: Minimum band value.
+        max_value: Maximum band value.
+        gamma: Gamma correction value.
 
+    Returns: The uint8 pixel values in the same shape as the band values.
+    """
     # Rescale to values from 0.0 to 1.0 and clamp them into that range.
-    pixels -= min_value
-    pixels /= max_value
-    pixels = tf.clip_by_value(pixels, 0.0, 1.0)
+    pixels = tf.cast(values, tf.float32)
+    pixels = tf.clip_by_value((pixels - min_value) / max_value, 0.0, 1.0)
 
     # Apply gamma correction.
     pixels **= 1.0 / gamma
 
     # Return the pixel values as uint8 in the range from 0 to 255,
     # which is what PIL.Image expects.
-    return scene, tf.cast(pixels * 255.0, dtype=tf.uint8).numpy()
+    return tf.cast(pixels * 255.0, dtype=tf.uint8)
+
+
+@functools.lru_cache
+def pixels_lookup_table(
+    dtype: np.dtype, min_value: float, max_value: float, gamma: float
+) -> np.ndarray:
+    """Precomputes the RGB pixel value for every possible band value.
+
+    The table itself is computed with `rescale_pixels`, so it runs on the GPU.
+
+    Args:
+        dtype: Unsigned integer data type of the band values.
+        min_value: Minimum band value.
+        max_value: Maximum band value.
+        gamma: Gamma correction value.
+
+    Returns: A uint8 array indexed by the band value.
+    """
+    values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float32)
+    return rescale_pixels(values, min_value, max_value, gamma).numpy()
 
 
 def run(
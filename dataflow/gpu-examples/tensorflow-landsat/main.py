@@ -45,12 +45,16 @@ The overall workflow of the pipeline is the following:
 - Get the Cloud Storage paths of all the RGB bands.
 - Load the pixel values for each band from Cloud Storage.
 - Preprocess pixels: clamp values and apply gamma correction.
+  With `--tile-size`, the bands are loaded and preprocessed in tiles instead.
 - Create a JPEG image and save it to Cloud Storage.
 """
 
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import functools
 import logging
 import os
 import re
@@ -61,12 +65,14 @@ from apache_beam.options.pipeline_options import PipelineOptions
 import numpy as np
 from PIL import Image
 import rasterio
+from rasterio.windows import Window
 import tensorflow as tf
 
 DEFAULT_RGB_BAND_NAMES = ["B4", "B3", "B2"]
 DEFAULT_MIN_BAND_VALUE = 0.0
 DEFAULT_MAX_BAND_VALUE = 12000.0
 DEFAULT_GAMMA = 0.5
+DEFAULT_TILE_SIZE = 0  # 0 loads the whole scene at once
 
 DEFAULT_SCENES = [
     "LC08_L1TP_001067_20200727_20200807_01_T1",  # Brazil-Bolivia boundary
@@ -163,8 +169,9 @@ def load_values(scene: str, band_paths: list[str]) -> tuple[str, np.ndarray]:
     Returns:
         A (scene, values) pair.
 
-        The values are stored in a three-dimensional float32 array with shape:
+        The values are stored in a three-dimensional array with shape:
             (band, width, height)
+        The values keep the bands data type, which is uint16 for Landsat 8.
     """
 
     def read_band(band_path: str) -> np.array:
@@ -174,7 +181,7 @@ def load_values(scene: str, band_paths: list[str]) -> tuple[str, np.ndarray]:
 
     logging.info(f"{scene}: load_values({band_paths})")
     values = [read_band(band_path) for band_path in band_paths]
-    return scene, np.array(values, np.float32)
+    return scene, np.array(values)
 
 
 def preprocess_pixels(
@@ -183,7 +190,7 @@ def preprocess_pixels(
     min_value: float = 0.0,
     max_value: float = 1.0,
     gamma: float = 1.0,
-) -> tuple[str, tf.Tensor]:
+) -> tuple[str, np.ndarray]:
     """Prepares the band data into a pixel-ready format for an RGB image.
 
     The input band values come in the shape (band, width, height) with
@@ -191,6 +198,10 @@ def preprocess_pixels(
     The values are reshaped into (width, height, band), the values are clamped
     to integers between 0 and 255, and a gamma correction value is applied.
 
+    Unsigned integer values, like Landsat 8 uint16 bands, can only take a
+    bounded number of values, so they go through a precomputed lookup table.
+    Any other values go through `rescale_pixels` as a single fused operation.
+
     Args:
         scene: Landsat 8 scene ID.
         values: Band values in the shape (band, width, height).
@@ -199,26 +210,144 @@ def preprocess_pixels(
         gamma: Gamma correction value.
 
     Returns:
-        A (scene, pixels) pair. The pixels are Image-ready values.
+        A (scene, pixels) pair. The pixels are Image-ready uint8 values.
     """
     logging.info(
         f"{scene}: preprocess_pixels({values.shape}:{values.dtype}, min={min_value}, max={max_value}, gamma={gamma})"
     )
 
+    if values.dtype in (np.uint8, np.uint16):
+        lookup_table = pixels_lookup_table(values.dtype, min_value, max_value, gamma)
+        # Looking up a transposed view reshapes without copying the band values.
+        bands, width, height = values.shape
+        pixels = np.empty((width, height, bands), np.uint8)
+        np.take(lookup_table, values.transpose(1, 2, 0), out=pixels)
+        return scene, pixels
+
+    return scene, rescale_pixels(values, min_value, max_value, gamma).numpy()
+
+
+@tf.function(jit_compile=True)
+def rescale_pixels(
+    values: tf.Tensor, min_value: float, max_value: float, gamma: float
+) -> tf.Tensor:
+    """Rescales, clamps and gamma corrects band values into RGB pixels.
+
+    This is compiled with XLA, so all the operations are fused into a single
+    kernel instead of allocating a full-scene intermediate tensor for each one.
+
+    Args:
+        values: Band values in the shape (band, width, height).
+        min_value: Minimum band value.
+        max_value: Maximum band value.
+        gamma: Gamma correction value.
+
+    Returns: The uint8 pixel values in the shape (width, height, band).
+    """
     # Reshape (band, width, height) into (width, height, band).
-    pixels = tf.transpose(values, (1, 2, 0))
+    pixels = tf.transpose(tf.cast(values, tf.float32), (1, 2, 0))
 
     # Rescale to values from 0.0 to 1.0 and clamp them into that range.
-    pixels -= min_value
-    pixels /= max_value
-    pixels = tf.clip_by_value(pixels, 0.0, 1.0)
+    pixels = tf.clip_by_value((pixels - min_value) / max_value, 0.0, 1.0)
 
     # Apply gamma correction.
     pixels **= 1.0 / gamma
 
-    # Return the pixel values as int8 in the range from 0 to 255,
+    # Return the pixel values as uint8 in the range from 0 to 255,
     # which is what PIL.Image expects.
-    return scene, tf.cast(pixels * 255.0, dtype=tf.uint8)
+    return tf.cast(pixels * 255.0, dtype=tf.uint8)
+
+
+@functools.lru_cache
+def pixels_lookup_table(
+    dtype: np.dtype, min_value: float, max_value: float, gamma: float
+) -> np.ndarray:
+    """Precomputes the RGB pixel value for every possible band value.
+
+    Args:
+        dtype: Unsigned integer data type of the band values.
+        min_value: Minimum band value.
+        max_value: Maximum band value.
+        gamma: Gamma correction value.
+
+    Returns: A uint8 array indexed by the band value.
+    """
+    # Every possible value as a single band with shape (1, 1, values).
+    values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float32)[None, None, :]
+    return rescale_pixels(values, min_value, max_value, gamma).numpy().ravel()
+
+
+def load_pixels_tiled(
+    scene: str,
+    band_paths: list[str],
+    min_value: float = 0.0,
+    max_value: float = 1.0,
+    gamma: float = 1.0,
+    tile_size: int = 1024,
+) -> tuple[str, np.ndarray]:
+    """Loads and preprocesses a scene's bands tile by tile.
+
+    The bands are opened directly from Cloud Storage through GDAL, so each
+    window only fetches the blocks it covers instead of downloading whole band
+    files. The bands are read concurrently one window of `tile_size` pixels at a
+    time, and each tile goes through `preprocess_pixels` as soon as it arrives,
+    while the next tile is being read. Only the uint8 RGB pixels are kept for the
+    whole scene, so besides GDAL's block cache there are at most two tiles of
+    band values in memory.
+
+    Args:
+        scene: Landsat 8 scene ID.
+        band_paths: A list of the [Red, Green, Blue] band paths.
+        min_value: Minimum band value.
+        max_value: Maximum band value.
+        gamma: Gamma correction value.
+        tile_size: Width and height of each tile in pixels.
+
+    Returns:
+        A (scene, pixels) pair.
+
+        The pixel values are stored in a three-dimensional uint8 array with shape:
+            (width, height, rgb_channels)
+    """
+    logging.info(f"{scene}: load_pixels_tiled({band_paths}, tile_size={tile_size})")
+
+    with contextlib.ExitStack() as stack, ThreadPoolExecutor(len(band_paths)) as pool:
+        # Rasterio reads gs:// paths through GDAL's /vsigs/ driver with ranged
+        # requests. Don't list the bucket looking for sidecar files on open.
+        stack.enter_context(rasterio.Env(GDAL_DISABLE_READDIR_ON_OPEN="EMPTY_DIR"))
+        bands = [stack.enter_context(rasterio.open(path)) for path in band_paths]
+        height = bands[0].height
+        width = bands[0].width
+        windows = [
+            Window(col, row, min(tile_size, width - col), min(tile_size, height - row))
+            for row in range(0, height, tile_size)
+            for col in range(0, width, tile_size)
+        ]
+
+        def read_tile(window: Window) -> tuple[np.ndarray, list]:
+            # Each band is read in its own thread straight into the tile.
+            values = np.empty(
+                (len(bands), window.height, window.width), bands[0].dtypes[0]
+            )
+            futures = [
+                pool.submit(band.read, 1, window=window, out=values[i])
+                for i, band in enumerate(bands)
+            ]
+            return values, futures
+
+        pixels = np.empty((height, width, len(bands)), np.uint8)
+        pending = read_tile(windows[0])
+        for i, window in enumerate(windows):
+            values, futures = pending
+            for future in futures:
+                future.result()
+            if i + 1 < len(windows):
+                pending = read_tile(windows[i + 1])
+            _, tile = preprocess_pixels(scene, values, min_value, max_value, gamma)
+            rows, cols = window.toslices()
+            pixels[rows, cols] = tile
+
+    return scene, pixels
 
 
 def save_to_gcs(
@@ -242,6 +371,7 @@ def run(
     output_path_prefix: str,
     vis_params: dict[str, Any],
     beam_args: list[str] | None = None,
+    tile_size: int = DEFAULT_TILE_SIZE,
 ) -> None:
     """Load multiple Landsat scenes and render them as JPEG files.
 
@@ -250,6 +380,7 @@ def run(
         output_path_prefix: Path prefix to save the output files.
         vis_params: Visualization parameters including {rgb_bands, min, max, gamma}.
         beam_args: Optional list of arguments for Beam pipeline options.
+        tile_size: Load and preprocess scenes in tiles of this size, 0 to disable.
     """
     rgb_band_names = vis_params["rgb_band_names"]
     min_value = vis_params["min"]
@@ -258,7 +389,7 @@ def run(
 
     beam_options = PipelineOptions(beam_args, save_main_session=True)
     pipeline = beam.Pipeline(options=beam_options)
-    (
+    band_paths = (
         pipeline
         | "Create scene IDs" >> beam.Create(scenes)
         | "Check GPU availability"
@@ -269,14 +400,25 @@ def run(
             ),
         )
         | "Get RGB band paths" >> beam.Map(get_band_paths, rgb_band_names)
-        | "Load RGB band values" >> beam.MapTuple(load_values)
-        | "Preprocess pixels"
-        >> beam.MapTuple(preprocess_pixels, min_value, max_value, gamma)
+    )
+    if tile_size:
+        pixels = band_paths | "Load and preprocess tiles" >> beam.MapTuple(
+            load_pixels_tiled, min_value, max_value, gamma, tile_size
+        )
+    else:
+        pixels = (
+            band_paths
+            | "Load RGB band values" >> beam.MapTuple(load_values)
+            | "Preprocess pixels"
+            >> beam.MapTuple(preprocess_pixels, min_value, max_value, gamma)
+        )
+    (
+        pixels
         | "Convert to image"
         >> beam.MapTuple(
             lambda scene, rgb_pixels: (
                 scene,
-                Image.fromarray(rgb_pixels.numpy(), mode="RGB"),
+                Image.fromarray(np.asarray(rgb_pixels), mode="RGB"),
             )
         )
         | "Save to Cloud Storage" >> beam.MapTuple(save_to_gcs, output_path_prefix)
@@ -324,6 +466,14 @@ if __name__ == "__main__":
     parser.add_argument(
         "--gamma", type=float, default=DEFAULT_GAMMA, help="Gamma correction factor."
     )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=DEFAULT_TILE_SIZE,
+        help="Load and preprocess each scene in tiles of this many pixels, "
+        "like 1024, to reduce the worker memory. By default the whole scene "
+        "is loaded at once.",
+    )
     args, beam_args = parser.parse_known_args()
 
     scenes = args.scenes or DEFAULT_SCENES
@@ -333,4 +483,4 @@ if __name__ == "__main__":
         "max": args.max,
         "gamma": args.gamma,
     }
-    run(scenes, args.output_path_prefix, vis_params, beam_args)
+    run(scenes, args.output_path_prefix, vis_params, beam_args, args.tile_size)
@@ -16,12 +16,13 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Iterable, Sequence
 import logging
+from typing import Any
 
 import apache_beam as beam
 from apache_beam.ml.inference.base import PredictionResult
 from apache_beam.ml.inference.base import RunInference
-from apache_beam.ml.inference.pytorch_inference import make_tensor_model_fn
 from apache_beam.ml.inference.pytorch_inference import PytorchModelHandlerTensor
 from apache_beam.options.pipeline_options import PipelineOptions
 import torch
@@ -31,6 +32,8 @@ from transformers import AutoTokenizer
 from transformers.tokenization_utils import PreTrainedTokenizer
 
 MAX_RESPONSE_TOKENS = 256
+MAX_BATCH_SIZE = 16
+MAX_WAIT_SECS = 1.0
 
 
 def to_tensors(input_text: str, tokenizer: PreTrainedTokenizer) -> torch.Tensor:
@@ -45,6 +48,61 @@ def to_tensors(input_text: str, tokenizer: PreTrainedTokenizer) -> torch.Tensor:
     return tokenizer(input_text, return_tensors="pt").input_ids[0]
 
 
+def length_bucket(input_tokens: torch.Tensor) -> int:
+    """Gets the bucket for an input, inputs in the same bucket are batched together.
+
+    Buckets grow in powers of two, so inputs in a bucket are never padded
+    to more than twice their length.
+
+    Args:
+        input_tokens: Tokenized input tokens.
+
+    Returns: The bucket number.
+    """
+    return (len(input_tokens) - 1).bit_length()
+
+
+def make_padded_generate_fn(pad_token_id: int) -> Callable:
+    """Makes an inference function to generate responses for batches of inputs.
+
+    Each element RunInference passes is a whole batch of inputs that was already
+    built upstream. The inputs can have different lengths, so they are padded to
+    the longest input in the batch, and the attention mask makes the model ignore
+    the padding.
+
+    Args:
+        pad_token_id: Padding token ID for the language model.
+
+    Returns: An inference function for a PyTorch model handler.
+    """
+
+    def generate(
+        batches: Sequence[Sequence[torch.Tensor]],
+        model: torch.nn.Module,
+        device: torch.device,
+        inference_args: dict[str, Any] | None = None,
+        model_id: str | None = None,
+    ) -> Iterable[PredictionResult]:
+        batch = [input_tokens for inputs in batches for input_tokens in inputs]
+        lengths = torch.tensor([len(input_tokens) for input_tokens in batch])
+        input_ids = torch.nn.utils.rnn.pad_sequence(
+            list(batch), batch_first=True, padding_value=pad_token_id
+        )
+        attention_mask = torch.arange(input_ids.shape[1]) < lengths[:, None]
+        with torch.no_grad():
+            outputs = model.generate(
+                input_ids=input_ids.to(device),
+                attention_mask=attention_mask.long().to(device),
+                **(inference_args or {}),
+            )
+        return [
+            PredictionResult(example=input_tokens, inference=output, model_id=model_id)
+            for input_tokens, output in zip(batch, outputs)
+        ]
+
+    return generate
+
+
 def decode_response(result: PredictionResult, tokenizer: PreTrainedTokenizer) -> str:
     """Decodes output token tensors into text.
 
@@ -61,10 +119,18 @@ def decode_response(result: PredictionResult, tokenizer: PreTrainedTokenizer) ->
 class AskModel(beam.PTransform):
     """Asks an language model a prompt message and gets its responses.
 
+    Prompts are grouped by their length into buckets, and each bucket is batched
+    for up to `max_wait_secs`, so a batch only has similar length prompts and
+    needs little padding. The batches go to the model as they are, RunInference
+    doesn't batch them again. RunInference loads the model once per worker
+    process and shares it across all the DoFn instances in that process.
+
     Attributes:
         model_name: HuggingFace model name compatible with AutoModelForSeq2SeqLM.
         state_dict_path: File path to the model's state_dict, can be in Cloud Storage.
         max_response_tokens: Maximum number of tokens for the model to generate.
+        max_batch_size: Maximum number of prompts to generate at once.
+        max_wait_secs: Maximum time to wait for a batch to fill up, in seconds.
     """
 
     def __init__(
@@ -72,20 +138,34 @@ class AskModel(beam.PTransform):
         model_name: str,
         state_dict_path: str,
         max_response_tokens: int = MAX_RESPONSE_TOKENS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_secs: float = MAX_WAIT_SECS,
     ) -> None:
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model_handler = PytorchModelHandlerTensor(
             state_dict_path=state_dict_path,
             model_class=AutoModelForSeq2SeqLM.from_config,
             model_params={"config": AutoConfig.from_pretrained(model_name)},
-            inference_fn=make_tensor_model_fn("generate"),
+            inference_fn=make_padded_generate_fn(self.tokenizer.pad_token_id),
+            # Each element is already a batch, so don't batch them again.
+            min_batch_size=1,
+            max_batch_size=1,
         )
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.max_response_tokens = max_response_tokens
+        self.max_batch_size = max_batch_size
+        self.max_wait_secs = max_wait_secs
 
     def expand(self, pcollection: beam.PCollection[str]) -> beam.PCollection[str]:
         return (
             pcollection
             | "To tensors" >> beam.Map(to_tensors, self.tokenizer)
+            # Sharded keys let each length bucket be batched by many workers.
+            | "Key by length" >> beam.WithKeys(length_bucket)
+            | "Batch by length"
+            >> beam.GroupIntoBatches.WithShardedKey(
+                self.max_batch_size, max_buffering_duration_secs=self.max_wait_secs
+            )
+            | "Drop keys" >> beam.Values()
             | "RunInference"
             >> RunInference(
                 self.model_handler,
@@ -119,6 +199,18 @@ if __name__ == "__main__":
         required=True,
         help="File path to the model's state_dict, can be in Cloud Storage",
     )
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=MAX_BATCH_SIZE,
+        help="Maximum number of messages to send to the model at once",
+    )
+    parser.add_argument(
+        "--max-wait-secs",
+        type=float,
+        default=MAX_WAIT_SECS,
+        help="Maximum time to wait for a batch of messages, in seconds",
+    )
     args, beam_args = parser.parse_known_args()
 
     logging.getLogger().setLevel(logging.INFO)
@@ -134,7 +226,13 @@ if __name__ == "__main__":
         pipeline
         | "Read from Pub/Sub" >> beam.io.ReadFromPubSub(args.messages_topic)
         | "Decode bytes" >> beam.Map(lambda msg: msg.decode("utf-8"))
-        | f"Ask {simple_name}" >> AskModel(args.model_name, args.state_dict_path)
+        | f"Ask {simple_name}"
+        >> AskModel(
+            args.model_name,
+            args.state_dict_path,
+            max_batch_size=args.max_batch_size,
+            max_wait_secs=args.max_wait_secs,
+        )
         | "Encode bytes" >> beam.Map(lambda msg: msg.encode("utf-8"))
         | "Write to Pub/Sub" >> beam.io.WriteToPubSub(args.responses_topic)
     )
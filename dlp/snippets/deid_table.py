@@ -19,6 +19,9 @@ from __future__ import annotations
 
 import argparse
 import base64
+import json
+
+import table_batching
 
 # [START dlp_deidentify_table_fpe]
 from typing import List  # noqa: F811, E402, I100
@@ -1015,6 +1018,69 @@ def deidentify_table_suppress_row(
 # [END dlp_deidentify_table_row_suppress]
 
 
+def deidentify_large_table_replace_with_info_types(
+    project: str,
+    table_data: Dict[str, Union[List[str], List[List[str]]]],
+    info_types: List[str],
+    deid_content_list: List[str],
+    max_workers: int = table_batching.MAX_WORKERS,
+) -> List[List[str]]:
+    """Uses the Data Loss Prevention API to de-identify sensitive data in a
+    table of any size by replacing them with info type.
+
+    The rows are split into requests just under the API size limit, which are
+    sent concurrently, and the de-identified rows are returned in order.
+
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        table_data: Dictionary representing table data.
+        info_types: A list of strings representing info types to look for.
+            A full list of info type categories can be fetched from the API.
+        deid_content_list: A list of fields in table to de-identify.
+        max_workers: The maximum number of concurrent requests.
+
+    Returns:
+        The de-identified rows, as lists of cell values.
+    """
+
+    # Construct inspect configuration dictionary
+    inspect_config = {"info_types": [{"name": info_type} for info_type in info_types]}
+
+    # Construct deidentify configuration dictionary
+    deidentify_config = {
+        "record_transformations": {
+            "field_transformations": [
+                {
+                    "info_type_transformations": {
+                        "transformations": [
+                            {
+                                "primitive_transformation": {
+                                    "replace_with_info_type_config": {}
+                                }
+                            }
+                        ]
+                    },
+                    "fields": [{"name": field} for field in deid_content_list],
+                }
+            ]
+        }
+    }
+
+    # Call the API for each chunk of rows.
+    rows = table_batching.deidentify_table(
+        project,
+        table_data["header"],
+        table_data["rows"],
+        deidentify_config,
+        inspect_config,
+        max_workers=max_workers,
+    )
+
+    # Print the result
+    print(f"De-identified {len(rows)} rows.")
+    return rows
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
     subparsers = parser.add_subparsers(
@@ -1310,6 +1376,39 @@ if __name__ == "__main__":
         help="A list of fields in table to de-identify.",
     )
 
+    large_table_replace_with_infotype_parser = subparsers.add_parser(
+        "large_table_replace_with_infotype",
+        help="De-identify sensitive data in a table of any size by replacing "
+        "it with the info type of the data.",
+    )
+    large_table_replace_with_infotype_parser.add_argument(
+        "project",
+        help="The Google Cloud project id to use as a parent resource.",
+    )
+    large_table_replace_with_infotype_parser.add_argument(
+        "table_data",
+        help="Json string representing a table.",
+        type=json.loads,
+    )
+    large_table_replace_with_infotype_parser.add_argument(
+        "--info_types",
+        action="append",
+        help="Strings representing info types to look for. A full list of "
+        "info categories and types is available from the API. Examples "
+        'include "FIRST_NAME", "LAST_NAME", "EMAIL_ADDRESS". ',
+    )
+    large_table_replace_with_infotype_parser.add_argument(
+        "deid_content_list",
+        help="A list of fields in table to de-identify.",
+        nargs="+",
+    )
+    large_table_replace_with_infotype_parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=table_batching.MAX_WORKERS,
+        help="The maximum number of concurrent requests.",
+    )
+
     table_row_suppress_parser = subparsers.add_parser(
         "deid_table_row_suppress",
         help="De-identify sensitive data in a table by suppressing "
@@ -1418,6 +1517,14 @@ if __name__ == "__main__":
             args.info_types,
             args.deid_content_list,
         )
+    elif args.content == "large_table_replace_with_infotype":
+        deidentify_large_table_replace_with_info_types(
+            args.project,
+            args.table_data,
+            args.info_types,
+            args.deid_content_list,
+            max_workers=args.max_workers,
+        )
     elif args.content == "deid_table_row_suppress":
         deidentify_table_suppress_row(
             args.project,
@@ -294,6 +294,24 @@ def test_deidentify_table_replace_with_info_types(
     assert "[PERSON_NAME] loved cats." in out
 
 
+def test_deidentify_large_table_replace_with_info_types() -> None:
+    table_data = {
+        "header": ["patient", "factoid"],
+        "rows": [["Mark Twain", f"Mark Twain had {i} cats."] for i in range(1000)],
+    }
+
+    rows = deid_table.deidentify_large_table_replace_with_info_types(
+        GCLOUD_PROJECT,
+        table_data,
+        ["PERSON_NAME"],
+        ["patient", "factoid"],
+    )
+
+    assert len(rows) == 1000
+    assert rows[0] == ["[PERSON_NAME]", "[PERSON_NAME] had 0 cats."]
+    assert rows[-1] == ["[PERSON_NAME]", "[PERSON_NAME] had 999 cats."]
+
+
 def test_deidentify_table_suppress_row(capsys: pytest.CaptureFixture) -> None:
     deid_table.deidentify_table_suppress_row(
         GCLOUD_PROJECT, TABLE_DATA, "age", "GREATER_THAN", 89
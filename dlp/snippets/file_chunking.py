@@ -0,0 +1,193 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers to inspect large text files with the Data Loss Prevention API.
+
+Files are read in overlapping chunks, so only a few chunks are in memory at a
+time, and the chunks are inspected concurrently. Findings in the overlaps are
+de-duplicated, and their locations are remapped to offsets in the whole file.
+"""
+
+from __future__ import annotations
+
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import dataclasses
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import google.cloud.dlp
+
+import prescreen
+import table_batching
+
+# The API accepts requests up to 0.5 MB, this leaves room for the configs.
+CHUNK_SIZE = 256 * 1024
+# Findings longer than the overlap might be split between chunks.
+OVERLAP = 4 * 1024
+MAX_WORKERS = 8
+
+
+@dataclasses.dataclass
+class Chunk:
+    """A chunk of a file, at most `size + overlap` bytes long.
+
+    Attributes:
+        data: The chunk contents, always whole UTF-8 characters.
+        start: Offset of the chunk in the file, in bytes.
+        start_codepoint: Offset of the chunk in the file, in codepoints.
+        size: Number of bytes before the next chunk starts, the rest of the
+            data overlaps with the next chunk. Findings that start in the
+            overlap belong to the next chunk.
+    """
+
+    data: bytes
+    start: int
+    start_codepoint: int
+    size: int
+
+
+def _char_boundary(data: bytes, i: int) -> int:
+    """Moves an index back to the start of a UTF-8 character."""
+    while 0 < i < len(data) and data[i] & 0xC0 == 0x80:
+        i -= 1
+    return i
+
+
+def _complete_end(data: bytes) -> int:
+    """Gets the end of the last complete UTF-8 character in the data."""
+    i = _char_boundary(data, len(data) - 1)
+    lead = data[i]
+    length = 1 if lead < 0xC0 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+    return len(data) if i + length <= len(data) else i
+
+
+def iter_chunks(
+    f: BinaryIO, chunk_size: int = CHUNK_SIZE, overlap: int = OVERLAP
+) -> Iterator[Chunk]:
+    """Reads a UTF-8 text file in overlapping chunks.
+
+    Args:
+        f: The file, opened in binary mode.
+        chunk_size: The number of bytes between the start of each chunk.
+        overlap: The number of bytes each chunk overlaps with the next one.
+
+    Raises:
+        ValueError: If `chunk_size` can't fit the longest UTF-8 character.
+
+    Yields:
+        The file chunks, in order.
+    """
+    if chunk_size < 4:
+        raise ValueError(f"chunk_size must be at least 4 bytes: {chunk_size}")
+
+    start, start_codepoint = (0, 0)
+    buffer = f.read(chunk_size + overlap)
+    while buffer:
+        if len(buffer) < chunk_size + overlap:
+            # This is the end of the file.
+            yield Chunk(buffer, start, start_codepoint, len(buffer))
+            return
+        # Both the overlap and the next chunk start at a character boundary.
+        end = _complete_end(buffer)
+        size = _char_boundary(buffer, min(chunk_size, end))
+        yield Chunk(buffer[:end], start, start_codepoint, size)
+        start += size
+        start_codepoint += len(buffer[:size].decode("utf-8", errors="replace"))
+        buffer = buffer[size:] + f.read(size)
+
+
+def _overlaps(a: google.cloud.dlp_v2.Finding, b: google.cloud.dlp_v2.Finding) -> bool:
+    return (
+        a.info_type.name == b.info_type.name
+        and a.location.byte_range.start < b.location.byte_range.end
+        and b.location.byte_range.start < a.location.byte_range.end
+    )
+
+
+def inspect_chunks(
+    project: str,
+    chunks: Iterator[Chunk],
+    inspect_config: Dict,
+    max_workers: int = MAX_WORKERS,
+    prescreener: Optional[prescreen.Prescreener] = None,
+) -> Iterator[google.cloud.dlp_v2.Finding]:
+    """Inspects file chunks concurrently.
+
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        chunks: The file chunks, like from `iter_chunks`.
+        inspect_config: The inspect configuration for every request.
+        max_workers: The maximum number of concurrent requests.
+        prescreener: Optional prescreener to skip chunks that can't have findings.
+
+    Yields:
+        The findings of all the chunks in file order, with their byte and
+        codepoint ranges relative to the whole file.
+    """
+    dlp = table_batching.get_client()
+    parent = f"projects/{project}"
+
+    text_utf8 = google.cloud.dlp_v2.ByteContentItem.BytesType.TEXT_UTF8
+
+    def inspect(chunk: Chunk) -> List[google.cloud.dlp_v2.Finding]:
+        if prescreener and not prescreener.might_match(
+            chunk.data.decode("utf-8", errors="replace")
+        ):
+            return []
+        response = dlp.inspect_content(
+            request={
+                "parent": parent,
+                "inspect_config": inspect_config,
+                "item": {
+                    "byte_item": {
+                        "type_": text_utf8,
+                        "data": chunk.data,
+                    }
+                },
+            }
+        )
+        findings = []
+        for finding in response.result.findings:
+            if finding.location.byte_range.start >= chunk.size:
+                continue  # the next chunk will find it too
+            finding.location.byte_range.start += chunk.start
+            finding.location.byte_range.end += chunk.start
+            finding.location.codepoint_range.start += chunk.start_codepoint
+            finding.location.codepoint_range.end += chunk.start_codepoint
+            findings.append(finding)
+        return findings
+
+    # Only a few chunks are in flight at a time to bound the memory used.
+    pending: collections.deque[Future] = collections.deque()
+    previous: List[google.cloud.dlp_v2.Finding] = []
+
+    def next_findings() -> Iterator[google.cloud.dlp_v2.Finding]:
+        nonlocal previous
+        findings = [
+            finding
+            for finding in pending.popleft().result()
+            # A match starting in the previous chunk can also be found
+            # here as a partial match at the start of this chunk.
+            if not any(_overlaps(finding, other) for other in previous)
+        ]
+        previous = findings
+        yield from findings
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        for chunk in chunks:
+            pending.append(executor.submit(inspect, chunk))
+            if len(pending) >= 2 * max_workers:
+                yield from next_findings()
+        while pending:
+            yield from next_findings()
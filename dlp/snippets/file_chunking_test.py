@@ -0,0 +1,102 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import re
+from unittest import mock
+
+import google.cloud.dlp_v2
+import pytest
+
+import file_chunking
+import table_batching
+
+
+@pytest.mark.parametrize(
+    "text, chunk_size, overlap",
+    [
+        ("é" * 1000, 101, 10),
+        ("aé€😀" * 300, 101, 10),
+        ("aé€😀" * 300, 4, 0),
+        ("aé€😀" * 300, 64, 3),
+        ("abc" * 10, 100, 10),
+    ],
+)
+def test_iter_chunks(text: str, chunk_size: int, overlap: int) -> None:
+    data = text.encode("utf-8")
+
+    chunks = list(file_chunking.iter_chunks(io.BytesIO(data), chunk_size, overlap))
+
+    next_start = 0
+    for chunk in chunks:
+        assert chunk.start == next_start
+        assert chunk.data == data[chunk.start : chunk.start + len(chunk.data)]
+        assert 0 < chunk.size <= len(chunk.data) <= chunk_size + overlap
+        # Chunks only contain whole characters, so they can be decoded.
+        chunk.data.decode("utf-8")
+        assert chunk.start_codepoint == len(data[: chunk.start].decode("utf-8"))
+        next_start = chunk.start + chunk.size
+    assert next_start == len(data)
+    assert chunks[-1].start + len(chunks[-1].data) == len(data)
+
+
+def test_iter_chunks_small_chunk_size() -> None:
+    with pytest.raises(ValueError):
+        list(file_chunking.iter_chunks(io.BytesIO(b"abc"), chunk_size=3))
+
+
+PARTIAL_SECRETS = "secret|^(?:ecret|cret|ret)|(?:secr|secre)$"
+
+
+def find_secrets(request: dict) -> mock.MagicMock:
+    """Fake inspect_content that finds every "secret" in the request's text."""
+    text = request["item"]["byte_item"]["data"].decode("utf-8")
+    response = mock.MagicMock()
+    response.result.findings = [
+        google.cloud.dlp_v2.Finding(
+            info_type={"name": "SECRET"},
+            location={
+                "byte_range": {
+                    "start": len(text[: match.start()].encode("utf-8")),
+                    "end": len(text[: match.end()].encode("utf-8")),
+                },
+                "codepoint_range": {"start": match.start(), "end": match.end()},
+            },
+        )
+        # Like the API, also find partial matches cut at the chunk edges.
+        for match in re.finditer(PARTIAL_SECRETS, text)
+    ]
+    return response
+
+
+def test_inspect_chunks() -> None:
+    # The first secret crosses the start of the second chunk, and the second
+    # one starts in the overlap of the second chunk, so both are found twice.
+    text = "€" * 31 + "secret" + "€" * 32 + "secret" + "a" * 50 + "secret"
+    data = text.encode("utf-8")
+    chunks = file_chunking.iter_chunks(io.BytesIO(data), chunk_size=96, overlap=16)
+
+    with mock.patch.object(table_batching, "get_client") as get_client:
+        get_client.return_value.inspect_content.side_effect = find_secrets
+        findings = list(
+            file_chunking.inspect_chunks("project", chunks, {}, max_workers=2)
+        )
+
+    expected = [match.start() for match in re.finditer("secret", text)]
+    assert [finding.location.codepoint_range.start for finding in findings] == (
+        expected
+    )
+    assert [finding.location.byte_range.start for finding in findings] == [
+        len(text[:start].encode("utf-8")) for start in expected
+    ]
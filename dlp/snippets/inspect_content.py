@@ -15,7 +15,6 @@
 """Sample app that uses the Data Loss Prevention API to inspect a string, a
 local file or a file on Google Cloud Storage."""
 
-
 import argparse
 import json
 import os
@@ -374,6 +373,101 @@ def inspect_table(
 # [END dlp_inspect_table]
 
 
+from typing import Dict, List, Optional  # noqa: F811, E402, I100
+
+import prescreen  # noqa: I100, E402
+import table_batching  # noqa: I100, E402
+
+
+def inspect_large_table(
+    project: str,
+    data: Dict,
+    info_types: List[str],
+    custom_dictionaries: Optional[List[str]] = None,
+    custom_regexes: Optional[List[str]] = None,
+    min_likelihood: Optional[str] = None,
+    include_quote: bool = True,
+    max_workers: int = table_batching.MAX_WORKERS,
+) -> None:
+    """Uses the Data Loss Prevention API to analyze a table of any size for
+    protected data.
+
+    The rows are split into requests just under the API size limit, which are
+    sent concurrently, and the row index of each finding refers to the
+    original table.
+
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        data: Dictionary representing table data, like `inspect_table`.
+        info_types: A list of strings representing info types to look for.
+            A full list of info type categories can be fetched from the API.
+        custom_dictionaries: A list of strings, each a comma-delimited list of
+            words to look for as a custom info type.
+        custom_regexes: A list of regex patterns to look for as custom info types.
+        min_likelihood: A string representing the minimum likelihood threshold
+            that constitutes a match. One of: 'LIKELIHOOD_UNSPECIFIED',
+            'VERY_UNLIKELY', 'UNLIKELY', 'POSSIBLE', 'LIKELY', 'VERY_LIKELY'.
+        include_quote: Boolean for whether to display a quote of the detected
+            information in the results.
+        max_workers: The maximum number of concurrent requests.
+    Returns:
+        None; the response from the API is printed to the terminal.
+    """
+
+    # Prepare custom_info_types by parsing the dictionary word lists and
+    # regex patterns.
+    custom_info_types = [
+        {
+            "info_type": {"name": f"CUSTOM_DICTIONARY_{i}"},
+            "dictionary": {"word_list": {"words": custom_dict.split(",")}},
+        }
+        for i, custom_dict in enumerate(custom_dictionaries or [])
+    ] + [
+        {
+            "info_type": {"name": f"CUSTOM_REGEX_{i}"},
+            "regex": {"pattern": custom_regex},
+        }
+        for i, custom_regex in enumerate(custom_regexes or [])
+    ]
+
+    # Construct the configuration dictionary shared by all the requests.
+    inspect_config = {
+        "info_types": [{"name": info_type} for info_type in info_types],
+        "custom_info_types": custom_info_types,
+        "min_likelihood": min_likelihood,
+        "include_quote": include_quote,
+    }
+
+    # Content that can't match any custom info type is not sent to the API,
+    # this only applies when there are no built-in info types.
+    prescreener = prescreen.Prescreener.from_inspect_config(inspect_config)
+
+    # Call the API for each chunk of rows.
+    findings = table_batching.inspect_table(
+        project,
+        data["header"],
+        data["rows"],
+        inspect_config,
+        max_workers=max_workers,
+        prescreener=prescreener,
+    )
+
+    # Print out the results.
+    if findings:
+        for finding in findings:
+            [content_location] = finding.location.content_locations
+            row_index = content_location.record_location.table_location.row_index
+            print(f"Row: {row_index}")
+            if include_quote:
+                print(f"Quote: {finding.quote}")
+            print(f"Info type: {finding.info_type.name}")
+            print(f"Likelihood: {finding.likelihood}")
+    else:
+        print("No findings.")
+    if prescreener.enabled:
+        print(f"Skipped {prescreener.skipped} of {prescreener.checked} rows.")
+
+
 # [START dlp_inspect_column_values_w_custom_hotwords]
 from typing import List  # noqa: E402, I100
 
@@ -591,13 +685,104 @@ def inspect_file(
 # [END dlp_inspect_file]
 
 
+import file_chunking  # noqa: I100, E402
+
+
+def inspect_large_file(
+    project: str,
+    filename: str,
+    info_types: List[str],
+    custom_dictionaries: Optional[List[str]] = None,
+    custom_regexes: Optional[List[str]] = None,
+    min_likelihood: Optional[str] = None,
+    include_quote: bool = True,
+    chunk_size: int = file_chunking.CHUNK_SIZE,
+    overlap: int = file_chunking.OVERLAP,
+    max_workers: int = file_chunking.MAX_WORKERS,
+) -> None:
+    """Uses the Data Loss Prevention API to analyze a text file of any size
+    for protected data.
+
+    The file is read in overlapping chunks which are inspected concurrently,
+    so only a few chunks are in memory at a time.
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        filename: The path to the UTF-8 text file to inspect.
+        info_types: A list of strings representing info types to look for.
+            A full list of info type categories can be fetched from the API.
+        custom_dictionaries: A list of strings, each a comma-delimited list of
+            words to look for as a custom info type.
+        custom_regexes: A list of regex patterns to look for as custom info types.
+        min_likelihood: A string representing the minimum likelihood threshold
+            that constitutes a match. One of: 'LIKELIHOOD_UNSPECIFIED',
+            'VERY_UNLIKELY', 'UNLIKELY', 'POSSIBLE', 'LIKELY', 'VERY_LIKELY'.
+        include_quote: Boolean for whether to display a quote of the detected
+            information in the results.
+        chunk_size: The number of bytes between the start of each chunk.
+        overlap: The number of bytes each chunk overlaps with the next one,
+            findings longer than this might be reported in parts.
+        max_workers: The maximum number of concurrent requests.
+    Returns:
+        None; the response from the API is printed to the terminal.
+    """
+
+    # Prepare custom_info_types by parsing the dictionary word lists and
+    # regex patterns.
+    custom_info_types = [
+        {
+            "info_type": {"name": f"CUSTOM_DICTIONARY_{i}"},
+            "dictionary": {"word_list": {"words": custom_dict.split(",")}},
+        }
+        for i, custom_dict in enumerate(custom_dictionaries or [])
+    ] + [
+        {
+            "info_type": {"name": f"CUSTOM_REGEX_{i}"},
+            "regex": {"pattern": custom_regex},
+        }
+        for i, custom_regex in enumerate(custom_regexes or [])
+    ]
+
+    # Construct the configuration dictionary shared by all the requests.
+    inspect_config = {
+        "info_types": [{"name": info_type} for info_type in info_types],
+        "custom_info_types": custom_info_types,
+        "min_likelihood": min_likelihood,
+        "include_quote": include_quote,
+    }
+
+    # Content that can't match any custom info type is not sent to the API,
+    # this only applies when there are no built-in info types.
+    prescreener = prescreen.Prescreener.from_inspect_config(inspect_config)
+
+    # Call the API for each chunk of the file, as it's being read.
+    num_findings = 0
+    with open(filename, mode="rb") as f:
+        chunks = file_chunking.iter_chunks(f, chunk_size, overlap)
+        for finding in file_chunking.inspect_chunks(
+            project, chunks, inspect_config, max_workers, prescreener
+        ):
+            byte_range = finding.location.byte_range
+            print(f"Bytes: {byte_range.start}-{byte_range.end}")
+            if include_quote:
+                print(f"Quote: {finding.quote}")
+            print(f"Info type: {finding.info_type.name}")
+            print(f"Likelihood: {finding.likelihood}")
+            num_findings += 1
+
+    if not num_findings:
+        print("No findings.")
+    if prescreener.enabled:
+        print(f"Skipped {prescreener.skipped} of {prescreener.checked} chunks.")
+
+
 # [START dlp_inspect_gcs]
-import threading  # noqa: F811, E402, I100
 from typing import Optional  # noqa: I100, E402
 
 import google.cloud.dlp  # noqa: F811, E402
 import google.cloud.pubsub  # noqa: F811, E402
 
+import job_waiter  # noqa: I100, E402
+
 
 def inspect_gcs_file(
     project: str,
@@ -697,64 +882,40 @@ def inspect_gcs_file(
     )
     print(f"Inspection operation started: {operation.name}")
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-
-    # Set up a callback to acknowledge a message. This closes around an event
-    # so that it can signal that it is done and the main thread can continue.
-    job_done = threading.Event()
-
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        try:
-            if message.attributes["DlpJobName"] == operation.name:
-                # This is the message we're looking for, so acknowledge it.
-                message.ack()
-
-                # Now that the job is done, fetch the results and print them.
-                job = dlp.get_dlp_job(request={"name": operation.name})
-                print(f"Job name: {job.name}")
-                if job.inspect_details.result.info_type_stats:
-                    for finding in job.inspect_details.result.info_type_stats:
-                        print(
-                            "Info type: {}; Count: {}".format(
-                                finding.info_type.name, finding.count
-                            )
-                        )
-                else:
-                    print("No findings.")
-
-                # Signal to the main thread that we can exit.
-                job_done.set()
-            else:
-                # This is not the message we're looking for.
-                message.drop()
-        except Exception as e:
-            # Because this is executing in a thread, an exception won't be
-            # noted unless we print it manually.
-            print(e)
-            raise
-
-    subscriber.subscribe(subscription_path, callback=callback)
-    finished = job_done.wait(timeout=timeout)
-    if not finished:
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    if job.inspect_details.result.info_type_stats:
+        for finding in job.inspect_details.result.info_type_stats:
+            print(
+                "Info type: {}; Count: {}".format(finding.info_type.name, finding.count)
+            )
+    else:
+        print("No findings.")
 
 
 # [END dlp_inspect_gcs]
 
 
 # [START dlp_inspect_datastore]
-import threading  # noqa: F811, E402, I100
 from typing import List, Optional  # noqa: E402, I100
 
 import google.cloud.dlp  # noqa: F811, E402
 import google.cloud.pubsub  # noqa: F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def inspect_datastore(
     project: str,
@@ -862,66 +1023,40 @@ def inspect_datastore(
     )
     print(f"Inspection operation started: {operation.name}")
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-
-    # Set up a callback to acknowledge a message. This closes around an event
-    # so that it can signal that it is done and the main thread can continue.
-    job_done = threading.Event()
-
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        try:
-            if message.attributes["DlpJobName"] == operation.name:
-                # This is the message we're looking for, so acknowledge it.
-                message.ack()
-
-                # Now that the job is done, fetch the results and print them.
-                job = dlp.get_dlp_job(request={"name": operation.name})
-                print(f"Job name: {job.name}")
-                if job.inspect_details.result.info_type_stats:
-                    for finding in job.inspect_details.result.info_type_stats:
-                        print(
-                            "Info type: {}; Count: {}".format(
-                                finding.info_type.name, finding.count
-                            )
-                        )
-                else:
-                    print("No findings.")
-
-                # Signal to the main thread that we can exit.
-                job_done.set()
-            else:
-                # This is not the message we're looking for.
-                message.drop()
-        except Exception as e:
-            # Because this is executing in a thread, an exception won't be
-            # noted unless we print it manually.
-            print(e)
-            raise
-
-    # Register the callback and wait on the event.
-    subscriber.subscribe(subscription_path, callback=callback)
-
-    finished = job_done.wait(timeout=timeout)
-    if not finished:
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    if job.inspect_details.result.info_type_stats:
+        for finding in job.inspect_details.result.info_type_stats:
+            print(
+                "Info type: {}; Count: {}".format(finding.info_type.name, finding.count)
+            )
+    else:
+        print("No findings.")
 
 
 # [END dlp_inspect_datastore]
 
 
 # [START dlp_inspect_bigquery]
-import threading  # noqa: F811, E402, I100
 from typing import List, Optional  # noqa: E402
 
 import google.cloud.dlp  # noqa: F811, E402
 import google.cloud.pubsub  # noqa: F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def inspect_bigquery(
     project: str,
@@ -1030,53 +1165,27 @@ def inspect_bigquery(
     )
     print(f"Inspection operation started: {operation.name}")
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-
-    # Set up a callback to acknowledge a message. This closes around an event
-    # so that it can signal that it is done and the main thread can continue.
-    job_done = threading.Event()
-
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        try:
-            if message.attributes["DlpJobName"] == operation.name:
-                # This is the message we're looking for, so acknowledge it.
-                message.ack()
-
-                # Now that the job is done, fetch the results and print them.
-                job = dlp.get_dlp_job(request={"name": operation.name})
-                print(f"Job name: {job.name}")
-                if job.inspect_details.result.info_type_stats:
-                    for finding in job.inspect_details.result.info_type_stats:
-                        print(
-                            "Info type: {}; Count: {}".format(
-                                finding.info_type.name, finding.count
-                            )
-                        )
-                else:
-                    print("No findings.")
-
-                # Signal to the main thread that we can exit.
-                job_done.set()
-            else:
-                # This is not the message we're looking for.
-                message.drop()
-        except Exception as e:
-            # Because this is executing in a thread, an exception won't be
-            # noted unless we print it manually.
-            print(e)
-            raise
-
-    # Register the callback and wait on the event.
-    subscriber.subscribe(subscription_path, callback=callback)
-    finished = job_done.wait(timeout=timeout)
-    if not finished:
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    if job.inspect_details.result.info_type_stats:
+        for finding in job.inspect_details.result.info_type_stats:
+            print(
+                "Info type: {}; Count: {}".format(finding.info_type.name, finding.count)
+            )
+    else:
+        print("No findings.")
 
 
 # [END dlp_inspect_bigquery]
@@ -1260,11 +1369,11 @@ def inspect_image_file_listed_infotypes(
 
 
 # [START dlp_inspect_bigquery_with_sampling]
-import threading  # noqa: F811, E402, I100
-
 import google.cloud.dlp  # noqa: F811, E402
 import google.cloud.pubsub  # noqa: F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def inspect_bigquery_table_with_sampling(
     project: str,
@@ -1340,66 +1449,39 @@ def inspect_bigquery_table_with_sampling(
     )
     print(f"Inspection operation started: {operation.name}")
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-
-    # Set up a callback to acknowledge a message. This closes around an event
-    # so that it can signal that it is done and the main thread can continue.
-    job_done = threading.Event()
-
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        try:
-            if message.attributes["DlpJobName"] == operation.name:
-                # This is the message we're looking for, so acknowledge it.
-                message.ack()
-
-                # Now that the job is done, fetch the results and print them.
-                job = dlp.get_dlp_job(request={"name": operation.name})
-                print(f"Job name: {job.name}")
-
-                if job.inspect_details.result.info_type_stats:
-                    for finding in job.inspect_details.result.info_type_stats:
-                        print(
-                            "Info type: {}; Count: {}".format(
-                                finding.info_type.name, finding.count
-                            )
-                        )
-                else:
-                    print("No findings.")
-
-                # Signal to the main thread that we can exit.
-                job_done.set()
-            else:
-                # This is not the message we're looking for.
-                message.drop()
-
-        except Exception as e:
-            # Because this is executing in a thread, an exception won't be
-            # noted unless we print it manually.
-            print(e)
-            raise
-
-    # Register the callback and wait on the event.
-    subscriber.subscribe(subscription_path, callback=callback)
-    finished = job_done.wait(timeout=timeout)
-    if not finished:
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+
+    if job.inspect_details.result.info_type_stats:
+        for finding in job.inspect_details.result.info_type_stats:
+            print(
+                "Info type: {}; Count: {}".format(finding.info_type.name, finding.count)
+            )
+    else:
+        print("No findings.")
 
 
 # [END dlp_inspect_bigquery_with_sampling]
 
 
 # [START dlp_inspect_gcs_with_sampling]
-import threading  # noqa: F811, E402, I100
-
 import google.cloud.dlp  # noqa: F811, E402
 import google.cloud.pubsub  # noqa: F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def inspect_gcs_with_sampling(
     project: str,
@@ -1487,54 +1569,28 @@ def inspect_gcs_with_sampling(
     )
     print("Inspection operation started: {}".format(operation.name))
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-
-    # Set up a callback to acknowledge a message. This closes around an event
-    # so that it can signal that it is done and the main thread can continue.
-    job_done = threading.Event()
-
-    def callback(message):
-        try:
-            if message.attributes["DlpJobName"] == operation.name:
-                # This is the message we're looking for, so acknowledge it.
-                message.ack()
-
-                # Now that the job is done, fetch the results and print them.
-                job = dlp.get_dlp_job(request={"name": operation.name})
-                print(f"Job name: {job.name}")
-                if job.inspect_details.result.info_type_stats:
-                    print("Findings:")
-                    for finding in job.inspect_details.result.info_type_stats:
-                        print(
-                            "Info type: {}; Count: {}".format(
-                                finding.info_type.name, finding.count
-                            )
-                        )
-                else:
-                    print("No findings.")
-
-                # Signal to the main thread that we can exit.
-                job_done.set()
-            else:
-                # This is not the message we're looking for.
-                message.drop()
-        except Exception as e:
-            # Because this is executing in a thread, an exception won't be
-            # noted unless we print it manually.
-            print(e)
-            raise
-
-    # Register the callback and wait on the event.
-    subscriber.subscribe(subscription_path, callback=callback)
-    finished = job_done.wait(timeout=timeout)
-    if not finished:
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    if job.inspect_details.result.info_type_stats:
+        print("Findings:")
+        for finding in job.inspect_details.result.info_type_stats:
+            print(
+                "Info type: {}; Count: {}".format(finding.info_type.name, finding.count)
+            )
+    else:
+        print("No findings.")
 
 
 # [END dlp_inspect_gcs_with_sampling]
@@ -2092,6 +2148,68 @@ if __name__ == "__main__":
         default=True,
     )
 
+    parser_large_table = subparsers.add_parser(
+        "large_table", help="Inspect a table of any size."
+    )
+    parser_large_table.add_argument(
+        "data", help="Json string representing a table.", type=json.loads
+    )
+    parser_large_table.add_argument(
+        "--project",
+        help="The Google Cloud project id to use as a parent resource.",
+        default=default_project,
+    )
+    parser_large_table.add_argument(
+        "--info_types",
+        action="append",
+        help="Strings representing info types to look for. A full list of "
+        "info categories and types is available from the API. Examples "
+        'include "FIRST_NAME", "LAST_NAME", "EMAIL_ADDRESS". '
+        "If unspecified, the three above examples will be used.",
+        default=["FIRST_NAME", "LAST_NAME", "EMAIL_ADDRESS"],
+    )
+    parser_large_table.add_argument(
+        "--custom_dictionaries",
+        action="append",
+        help="Strings representing comma-delimited lists of dictionary words"
+        " to search for as custom info types. Each string is a comma "
+        "delimited list of words representing a distinct dictionary.",
+        default=None,
+    )
+    parser_large_table.add_argument(
+        "--custom_regexes",
+        action="append",
+        help="Strings representing regex patterns to search for as custom "
+        "info types.",
+        default=None,
+    )
+    parser_large_table.add_argument(
+        "--min_likelihood",
+        choices=[
+            "LIKELIHOOD_UNSPECIFIED",
+            "VERY_UNLIKELY",
+            "UNLIKELY",
+            "POSSIBLE",
+            "LIKELY",
+            "VERY_LIKELY",
+        ],
+        help="A string representing the minimum likelihood threshold that "
+        "constitutes a match.",
+    )
+    parser_large_table.add_argument(
+        "--include_quote",
+        type=bool,
+        help="A boolean for whether to display a quote of the detected "
+        "information in the results.",
+        default=True,
+    )
+    parser_large_table.add_argument(
+        "--max_workers",
+        type=int,
+        default=table_batching.MAX_WORKERS,
+        help="The maximum number of concurrent requests.",
+    )
+
     parser_table_hotword = subparsers.add_parser(
         "table_w_custom_hotword",
         help="Inspect a table and exclude column values when matched "
@@ -2190,6 +2308,78 @@ if __name__ == "__main__":
         "inferred via the Python standard library's mimetypes module.",
     )
 
+    parser_large_file = subparsers.add_parser(
+        "large_file", help="Inspect a local text file of any size."
+    )
+    parser_large_file.add_argument("filename", help="The path to the file to inspect.")
+    parser_large_file.add_argument(
+        "--project",
+        help="The Google Cloud project id to use as a parent resource.",
+        default=default_project,
+    )
+    parser_large_file.add_argument(
+        "--info_types",
+        action="append",
+        help="Strings representing info types to look for. A full list of "
+        "info categories and types is available from the API. Examples "
+        'include "FIRST_NAME", "LAST_NAME", "EMAIL_ADDRESS". '
+        "If unspecified, the three above examples will be used.",
+        default=["FIRST_NAME", "LAST_NAME", "EMAIL_ADDRESS"],
+    )
+    parser_large_file.add_argument(
+        "--custom_dictionaries",
+        action="append",
+        help="Strings representing comma-delimited lists of dictionary words"
+        " to search for as custom info types. Each string is a comma "
+        "delimited list of words representing a distinct dictionary.",
+        default=None,
+    )
+    parser_large_file.add_argument(
+        "--custom_regexes",
+        action="append",
+        help="Strings representing regex patterns to search for as custom "
+        "info types.",
+        default=None,
+    )
+    parser_large_file.add_argument(
+        "--min_likelihood",
+        choices=[
+            "LIKELIHOOD_UNSPECIFIED",
+            "VERY_UNLIKELY",
+            "UNLIKELY",
+            "POSSIBLE",
+            "LIKELY",
+            "VERY_LIKELY",
+        ],
+        help="A string representing the minimum likelihood threshold that "
+        "constitutes a match.",
+    )
+    parser_large_file.add_argument(
+        "--include_quote",
+        type=bool,
+        help="A boolean for whether to display a quote of the detected "
+        "information in the results.",
+        default=True,
+    )
+    parser_large_file.add_argument(
+        "--chunk_size",
+        type=int,
+        default=file_chunking.CHUNK_SIZE,
+        help="The number of bytes between the start of each chunk.",
+    )
+    parser_large_file.add_argument(
+        "--overlap",
+        type=int,
+        default=file_chunking.OVERLAP,
+        help="The number of bytes each chunk overlaps with the next one.",
+    )
+    parser_large_file.add_argument(
+        "--max_workers",
+        type=int,
+        default=file_chunking.MAX_WORKERS,
+        help="The maximum number of concurrent requests.",
+    )
+
     parser_gcs = subparsers.add_parser(
         "gcs", help="Inspect files on Google Cloud Storage."
     )
@@ -2734,6 +2924,17 @@ if __name__ == "__main__":
             max_findings=args.max_findings,
             include_quote=args.include_quote,
         )
+    elif args.content == "large_table":
+        inspect_large_table(
+            args.project,
+            args.data,
+            args.info_types,
+            custom_dictionaries=args.custom_dictionaries,
+            custom_regexes=args.custom_regexes,
+            min_likelihood=args.min_likelihood,
+            include_quote=args.include_quote,
+            max_workers=args.max_workers,
+        )
     elif args.content == "table_w_custom_hotword":
         inspect_column_values_w_custom_hotwords(
             args.project,
@@ -2754,6 +2955,19 @@ if __name__ == "__main__":
             include_quote=args.include_quote,
             mime_type=args.mime_type,
         )
+    elif args.content == "large_file":
+        inspect_large_file(
+            args.project,
+            args.filename,
+            args.info_types,
+            custom_dictionaries=args.custom_dictionaries,
+            custom_regexes=args.custom_regexes,
+            min_likelihood=args.min_likelihood,
+            include_quote=args.include_quote,
+            chunk_size=args.chunk_size,
+            overlap=args.overlap,
+            max_workers=args.max_workers,
+        )
     elif args.content == "gcs":
         inspect_gcs_file(
             args.project,
@@ -34,6 +34,7 @@ import google.cloud.storage
 import pytest
 
 import inspect_content
+import job_waiter
 
 UNIQUE_STRING = str(uuid.uuid4()).split("-")[0]
 
@@ -239,6 +240,44 @@ def test_inspect_table(capsys: pytest.CaptureFixture) -> None:
     assert "Info type: EMAIL_ADDRESS" in out
 
 
+def test_inspect_large_table(capsys: pytest.CaptureFixture) -> None:
+    test_tabular_data = {
+        "header": ["email", "phone number"],
+        "rows": [["robertfrost@xyz.com", "4232342345"]] * 10,
+    }
+
+    inspect_content.inspect_large_table(
+        GCLOUD_PROJECT,
+        test_tabular_data,
+        ["PHONE_NUMBER", "EMAIL_ADDRESS"],
+        include_quote=True,
+    )
+
+    out, _ = capsys.readouterr()
+    assert "Row: 9" in out
+    assert "Info type: PHONE_NUMBER" in out
+    assert "Info type: EMAIL_ADDRESS" in out
+
+
+def test_inspect_large_table_prescreened(capsys: pytest.CaptureFixture) -> None:
+    test_tabular_data = {
+        "header": ["email", "phone number"],
+        "rows": [["gary@somedomain.com", "4232342345"]] + [["nobody", "none"]] * 9,
+    }
+
+    inspect_content.inspect_large_table(
+        GCLOUD_PROJECT,
+        test_tabular_data,
+        [],
+        custom_dictionaries=["gary@somedomain.com"],
+        include_quote=True,
+    )
+
+    out, _ = capsys.readouterr()
+    assert "Info type: CUSTOM_DICTIONARY_0" in out
+    assert "Skipped 9 of 10 rows." in out
+
+
 def test_inspect_column_values_w_custom_hotwords(capsys):
     table_data = {
         "header": ["Fake Social Security Number", "Real Social Security Number"],
@@ -308,6 +347,24 @@ def test_inspect_file(capsys: pytest.CaptureFixture) -> None:
     assert "Info type: EMAIL_ADDRESS" in out
 
 
+def test_inspect_large_file(capsys: pytest.CaptureFixture, tmp_path) -> None:
+    test_filepath = tmp_path / "large.txt"
+    test_filepath.write_text("My email is gary@example.com\n" * 100)
+
+    inspect_content.inspect_large_file(
+        GCLOUD_PROJECT,
+        str(test_filepath),
+        ["EMAIL_ADDRESS"],
+        include_quote=True,
+        chunk_size=256,
+        overlap=64,
+    )
+
+    out, _ = capsys.readouterr()
+    assert out.count("Info type: EMAIL_ADDRESS") == 100
+    assert "Bytes: 12-28" in out
+
+
 def test_inspect_file_with_custom_info_types(capsys: pytest.CaptureFixture) -> None:
     test_filepath = os.path.join(RESOURCE_DIRECTORY, "test.txt")
     dictionaries = ["gary@somedomain.com"]
@@ -395,6 +452,14 @@ def delete_dlp_job(out: str) -> None:
             DLP_CLIENT.delete_dlp_job(name=job_name)
 
 
+@pytest.fixture(autouse=True)
+def clear_job_waiters() -> Iterator[None]:
+    # The mocked tests each have their own clients, so don't share waiters.
+    job_waiter.get_job_waiter.cache_clear()
+    yield
+    job_waiter.get_job_waiter.cache_clear()
+
+
 def mock_job_and_subscriber(
     mock_dlp_instance: MagicMock,
     mock_subscriber_instance: MagicMock,
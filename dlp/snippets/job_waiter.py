@@ -0,0 +1,150 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Waits for many Data Loss Prevention jobs from a single process.
+
+All the jobs share a single Pub/Sub streaming pull, and every job completion
+notification is routed to whoever is waiting for that job by its DlpJobName
+attribute. Notifications for jobs nobody in this process is waiting for are
+nacked, so they are redelivered to other processes sharing the subscription,
+or to this one once it waits for the job.
+
+If a notification doesn't arrive, like when the job was created without a
+Pub/Sub action, the job is polled with exponential backoff instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import time
+from typing import Dict, Optional
+
+import google.cloud.dlp
+import google.cloud.pubsub
+
+MIN_POLL_INTERVAL = 10  # seconds
+MAX_POLL_INTERVAL = 120  # seconds
+
+DONE_STATES = {
+    google.cloud.dlp_v2.DlpJob.JobState.DONE,
+    google.cloud.dlp_v2.DlpJob.JobState.FAILED,
+    google.cloud.dlp_v2.DlpJob.JobState.CANCELED,
+}
+
+
+class JobWaiter:
+    """Routes job completion notifications from a subscription to waiters.
+
+    Use `get_job_waiter` to get the process-wide instance for a subscription
+    instead of creating one.
+    """
+
+    def __init__(self, project: str, subscription_id: str) -> None:
+        self.dlp = google.cloud.dlp_v2.DlpServiceClient()
+        self.subscriber = google.cloud.pubsub.SubscriberClient()
+        self.subscription_path = self.subscriber.subscription_path(
+            project, subscription_id
+        )
+        self.waiters: Dict[str, concurrent.futures.Future] = {}
+        self.lock = threading.RLock()
+        self.streaming_pull: Optional[concurrent.futures.Future] = None
+
+    def _on_message(
+        self, message: google.cloud.pubsub_v1.subscriber.message.Message
+    ) -> None:
+        name = message.attributes.get("DlpJobName", "")
+        with self.lock:
+            waiter = self.waiters.pop(name, None)
+        if waiter is None:
+            # This notification is for a job someone else is waiting for.
+            message.nack()
+            return
+        message.ack()
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _register(self, job_name: str) -> concurrent.futures.Future:
+        with self.lock:
+            # Register first, the notification can arrive as soon as we subscribe.
+            waiter = self.waiters.setdefault(job_name, concurrent.futures.Future())
+            if self.streaming_pull is None:
+                self.streaming_pull = self.subscriber.subscribe(
+                    self.subscription_path, callback=self._on_message
+                )
+            return waiter
+
+    def _get_job(self, job_name: str) -> google.cloud.dlp_v2.DlpJob:
+        return self.dlp.get_dlp_job(request={"name": job_name})
+
+    async def wait_async(
+        self, job_name: str, timeout: float = 300
+    ) -> google.cloud.dlp_v2.DlpJob:
+        """Waits until a job is done, without blocking any thread.
+
+        Args:
+            job_name: The job's resource name, like from `create_dlp_job`.
+            timeout: The number of seconds to wait for the job.
+
+        Raises:
+            TimeoutError: If the job isn't done before the timeout.
+
+        Returns:
+            The done job, with its results.
+        """
+        notified = asyncio.wrap_future(self._register(job_name))
+        deadline = time.monotonic() + timeout
+        interval = MIN_POLL_INTERVAL
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"job not done after {timeout}s: {job_name}")
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(notified), min(interval, remaining)
+                    )
+                    return await asyncio.to_thread(self._get_job, job_name)
+                except asyncio.TimeoutError:
+                    # Fall back to polling in case the notification got lost.
+                    job = await asyncio.to_thread(self._get_job, job_name)
+                    if job.state in DONE_STATES:
+                        return job
+                    interval = min(interval * 2, MAX_POLL_INTERVAL)
+        finally:
+            with self.lock:
+                self.waiters.pop(job_name, None)
+
+    def wait(self, job_name: str, timeout: float = 300) -> google.cloud.dlp_v2.DlpJob:
+        """Waits until a job is done, blocking the current thread.
+
+        Args:
+            job_name: The job's resource name, like from `create_dlp_job`.
+            timeout: The number of seconds to wait for the job.
+
+        Raises:
+            TimeoutError: If the job isn't done before the timeout.
+
+        Returns:
+            The done job, with its results.
+        """
+        return asyncio.run(self.wait_async(job_name, timeout))
+
+
+@functools.lru_cache(maxsize=None)
+def get_job_waiter(project: str, subscription_id: str) -> JobWaiter:
+    """Gets the process-wide job waiter for a subscription."""
+    return JobWaiter(project, subscription_id)
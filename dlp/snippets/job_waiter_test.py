@@ -0,0 +1,90 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from typing import Iterator
+from unittest import mock
+from unittest.mock import MagicMock
+
+import google.cloud.dlp_v2
+import pytest
+
+import job_waiter
+
+RUNNING = google.cloud.dlp_v2.DlpJob.JobState.RUNNING
+DONE = google.cloud.dlp_v2.DlpJob.JobState.DONE
+
+
+@pytest.fixture
+def waiter() -> Iterator[job_waiter.JobWaiter]:
+    with mock.patch("google.cloud.dlp_v2.DlpServiceClient"), mock.patch(
+        "google.cloud.pubsub.SubscriberClient"
+    ):
+        yield job_waiter.JobWaiter("project", "subscription")
+
+
+def notify(waiter: job_waiter.JobWaiter, job_name: str) -> MagicMock:
+    callback = waiter.subscriber.subscribe.call_args.kwargs["callback"]
+    message = MagicMock(attributes={"DlpJobName": job_name})
+    callback(message)
+    return message
+
+
+def test_wait_notified(waiter: job_waiter.JobWaiter) -> None:
+    waiter.dlp.get_dlp_job.return_value = google.cloud.dlp_v2.DlpJob(
+        name="job", state=DONE
+    )
+
+    async def wait() -> google.cloud.dlp_v2.DlpJob:
+        task = asyncio.ensure_future(waiter.wait_async("job", timeout=60))
+        await asyncio.sleep(0)
+        message = notify(waiter, "job")
+        message.ack.assert_called_once()
+        return await task
+
+    assert asyncio.run(wait()).name == "job"
+    # All the jobs share a single streaming pull.
+    waiter.subscriber.subscribe.assert_called_once()
+    assert not waiter.waiters
+
+
+def test_other_jobs_are_nacked(waiter: job_waiter.JobWaiter) -> None:
+    waiter._register("job")  # starts the streaming pull
+
+    message = notify(waiter, "other")
+
+    # Another waiter sharing the subscription gets the notification instead.
+    message.nack.assert_called_once()
+    message.ack.assert_not_called()
+    assert not waiter.waiters["job"].done()
+
+
+def test_wait_polls(waiter: job_waiter.JobWaiter) -> None:
+    waiter.dlp.get_dlp_job.side_effect = [
+        google.cloud.dlp_v2.DlpJob(name="job", state=RUNNING),
+        google.cloud.dlp_v2.DlpJob(name="job", state=DONE),
+    ]
+
+    with mock.patch("job_waiter.MIN_POLL_INTERVAL", 0.01):
+        assert waiter.wait("job", timeout=60).state == DONE
+
+
+def test_wait_timeout(waiter: job_waiter.JobWaiter) -> None:
+    waiter.dlp.get_dlp_job.return_value = google.cloud.dlp_v2.DlpJob(
+        name="job", state=RUNNING
+    )
+
+    with pytest.raises(TimeoutError):
+        with mock.patch("job_waiter.MIN_POLL_INTERVAL", 0.01):
+            waiter.wait("job", timeout=0.05)
@@ -0,0 +1,302 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local estimates of re-identification risk metrics.
+
+These compute k-anonymity, l-diversity and k-map histograms on local data,
+like a sample of a BigQuery table, in the same shape as the results of risk
+analysis jobs. They're useful to quickly try different quasi-identifiers
+before running the full jobs.
+
+The data can be a single DataFrame or an iterable of DataFrames, like chunks
+of a large file or table. Chunks are aggregated as they come, so memory only
+depends on the number of distinct values, not on the number of rows.
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+import google.cloud.bigquery
+import google.cloud.dlp
+import numpy as np
+import pandas as pd
+
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+# Lower bounds of the histogram buckets, like the risk analysis jobs.
+BUCKET_LOWER_BOUNDS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 21, 51, 101, 1001, 10001]
+MAX_BUCKET_VALUES = 20
+MAX_TOP_VALUES = 10
+
+# Column names for the aggregates, unlikely to clash with the data columns.
+_COUNT = "__count__"
+_CLASS = "__class__"
+_ANONYMITY = "__anonymity__"
+
+RiskDetails = google.cloud.dlp_v2.AnalyzeDataSourceRiskDetails
+
+
+def _iter_frames(frames: Frames) -> Iterator[pd.DataFrame]:
+    if isinstance(frames, pd.DataFrame):
+        yield frames
+    else:
+        yield from frames
+
+
+def count_values(frames: Frames, columns: List[str]) -> pd.DataFrame:
+    """Counts the rows with each distinct combination of values.
+
+    Args:
+        frames: A DataFrame or an iterable of DataFrames.
+        columns: The columns to group by, null values are a value too.
+
+    Returns:
+        A DataFrame with the distinct values in `columns`, and their number of
+        rows in the `__count__` column.
+    """
+    counts = None
+    for frame in _iter_frames(frames):
+        chunk = (
+            frame.groupby(columns, dropna=False, sort=False)
+            .size()
+            .rename(_COUNT)
+            .reset_index()
+        )
+        if counts is None:
+            counts = chunk
+        else:
+            counts = (
+                pd.concat([counts, chunk], ignore_index=True)
+                .groupby(columns, dropna=False, sort=False)[_COUNT]
+                .sum()
+                .reset_index()
+            )
+    if counts is None:
+        return pd.DataFrame({column: [] for column in columns + [_COUNT]})
+    return counts
+
+
+def _bucket_ids(values: pd.Series) -> np.ndarray:
+    return np.searchsorted(BUCKET_LOWER_BOUNDS, values.to_numpy(), side="right")
+
+
+def _sample(group: pd.DataFrame, columns: List[str]) -> Iterator[tuple]:
+    """Yields the first rows of a bucket as tuples, keeping each column's type."""
+    sample = group.head(MAX_BUCKET_VALUES)[columns]
+    return sample.itertuples(index=False, name=None)
+
+
+def to_value(value: Any) -> google.cloud.dlp_v2.Value:
+    """Converts a DataFrame value into an API value, nulls are empty values."""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        # None, NaN, NaT and pd.NA are all nulls.
+        return google.cloud.dlp_v2.Value()
+    if isinstance(value, (bool, np.bool_)):
+        return google.cloud.dlp_v2.Value(boolean_value=bool(value))
+    if isinstance(value, (int, np.integer)):
+        return google.cloud.dlp_v2.Value(integer_value=int(value))
+    if isinstance(value, (float, np.floating)):
+        return google.cloud.dlp_v2.Value(float_value=float(value))
+    # Check datetimes first, since they are also dates.
+    if isinstance(value, datetime.datetime):
+        return google.cloud.dlp_v2.Value(timestamp_value=value)
+    if isinstance(value, datetime.date):
+        date = {"year": value.year, "month": value.month, "day": value.day}
+        return google.cloud.dlp_v2.Value(date_value=date)
+    return google.cloud.dlp_v2.Value(string_value=str(value))
+
+
+def from_value(value: google.cloud.dlp_v2.Value) -> Any:
+    """Converts an API value back into a Python value, empty values are None."""
+    field = google.cloud.dlp_v2.Value.pb(value).WhichOneof("type")
+    return getattr(value, field) if field else None
+
+
+def k_anonymity_histogram(
+    frames: Frames, quasi_ids: List[str]
+) -> List[RiskDetails.KAnonymityResult.KAnonymityHistogramBucket]:
+    """Estimates the k-anonymity of a set of columns.
+
+    Args:
+        frames: A DataFrame or an iterable of DataFrames.
+        quasi_ids: A set of columns that form a composite key.
+
+    Returns:
+        The histogram buckets, like a k-anonymity job's
+        `equivalence_class_histogram_buckets`.
+    """
+    classes = count_values(frames, quasi_ids).sort_values(
+        _COUNT, ascending=False, kind="stable"
+    )
+    buckets = []
+    for _, group in classes.groupby(_bucket_ids(classes[_COUNT])):
+        buckets.append(
+            RiskDetails.KAnonymityResult.KAnonymityHistogramBucket(
+                equivalence_class_size_lower_bound=int(group[_COUNT].min()),
+                equivalence_class_size_upper_bound=int(group[_COUNT].max()),
+                bucket_size=len(group),
+                bucket_values=[
+                    RiskDetails.KAnonymityResult.KAnonymityEquivalenceClass(
+                        quasi_ids_values=[to_value(value) for value in values],
+                        equivalence_class_size=int(size),
+                    )
+                    for *values, size in _sample(group, quasi_ids + [_COUNT])
+                ],
+                bucket_value_count=len(group),
+            )
+        )
+    return buckets
+
+
+def l_diversity_histogram(
+    frames: Frames, quasi_ids: List[str], sensitive_attribute: str
+) -> List[RiskDetails.LDiversityResult.LDiversityHistogramBucket]:
+    """Estimates the l-diversity of a sensitive column for a set of columns.
+
+    Args:
+        frames: A DataFrame or an iterable of DataFrames.
+        quasi_ids: A set of columns that form a composite key.
+        sensitive_attribute: The column to measure l-diversity relative to.
+
+    Returns:
+        The histogram buckets, like an l-diversity job's
+        `sensitive_value_frequency_histogram_buckets`.
+    """
+    values = count_values(frames, quasi_ids + [sensitive_attribute]).sort_values(
+        _COUNT, ascending=False, kind="stable"
+    )
+    values[_CLASS] = values.groupby(quasi_ids, dropna=False, sort=False).ngroup()
+    by_class = values.groupby(_CLASS, sort=False)
+    classes = pd.DataFrame(
+        {"size": by_class[_COUNT].sum(), "distinct": by_class.size()}
+    )
+    top_values = by_class.head(MAX_TOP_VALUES)
+
+    buckets = []
+    for _, group in classes.groupby(_bucket_ids(classes["distinct"])):
+        sample = group.head(MAX_BUCKET_VALUES)
+        sample_values = top_values[top_values[_CLASS].isin(sample.index)]
+        buckets.append(
+            RiskDetails.LDiversityResult.LDiversityHistogramBucket(
+                sensitive_value_frequency_lower_bound=int(group["distinct"].min()),
+                sensitive_value_frequency_upper_bound=int(group["distinct"].max()),
+                bucket_size=len(group),
+                bucket_values=[
+                    RiskDetails.LDiversityResult.LDiversityEquivalenceClass(
+                        quasi_ids_values=[
+                            to_value(rows[name].iloc[0]) for name in quasi_ids
+                        ],
+                        equivalence_class_size=int(classes.at[class_id, "size"]),
+                        num_distinct_sensitive_values=int(
+                            classes.at[class_id, "distinct"]
+                        ),
+                        top_sensitive_values=[
+                            google.cloud.dlp_v2.ValueFrequency(
+                                value=to_value(value), count=int(count)
+                            )
+                            for value, count in zip(
+                                rows[sensitive_attribute], rows[_COUNT]
+                            )
+                        ],
+                    )
+                    for class_id, rows in sample_values.groupby(_CLASS, sort=False)
+                ],
+                bucket_value_count=len(group),
+            )
+        )
+    return buckets
+
+
+def k_map_histogram(
+    frames: Frames, quasi_ids: List[str], population: Frames
+) -> List[RiskDetails.KMapEstimationResult.KMapEstimationHistogramBucket]:
+    """Estimates the k-map of a set of columns against a reference population.
+
+    The risk analysis jobs can use public statistics as the population, here
+    it must be provided, like a larger table that the data is a subset of.
+
+    Args:
+        frames: A DataFrame or an iterable of DataFrames.
+        quasi_ids: A set of columns that form a composite key, they must be in
+            both the data and the population.
+        population: A DataFrame or an iterable of DataFrames.
+
+    Returns:
+        The histogram buckets, like a k-map job's `k_map_estimation_histogram`.
+    """
+    population_counts = count_values(population, quasi_ids).rename(
+        columns={_COUNT: _ANONYMITY}
+    )
+    classes = count_values(frames, quasi_ids).merge(
+        population_counts, on=quasi_ids, how="left"
+    )
+    # Every individual in the data is also part of the population.
+    classes[_ANONYMITY] = np.maximum(
+        classes[_ANONYMITY].fillna(0), classes[_COUNT]
+    ).astype(np.int64)
+    classes = classes.sort_values(_ANONYMITY, kind="stable")
+
+    buckets = []
+    for _, group in classes.groupby(_bucket_ids(classes[_ANONYMITY])):
+        buckets.append(
+            RiskDetails.KMapEstimationResult.KMapEstimationHistogramBucket(
+                min_anonymity=int(group[_ANONYMITY].min()),
+                max_anonymity=int(group[_ANONYMITY].max()),
+                bucket_size=int(group[_COUNT].sum()),
+                bucket_values=[
+                    RiskDetails.KMapEstimationResult.KMapEstimationQuasiIdValues(
+                        quasi_ids_values=[to_value(value) for value in values],
+                        estimated_anonymity=int(anonymity),
+                    )
+                    for *values, anonymity in _sample(group, quasi_ids + [_ANONYMITY])
+                ],
+                bucket_value_count=len(group),
+            )
+        )
+    return buckets
+
+
+def read_bigquery_table(
+    table_project_id: str,
+    dataset_id: str,
+    table_id: str,
+    columns: List[str],
+    sample_percent: Optional[float] = None,
+) -> Iterator[pd.DataFrame]:
+    """Reads some columns of a BigQuery table in chunks.
+
+    Args:
+        table_project_id: The Google Cloud project id where the BigQuery table
+            is stored.
+        dataset_id: The id of the dataset to read.
+        table_id: The id of the table to read.
+        columns: The columns to read.
+        sample_percent: Optional percentage of the table to sample, sampling
+            is done by storage blocks, so it's approximate.
+
+    Yields:
+        DataFrames with the table rows.
+    """
+    client = google.cloud.bigquery.Client(project=table_project_id)
+    query = "SELECT {} FROM `{}.{}.{}`".format(
+        ", ".join(f"`{column}`" for column in columns),
+        table_project_id,
+        dataset_id,
+        table_id,
+    )
+    if sample_percent is not None:
+        query += f" TABLESAMPLE SYSTEM ({sample_percent} PERCENT)"
+    yield from client.query(query).result().to_dataframe_iterable()
@@ -0,0 +1,113 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import google.cloud.dlp_v2
+import numpy as np
+import pandas as pd
+import pytest
+
+import local_risk
+
+DATA = pd.DataFrame(
+    {
+        "Age": [30, 30, 30, 40, 40, 50],
+        "Gender": ["F", "F", "M", "M", "M", None],
+        "Disease": ["flu", "cold", "flu", "flu", "flu", "cold"],
+    }
+)
+
+
+def test_count_values_chunks() -> None:
+    chunks = [DATA.iloc[:2], DATA.iloc[2:5], DATA.iloc[5:]]
+
+    counts = local_risk.count_values(chunks, ["Age", "Gender"])
+
+    rows = counts.fillna("").itertuples(index=False, name=None)
+    assert sorted(rows) == [(30, "F", 2), (30, "M", 1), (40, "M", 2), (50, "", 1)]
+
+
+def test_k_anonymity_histogram() -> None:
+    buckets = local_risk.k_anonymity_histogram(DATA, ["Age", "Gender"])
+
+    assert [
+        (
+            bucket.equivalence_class_size_lower_bound,
+            bucket.equivalence_class_size_upper_bound,
+            bucket.bucket_size,
+        )
+        for bucket in buckets
+    ] == [(1, 1, 2), (2, 2, 2)]
+    [age, gender] = buckets[1].bucket_values[0].quasi_ids_values
+    assert age.integer_value == 30
+    assert gender.string_value == "F"
+    assert buckets[1].bucket_values[0].equivalence_class_size == 2
+
+
+def test_l_diversity_histogram() -> None:
+    buckets = local_risk.l_diversity_histogram(DATA, ["Age"], "Disease")
+
+    assert [
+        (
+            bucket.sensitive_value_frequency_lower_bound,
+            bucket.sensitive_value_frequency_upper_bound,
+            bucket.bucket_size,
+        )
+        for bucket in buckets
+    ] == [(1, 1, 2), (2, 2, 1)]
+    [age_30] = buckets[1].bucket_values
+    assert age_30.equivalence_class_size == 3
+    assert [
+        (value.value.string_value, value.count) for value in age_30.top_sensitive_values
+    ] == [("flu", 2), ("cold", 1)]
+
+
+def test_k_map_histogram() -> None:
+    population = pd.concat([DATA] * 5)
+
+    buckets = local_risk.k_map_histogram(DATA.iloc[:3], ["Age", "Gender"], population)
+
+    assert [
+        (bucket.min_anonymity, bucket.max_anonymity, bucket.bucket_size)
+        for bucket in buckets
+    ] == [(5, 5, 1), (10, 10, 2)]
+
+
+@pytest.mark.parametrize("value", [None, np.nan, pd.NaT, pd.NA])
+def test_to_value_null(value: object) -> None:
+    assert local_risk.to_value(value) == google.cloud.dlp_v2.Value()
+
+
+def test_to_value_dates() -> None:
+    date = local_risk.to_value(datetime.date(2023, 5, 17))
+    timestamp = local_risk.to_value(datetime.datetime(2023, 5, 17, 12, 30))
+
+    assert (date.date_value.year, date.date_value.month, date.date_value.day) == (
+        2023,
+        5,
+        17,
+    )
+    assert timestamp.timestamp_value.hour == 12
+
+
+def test_to_value_nullable_column() -> None:
+    ages = pd.Series([30, None], dtype="Int64")
+
+    values = [local_risk.to_value(age) for age in ages]
+
+    assert values == [
+        google.cloud.dlp_v2.Value(integer_value=30),
+        google.cloud.dlp_v2.Value(),
+    ]
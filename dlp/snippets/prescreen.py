@@ -0,0 +1,167 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local pre-screening for custom dictionaries and regexes.
+
+When an inspection only looks for custom info types, content that can't match
+any of the dictionary words or regexes doesn't need to be sent to the API.
+The screening is conservative: anything that could match is still sent, and
+the API has the final word on what is a finding.
+"""
+
+from __future__ import annotations
+
+import collections
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# The API uses RE2 syntax. Most RE2-only syntax, like `\C` or `\pN`, doesn't
+# compile in Python, but these constructs compile with a different meaning,
+# like POSIX classes such as `[[:digit:]]` or `(?P=name)` backreferences.
+RE2_ONLY_SYNTAX = re.compile(r"\[:\^?[a-z]+:\]|\(\?P=")
+
+
+class WordMatcher:
+    """Finds whether a text contains any of many words in a single pass.
+
+    This is an Aho-Corasick automaton, so the time to search a text doesn't
+    depend on the number of words. Matching is case-insensitive, like the
+    Data Loss Prevention API dictionaries.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[bool] = [False]
+        for word in words:
+            word = word.strip().casefold()
+            if not word:
+                continue
+            node = 0
+            for char in word:
+                if char not in self.goto[node]:
+                    self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(False)
+                node = self.goto[node][char]
+            self.output[node] = True
+
+        # Breadth-first, link each node to its longest proper suffix in the trie.
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+                queue.append(child)
+
+    def search(self, text: str) -> bool:
+        """Returns True if the text contains any of the words."""
+        node = 0
+        for char in text.casefold():
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            if self.output[node]:
+                return True
+        return False
+
+
+class Prescreener:
+    """Decides which content could have findings for an inspect config.
+
+    Content is only skipped if the inspect config only has custom dictionaries
+    and regexes, and none of them can match. If any regex uses RE2 syntax that
+    Python can't compile, or compiles with a different meaning, nothing is
+    skipped.
+
+    Attributes:
+        enabled: Whether any content can be skipped for this inspect config.
+        checked: Number of times content was checked.
+        skipped: Number of times content was skipped.
+    """
+
+    def __init__(
+        self,
+        info_types: Optional[List[str]] = None,
+        custom_dictionaries: Optional[List[List[str]]] = None,
+        custom_regexes: Optional[List[str]] = None,
+    ) -> None:
+        self.words = WordMatcher(
+            word for words in custom_dictionaries or [] for word in words
+        )
+        self.regexes = []
+        compiles = True
+        for pattern in custom_regexes or []:
+            if RE2_ONLY_SYNTAX.search(pattern):
+                compiles = False
+                continue
+            try:
+                self.regexes.append(re.compile(pattern))
+            except re.error:
+                compiles = False
+        # Without any info types, the API looks for its default info types.
+        self.enabled = bool(
+            not info_types and compiles and (custom_dictionaries or custom_regexes)
+        )
+        self.checked = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_inspect_config(cls, inspect_config: Dict) -> Prescreener:
+        """Creates a prescreener for an inspect config dictionary.
+
+        Args:
+            inspect_config: The inspect config, like for `inspect_content`.
+
+        Returns:
+            A prescreener for the config's info types and custom info types.
+        """
+        info_types = [
+            info_type["name"] for info_type in inspect_config.get("info_types") or []
+        ]
+        custom_dictionaries, custom_regexes = ([], [])
+        for custom in inspect_config.get("custom_info_types") or []:
+            if "word_list" in custom.get("dictionary", {}):
+                custom_dictionaries.append(custom["dictionary"]["word_list"]["words"])
+            elif "regex" in custom:
+                custom_regexes.append(custom["regex"]["pattern"])
+            else:
+                # Other custom info types can only be found by the API.
+                info_types.append(custom["info_type"]["name"])
+        return cls(info_types, custom_dictionaries, custom_regexes)
+
+    def might_match(self, *texts: str) -> bool:
+        """Checks if any of the texts could have findings.
+
+        Args:
+            texts: The contents to check, like the cells of a table row.
+
+        Returns:
+            False only if none of the texts can have any findings.
+        """
+        match = not self.enabled or any(
+            self.words.search(text) or any(regex.search(text) for regex in self.regexes)
+            for text in texts
+        )
+        with self.lock:
+            self.checked += 1
+            self.skipped += not match
+        return match
@@ -0,0 +1,73 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import prescreen
+
+
+def test_word_matcher() -> None:
+    matcher = prescreen.WordMatcher(["he", "she", "his", "hers"])
+
+    assert matcher.search("ushers")
+    assert matcher.search("THIS")
+    assert not matcher.search("hx")
+    assert not prescreen.WordMatcher([]).search("anything")
+
+
+def test_prescreener() -> None:
+    prescreener = prescreen.Prescreener.from_inspect_config(
+        {
+            "info_types": [],
+            "custom_info_types": [
+                {
+                    "info_type": {"name": "CUSTOM_DICTIONARY_0"},
+                    "dictionary": {"word_list": {"words": ["gary@somedomain.com"]}},
+                },
+                {
+                    "info_type": {"name": "CUSTOM_REGEX_0"},
+                    "regex": {"pattern": "\\(\\d{3}\\) \\d{3}-\\d{4}"},
+                },
+            ],
+        }
+    )
+
+    assert prescreener.enabled
+    assert prescreener.might_match("Email GARY@somedomain.com")
+    assert prescreener.might_match("nothing", "Call (223) 456-7890")
+    assert not prescreener.might_match("nothing", "to see here")
+    assert (prescreener.checked, prescreener.skipped) == (3, 1)
+
+
+def test_prescreener_disabled() -> None:
+    # Built-in info types can only be found by the API.
+    prescreener = prescreen.Prescreener(
+        info_types=["EMAIL_ADDRESS"], custom_regexes=["secret"]
+    )
+    assert not prescreener.enabled
+    assert prescreener.might_match("nothing to see here")
+
+    # Without any info types, the API looks for its default info types.
+    assert not prescreen.Prescreener().enabled
+
+
+def test_prescreener_re2_syntax() -> None:
+    # Python reads "[[:digit:]]" as the class "[[:digit:]" followed by "]",
+    # so it would skip content that the API finds.
+    prescreener = prescreen.Prescreener(
+        custom_regexes=["[[:digit:]]{3}-[[:digit:]]{4}"]
+    )
+    assert not prescreener.enabled
+    assert prescreener.might_match("call 555-1234")
+
+    # RE2-only syntax that doesn't compile in Python.
+    assert not prescreen.Prescreener(custom_regexes=["\\pN+"]).enabled
@@ -19,11 +19,11 @@ import argparse
 
 
 # [START dlp_numerical_stats]
-import concurrent.futures
-
 import google.cloud.dlp
 import google.cloud.pubsub
 
+import job_waiter  # noqa: I100, E402
+
 
 def numerical_risk_analysis(
     project: str,
@@ -82,46 +82,33 @@ def numerical_risk_analysis(
     # Call API to start risk analysis job
     operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
 
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        if message.attributes["DlpJobName"] == operation.name:
-            # This is the message we're looking for, so acknowledge it.
-            message.ack()
-
-            # Now that the job is done, fetch the results and print them.
-            job = dlp.get_dlp_job(request={"name": operation.name})
-            print(f"Job name: {job.name}")
-            results = job.risk_details.numerical_stats_result
-            print(
-                "Value Range: [{}, {}]".format(
-                    results.min_value.integer_value,
-                    results.max_value.integer_value,
-                )
-            )
-            prev_value = None
-            for percent, result in enumerate(results.quantile_values):
-                value = result.integer_value
-                if prev_value != value:
-                    print(f"Value at {percent}% quantile: {value}")
-                    prev_value = value
-            subscription.set_result(None)
-        else:
-            # This is not the message we're looking for.
-            message.drop()
-
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-    subscription = subscriber.subscribe(subscription_path, callback)
-
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
     try:
-        subscription.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
-        subscription.close()
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    results = job.risk_details.numerical_stats_result
+    print(
+        "Value Range: [{}, {}]".format(
+            results.min_value.integer_value,
+            results.max_value.integer_value,
+        )
+    )
+    prev_value = None
+    for percent, result in enumerate(results.quantile_values):
+        value = result.integer_value
+        if prev_value != value:
+            print(f"Value at {percent}% quantile: {value}")
+            prev_value = value
 
 
 # [END dlp_numerical_stats]
@@ -129,11 +116,12 @@ def numerical_risk_analysis(
 
 # [START dlp_categorical_stats]
 
-import concurrent.futures  # noqa: E402, F811, I100
 
 import google.cloud.dlp  # noqa: E402, F811
 import google.cloud.pubsub  # noqa: E402, F811
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def categorical_risk_analysis(
     project: str,
@@ -194,56 +182,43 @@ def categorical_risk_analysis(
     # Call API to start risk analysis job
     operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
 
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        if message.attributes["DlpJobName"] == operation.name:
-            # This is the message we're looking for, so acknowledge it.
-            message.ack()
-
-            # Now that the job is done, fetch the results and print them.
-            job = dlp.get_dlp_job(request={"name": operation.name})
-            print(f"Job name: {job.name}")
-            histogram_buckets = (
-                job.risk_details.categorical_stats_result.value_frequency_histogram_buckets  # noqa: E501
-            )
-            # Print bucket stats
-            for i, bucket in enumerate(histogram_buckets):
-                print(f"Bucket {i}:")
-                print(
-                    "   Most common value occurs {} time(s)".format(
-                        bucket.value_frequency_upper_bound
-                    )
-                )
-                print(
-                    "   Least common value occurs {} time(s)".format(
-                        bucket.value_frequency_lower_bound
-                    )
-                )
-                print(f"   {bucket.bucket_size} unique values total.")
-                for value in bucket.bucket_values:
-                    print(
-                        "   Value {} occurs {} time(s)".format(
-                            value.value.integer_value, value.count
-                        )
-                    )
-            subscription.set_result(None)
-        else:
-            # This is not the message we're looking for.
-            message.drop()
-
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-    subscription = subscriber.subscribe(subscription_path, callback)
-
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
     try:
-        subscription.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
-        subscription.close()
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    histogram_buckets = (
+        job.risk_details.categorical_stats_result.value_frequency_histogram_buckets  # noqa: E501
+    )
+    # Print bucket stats
+    for i, bucket in enumerate(histogram_buckets):
+        print(f"Bucket {i}:")
+        print(
+            "   Most common value occurs {} time(s)".format(
+                bucket.value_frequency_upper_bound
+            )
+        )
+        print(
+            "   Least common value occurs {} time(s)".format(
+                bucket.value_frequency_lower_bound
+            )
+        )
+        print(f"   {bucket.bucket_size} unique values total.")
+        for value in bucket.bucket_values:
+            print(
+                "   Value {} occurs {} time(s)".format(
+                    value.value.integer_value, value.count
+                )
+            )
 
 
 # [END dlp_categorical_stats]
@@ -251,7 +226,6 @@ def categorical_risk_analysis(
 
 # [START dlp_k_anonymity]
 
-import concurrent.futures  # noqa: I100, F811, E402
 
 from typing import List  # noqa: E402, F811
 
@@ -259,6 +233,8 @@ import google.cloud.dlp  # noqa: I100, F811, E402
 from google.cloud.dlp_v2 import types  # noqa: I100, F811, E402
 import google.cloud.pubsub  # noqa: I100, F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def k_anonymity_analysis(
     project: str,
@@ -327,57 +303,40 @@ def k_anonymity_analysis(
     # Call API to start risk analysis job
     operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
 
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        if message.attributes["DlpJobName"] == operation.name:
-            # This is the message we're looking for, so acknowledge it.
-            message.ack()
-
-            # Now that the job is done, fetch the results and print them.
-            job = dlp.get_dlp_job(request={"name": operation.name})
-            print(f"Job name: {job.name}")
-            histogram_buckets = (
-                job.risk_details.k_anonymity_result.equivalence_class_histogram_buckets
-            )
-            # Print bucket stats
-            for i, bucket in enumerate(histogram_buckets):
-                print(f"Bucket {i}:")
-                if bucket.equivalence_class_size_lower_bound:
-                    print(
-                        "   Bucket size range: [{}, {}]".format(
-                            bucket.equivalence_class_size_lower_bound,
-                            bucket.equivalence_class_size_upper_bound,
-                        )
-                    )
-                    for value_bucket in bucket.bucket_values:
-                        print(
-                            "   Quasi-ID values: {}".format(
-                                map(get_values, value_bucket.quasi_ids_values)
-                            )
-                        )
-                        print(
-                            "   Class size: {}".format(
-                                value_bucket.equivalence_class_size
-                            )
-                        )
-            subscription.set_result(None)
-        else:
-            # This is not the message we're looking for.
-            message.drop()
-
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-    subscription = subscriber.subscribe(subscription_path, callback)
-
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
     try:
-        subscription.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
-        subscription.close()
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    histogram_buckets = (
+        job.risk_details.k_anonymity_result.equivalence_class_histogram_buckets
+    )
+    # Print bucket stats
+    for i, bucket in enumerate(histogram_buckets):
+        print(f"Bucket {i}:")
+        if bucket.equivalence_class_size_lower_bound:
+            print(
+                "   Bucket size range: [{}, {}]".format(
+                    bucket.equivalence_class_size_lower_bound,
+                    bucket.equivalence_class_size_upper_bound,
+                )
+            )
+            for value_bucket in bucket.bucket_values:
+                print(
+                    "   Quasi-ID values: {}".format(
+                        map(get_values, value_bucket.quasi_ids_values)
+                    )
+                )
+                print("   Class size: {}".format(value_bucket.equivalence_class_size))
 
 
 # [END dlp_k_anonymity]
@@ -401,7 +360,6 @@ def k_anonymity_with_entity_id(
     output_dataset_id: str,
     output_table_id: str,
 ) -> None:
-
     """Uses the Data Loss Prevention API to compute the k-anonymity using entity_id
         of a column set in a Google BigQuery table.
     Args:
@@ -447,21 +405,13 @@ def k_anonymity_with_entity_id(
     quasi_ids = map(map_fields, quasi_ids)
 
     # Tell the API where to send a notification when the job is complete.
-    actions = [
-        {
-            "save_findings": {
-                "output_config": {"table": dest_table}
-            }
-        }
-    ]
+    actions = [{"save_findings": {"output_config": {"table": dest_table}}}]
 
     # Configure the privacy metric to compute for re-identification risk analysis.
     # Specify the unique identifier in the source table for the k-anonymity analysis.
     privacy_metric = {
         "k_anonymity_config": {
-            "entity_id": {
-                "field": {"name": entity_id}
-            },
+            "entity_id": {"field": {"name": entity_id}},
             "quasi_ids": quasi_ids,
         }
     }
@@ -494,7 +444,7 @@ def k_anonymity_with_entity_id(
         if job.state == google.cloud.dlp_v2.DlpJob.JobState.DONE:
             break
         if job.state == google.cloud.dlp_v2.DlpJob.JobState.FAILED:
-            print('Job Failed, Please check the configuration.')
+            print("Job Failed, Please check the configuration.")
             return
 
         # Sleep for a short duration before checking the job status again
@@ -521,26 +471,31 @@ def k_anonymity_with_entity_id(
     for i, bucket in enumerate(histogram_buckets):
         print(f"Bucket {i}:")
         if bucket.equivalence_class_size_lower_bound:
-            print(f"Bucket size range: [{bucket.equivalence_class_size_lower_bound}, "
-                  f"{bucket.equivalence_class_size_upper_bound}]"
-                  )
+            print(
+                f"Bucket size range: [{bucket.equivalence_class_size_lower_bound}, "
+                f"{bucket.equivalence_class_size_upper_bound}]"
+            )
             for value_bucket in bucket.bucket_values:
-                print(f"Quasi-ID values: {get_values(value_bucket.quasi_ids_values[0])}")
+                print(
+                    f"Quasi-ID values: {get_values(value_bucket.quasi_ids_values[0])}"
+                )
                 print(f"Class size: {value_bucket.equivalence_class_size}")
         else:
             print("No findings.")
 
+
 # [END dlp_k_anonymity_with_entity_id]
 
 
 # [START dlp_l_diversity]
 from typing import List  # noqa: I100, F811, E402
-import concurrent.futures  # noqa: I100, F811, E402
 
 import google.cloud.dlp  # noqa: I100, F811, E402
 from google.cloud.dlp_v2 import types  # noqa: I100, F811, E402
 import google.cloud.pubsub  # noqa: I100, F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def l_diversity_analysis(
     project: str,
@@ -616,58 +571,45 @@ def l_diversity_analysis(
     # Call API to start risk analysis job
     operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
 
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        if message.attributes["DlpJobName"] == operation.name:
-            # This is the message we're looking for, so acknowledge it.
-            message.ack()
-
-            # Now that the job is done, fetch the results and print them.
-            job = dlp.get_dlp_job(request={"name": operation.name})
-            print(f"Job name: {job.name}")
-            histogram_buckets = (
-                job.risk_details.l_diversity_result.sensitive_value_frequency_histogram_buckets  # noqa: E501
-            )
-            # Print bucket stats
-            for i, bucket in enumerate(histogram_buckets):
-                print(f"Bucket {i}:")
-                print(
-                    "   Bucket size range: [{}, {}]".format(
-                        bucket.sensitive_value_frequency_lower_bound,
-                        bucket.sensitive_value_frequency_upper_bound,
-                    )
-                )
-                for value_bucket in bucket.bucket_values:
-                    print(
-                        "   Quasi-ID values: {}".format(
-                            map(get_values, value_bucket.quasi_ids_values)
-                        )
-                    )
-                    print(f"   Class size: {value_bucket.equivalence_class_size}")
-                    for value in value_bucket.top_sensitive_values:
-                        print(
-                            "   Sensitive value {} occurs {} time(s)".format(
-                                value.value, value.count
-                            )
-                        )
-            subscription.set_result(None)
-        else:
-            # This is not the message we're looking for.
-            message.drop()
-
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-    subscription = subscriber.subscribe(subscription_path, callback)
-
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
     try:
-        subscription.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
         print(
             "No event received before the timeout. Please verify that the "
             "subscription provided is subscribed to the topic provided."
         )
-        subscription.close()
+        return
+
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    histogram_buckets = (
+        job.risk_details.l_diversity_result.sensitive_value_frequency_histogram_buckets  # noqa: E501
+    )
+    # Print bucket stats
+    for i, bucket in enumerate(histogram_buckets):
+        print(f"Bucket {i}:")
+        print(
+            "   Bucket size range: [{}, {}]".format(
+                bucket.sensitive_value_frequency_lower_bound,
+                bucket.sensitive_value_frequency_upper_bound,
+            )
+        )
+        for value_bucket in bucket.bucket_values:
+            print(
+                "   Quasi-ID values: {}".format(
+                    map(get_values, value_bucket.quasi_ids_values)
+                )
+            )
+            print(f"   Class size: {value_bucket.equivalence_class_size}")
+            for value in value_bucket.top_sensitive_values:
+                print(
+                    "   Sensitive value {} occurs {} time(s)".format(
+                        value.value, value.count
+                    )
+                )
 
 
 # [END dlp_l_diversity]
@@ -675,12 +617,13 @@ def l_diversity_analysis(
 
 # [START dlp_k_map]
 from typing import List  # noqa: I100, E402
-import concurrent.futures  # noqa: I100, F811, E402
 
 import google.cloud.dlp  # noqa: I100, F811, E402
 from google.cloud.dlp_v2 import types  # noqa: I100, F811, E402
 import google.cloud.pubsub  # noqa: I100, F811, E402
 
+import job_waiter  # noqa: F811, I100, E402
+
 
 def k_map_estimate_analysis(
     project: str,
@@ -740,10 +683,8 @@ def k_map_estimate_analysis(
 
     # Check that numbers of quasi-ids and info types are equal
     if len(quasi_ids) != len(info_types):
-        raise ValueError(
-            """Number of infoTypes and number of quasi-identifiers
-                            must be equal!"""
-        )
+        raise ValueError("""Number of infoTypes and number of quasi-identifiers
+                            must be equal!""")
 
     # Convert quasi id list to Protobuf type
     def map_fields(quasi_id: str, info_type: str) -> dict:
@@ -770,59 +711,184 @@ def k_map_estimate_analysis(
     # Call API to start risk analysis job
     operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
 
-    def callback(message: google.cloud.pubsub_v1.subscriber.message.Message) -> None:
-        if message.attributes["DlpJobName"] == operation.name:
-            # This is the message we're looking for, so acknowledge it.
-            message.ack()
+    # Wait for the job to finish. All the jobs in this process share a single
+    # subscriber, which routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+    try:
+        job = waiter.wait(operation.name, timeout)
+    except TimeoutError:
+        print(
+            "No event received before the timeout. Please verify that the "
+            "subscription provided is subscribed to the topic provided."
+        )
+        return
 
-            # Now that the job is done, fetch the results and print them.
-            job = dlp.get_dlp_job(request={"name": operation.name})
-            print(f"Job name: {job.name}")
-            histogram_buckets = (
-                job.risk_details.k_map_estimation_result.k_map_estimation_histogram
+    # Now that the job is done, print the results.
+    print(f"Job name: {job.name}")
+    histogram_buckets = (
+        job.risk_details.k_map_estimation_result.k_map_estimation_histogram
+    )
+    # Print bucket stats
+    for i, bucket in enumerate(histogram_buckets):
+        print(f"Bucket {i}:")
+        print(
+            "   Anonymity range: [{}, {}]".format(
+                bucket.min_anonymity, bucket.max_anonymity
             )
-            # Print bucket stats
-            for i, bucket in enumerate(histogram_buckets):
-                print(f"Bucket {i}:")
-                print(
-                    "   Anonymity range: [{}, {}]".format(
-                        bucket.min_anonymity, bucket.max_anonymity
-                    )
+        )
+        print(f"   Size: {bucket.bucket_size}")
+        for value_bucket in bucket.bucket_values:
+            print(
+                "   Values: {}".format(map(get_values, value_bucket.quasi_ids_values))
+            )
+            print(
+                "   Estimated k-map anonymity: {}".format(
+                    value_bucket.estimated_anonymity
                 )
-                print(f"   Size: {bucket.bucket_size}")
-                for value_bucket in bucket.bucket_values:
-                    print(
-                        "   Values: {}".format(
-                            map(get_values, value_bucket.quasi_ids_values)
-                        )
-                    )
-                    print(
-                        "   Estimated k-map anonymity: {}".format(
-                            value_bucket.estimated_anonymity
-                        )
-                    )
-            subscription.set_result(None)
-        else:
-            # This is not the message we're looking for.
-            message.drop()
+            )
+
+
+# [END dlp_k_map]
+
+
+import asyncio  # noqa: I100, F811, E402
+from typing import List, Optional  # noqa: I100, F811, E402
+
+import google.cloud.dlp  # noqa: I100, F811, E402
+import google.cloud.pubsub  # noqa: I100, F811, E402
+
+import job_waiter  # noqa: F811, I100, E402
+
+
+def k_anonymity_analysis_many(
+    project: str,
+    table_project_id: str,
+    dataset_id: str,
+    table_id: str,
+    topic_id: str,
+    subscription_id: str,
+    quasi_id_sets: List[List[str]],
+    timeout: int = 300,
+) -> None:
+    """Uses the Data Loss Prevention API to compute the k-anonymity of many
+        column sets in a Google BigQuery table concurrently.
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        table_project_id: The Google Cloud project id where the BigQuery table
+            is stored.
+        dataset_id: The id of the dataset to inspect.
+        table_id: The id of the table to inspect.
+        topic_id: The name of the Pub/Sub topic to notify once the jobs
+            complete.
+        subscription_id: The name of the Pub/Sub subscription to use when
+            listening for job completion notifications.
+        quasi_id_sets: The column sets to compute the k-anonymity for, each
+            one forms a composite key.
+        timeout: The number of seconds to wait for the jobs.
+
+    Returns:
+        None; the response from the API is printed to the terminal.
+    """
+    dlp = google.cloud.dlp_v2.DlpServiceClient()
+    topic = google.cloud.pubsub.PublisherClient.topic_path(project, topic_id)
+    parent = f"projects/{project}/locations/global"
+    source_table = {
+        "project_id": table_project_id,
+        "dataset_id": dataset_id,
+        "table_id": table_id,
+    }
+
+    # Start all the jobs, they all notify the same topic.
+    job_names = []
+    for quasi_ids in quasi_id_sets:
+        risk_job = {
+            "privacy_metric": {
+                "k_anonymity_config": {
+                    "quasi_ids": [{"name": field} for field in quasi_ids]
+                }
+            },
+            "source_table": source_table,
+            "actions": [{"pub_sub": {"topic": topic}}],
+        }
+        operation = dlp.create_dlp_job(request={"parent": parent, "risk_job": risk_job})
+        job_names.append(operation.name)
 
-    # Create a Pub/Sub client and find the subscription. The subscription is
-    # expected to already be listening to the topic.
-    subscriber = google.cloud.pubsub.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project, subscription_id)
-    subscription = subscriber.subscribe(subscription_path, callback)
+    # A single subscriber routes each notification to the job waiting for it.
+    waiter = job_waiter.get_job_waiter(project, subscription_id)
+
+    async def wait_all() -> List[google.cloud.dlp_v2.DlpJob]:
+        return await asyncio.gather(
+            *(waiter.wait_async(name, timeout) for name in job_names)
+        )
 
     try:
-        subscription.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
-        print(
-            "No event received before the timeout. Please verify that the "
-            "subscription provided is subscribed to the topic provided."
+        jobs = asyncio.run(wait_all())
+    except TimeoutError:
+        print("Not all the jobs were done before the timeout.")
+        return
+
+    for quasi_ids, job in zip(quasi_id_sets, jobs):
+        print(f"Job name: {job.name}")
+        print(f"   Quasi-IDs: {', '.join(quasi_ids)}")
+        histogram_buckets = (
+            job.risk_details.k_anonymity_result.equivalence_class_histogram_buckets
         )
-        subscription.close()
+        for i, bucket in enumerate(histogram_buckets):
+            print(f"   Bucket {i}:")
+            print(
+                "      Bucket size range: [{}, {}]".format(
+                    bucket.equivalence_class_size_lower_bound,
+                    bucket.equivalence_class_size_upper_bound,
+                )
+            )
+            print(f"      Equivalence classes: {bucket.bucket_size}")
 
 
-# [END dlp_k_map]
+import local_risk  # noqa: I100, E402
+
+
+def k_anonymity_local_estimate(
+    table_project_id: str,
+    dataset_id: str,
+    table_id: str,
+    quasi_ids: List[str],
+    sample_percent: Optional[float] = None,
+) -> None:
+    """Estimates the k-anonymity of a column set in a Google BigQuery table
+        locally, without a Data Loss Prevention job.
+    Args:
+        table_project_id: The Google Cloud project id where the BigQuery table
+            is stored.
+        dataset_id: The id of the dataset to inspect.
+        table_id: The id of the table to inspect.
+        quasi_ids: A set of columns that form a composite key.
+        sample_percent: Optional percentage of the table to sample.
+
+    Returns:
+        None; the estimate is printed to the terminal.
+    """
+    frames = local_risk.read_bigquery_table(
+        table_project_id, dataset_id, table_id, quasi_ids, sample_percent
+    )
+    histogram_buckets = local_risk.k_anonymity_histogram(frames, quasi_ids)
+    for i, bucket in enumerate(histogram_buckets):
+        print(f"Bucket {i}:")
+        print(
+            "   Bucket size range: [{}, {}]".format(
+                bucket.equivalence_class_size_lower_bound,
+                bucket.equivalence_class_size_upper_bound,
+            )
+        )
+        for value_bucket in bucket.bucket_values:
+            print(
+                "   Quasi-ID values: {}".format(
+                    [
+                        local_risk.from_value(value)
+                        for value in value_bucket.quasi_ids_values
+                    ]
+                )
+            )
+            print(f"   Class size: {value_bucket.equivalence_class_size}")
 
 
 if __name__ == "__main__":
@@ -932,6 +998,73 @@ if __name__ == "__main__":
         help="The number of seconds to wait for a response from the API.",
     )
 
+    k_anonymity_many_parser = subparsers.add_parser(
+        "k_anonymity_many",
+        help="Computes the k-anonymity of many column sets in a Google BigQuery "
+        "table concurrently.",
+    )
+    k_anonymity_many_parser.add_argument(
+        "project",
+        help="The Google Cloud project id to use as a parent resource.",
+    )
+    k_anonymity_many_parser.add_argument(
+        "table_project_id",
+        help="The Google Cloud project id where the BigQuery table is stored.",
+    )
+    k_anonymity_many_parser.add_argument(
+        "dataset_id", help="The id of the dataset to inspect."
+    )
+    k_anonymity_many_parser.add_argument(
+        "table_id", help="The id of the table to inspect."
+    )
+    k_anonymity_many_parser.add_argument(
+        "topic_id",
+        help="The name of the Pub/Sub topic to notify once the jobs complete.",
+    )
+    k_anonymity_many_parser.add_argument(
+        "subscription_id",
+        help="The name of the Pub/Sub subscription to use when listening for "
+        "job completion notifications.",
+    )
+    k_anonymity_many_parser.add_argument(
+        "quasi_id_sets",
+        nargs="+",
+        help="The column sets to compute the k-anonymity for, each one as "
+        'comma-separated columns, like "Age,Gender".',
+    )
+    k_anonymity_many_parser.add_argument(
+        "--timeout",
+        type=int,
+        default=300,
+        help="The number of seconds to wait for the jobs.",
+    )
+
+    k_anonymity_local_parser = subparsers.add_parser(
+        "k_anonymity_local",
+        help="Estimates the k-anonymity of a column set in a Google BigQuery "
+        "table locally.",
+    )
+    k_anonymity_local_parser.add_argument(
+        "table_project_id",
+        help="The Google Cloud project id where the BigQuery table is stored.",
+    )
+    k_anonymity_local_parser.add_argument(
+        "dataset_id", help="The id of the dataset to inspect."
+    )
+    k_anonymity_local_parser.add_argument(
+        "table_id", help="The id of the table to inspect."
+    )
+    k_anonymity_local_parser.add_argument(
+        "quasi_ids",
+        nargs="+",
+        help="A set of columns that form a composite key.",
+    )
+    k_anonymity_local_parser.add_argument(
+        "--sample_percent",
+        type=float,
+        help="The percentage of the table to sample.",
+    )
+
     k_anonymity_entity_parser = subparsers.add_parser(
         "k_anonymity_w_entity",
         help="Computes the k-anonymity of a column set in a Google BigQuery table.",
@@ -1100,6 +1233,25 @@ if __name__ == "__main__":
             args.quasi_ids,
             timeout=args.timeout,
         )
+    elif args.content == "k_anonymity_many":
+        k_anonymity_analysis_many(
+            args.project,
+            args.table_project_id,
+            args.dataset_id,
+            args.table_id,
+            args.topic_id,
+            args.subscription_id,
+            [quasi_ids.split(",") for quasi_ids in args.quasi_id_sets],
+            timeout=args.timeout,
+        )
+    elif args.content == "k_anonymity_local":
+        k_anonymity_local_estimate(
+            args.table_project_id,
+            args.dataset_id,
+            args.table_id,
+            args.quasi_ids,
+            sample_percent=args.sample_percent,
+        )
     elif args.content == "k_anonymity_w_entity":
         k_anonymity_with_entity_id(
             args.project,
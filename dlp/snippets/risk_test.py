@@ -271,6 +271,44 @@ def test_k_anonymity_analysis_single_field(
             DLP_CLIENT.delete_dlp_job(name=job_name)
 
 
+@pytest.mark.flaky(max_runs=3, min_passes=1)
+def test_k_anonymity_analysis_many(
+    topic_id: str,
+    subscription_id: str,
+    capsys: pytest.CaptureFixture,
+) -> None:
+    risk.k_anonymity_analysis_many(
+        GCLOUD_PROJECT,
+        TABLE_PROJECT,
+        BIGQUERY_DATASET_ID,
+        BIGQUERY_HARMFUL_TABLE_ID,
+        topic_id,
+        subscription_id,
+        [[NUMERIC_FIELD], [NUMERIC_FIELD, REPEATED_FIELD]],
+    )
+
+    out, _ = capsys.readouterr()
+    assert out.count("Job name:") == 2
+    assert "Bucket size range:" in out
+    for line in str(out).split("\n"):
+        if "Job name" in line:
+            job_name = line.split(":")[1].strip()
+            DLP_CLIENT.delete_dlp_job(name=job_name)
+
+
+def test_k_anonymity_local_estimate(capsys: pytest.CaptureFixture) -> None:
+    risk.k_anonymity_local_estimate(
+        TABLE_PROJECT,
+        BIGQUERY_DATASET_ID,
+        BIGQUERY_HARMFUL_TABLE_ID,
+        [NUMERIC_FIELD, REPEATED_FIELD],
+    )
+
+    out, _ = capsys.readouterr()
+    assert "Quasi-ID values:" in out
+    assert "Class size:" in out
+
+
 @pytest.mark.flaky(max_runs=3, min_passes=1)
 def test_k_anonymity_analysis_multiple_fields(
     topic_id: str,
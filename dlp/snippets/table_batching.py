@@ -0,0 +1,250 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers to send large tables to the Data Loss Prevention API.
+
+The API limits the size of each request, so tables are split into chunks of
+rows just under that limit, and the chunks are sent concurrently with a single
+shared client. The results are put back together in the original row order.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import google.cloud.dlp
+
+import prescreen
+
+T = TypeVar("T")
+
+# The API accepts requests up to 0.5 MB, this leaves room for the configs.
+MAX_REQUEST_BYTES = 400 * 1024
+# The API accepts tables with up to 50,000 cells in each request.
+MAX_TABLE_VALUES = 50000
+MAX_WORKERS = 8
+
+
+@functools.lru_cache(maxsize=None)
+def get_client() -> google.cloud.dlp_v2.DlpServiceClient:
+    """Gets a client shared by all the requests, clients are thread-safe."""
+    return google.cloud.dlp_v2.DlpServiceClient()
+
+
+def _field_size(num_bytes: int) -> int:
+    """Size of a length-delimited protobuf field: tag + length + data."""
+    return 1 + len(_varint(num_bytes)) + num_bytes
+
+
+def _varint(value: int) -> bytes:
+    data = bytearray()
+    while True:
+        data.append(value & 0x7F | (0x80 if value > 0x7F else 0))
+        value >>= 7
+        if not value:
+            return bytes(data)
+
+
+def row_size(row: List[str]) -> int:
+    """Computes the serialized size of a table row in bytes.
+
+    Args:
+        row: The row's cell values.
+
+    Returns:
+        The number of bytes the row takes in the request's table.
+    """
+    # Each cell is a Value message with a single string_value field.
+    values_size = sum(
+        _field_size(_field_size(len(cell.encode("utf-8")))) for cell in row
+    )
+    return _field_size(values_size)
+
+
+def split_rows(
+    rows: List[List[str]],
+    max_bytes: int = MAX_REQUEST_BYTES,
+    max_rows: Optional[int] = None,
+) -> Iterator[Tuple[int, List[List[str]]]]:
+    """Packs consecutive rows into chunks just under the request limits.
+
+    Args:
+        rows: The table rows, as lists of cell values.
+        max_bytes: The maximum size of the rows in each chunk.
+        max_rows: The maximum number of rows in each chunk, no limit if None.
+
+    Yields:
+        (start, rows) pairs, where `start` is the index of the chunk's first
+        row in the original table. A row larger than `max_bytes` goes into a
+        chunk by itself, the API will reject it.
+    """
+    start, chunk, chunk_size = (0, [], 0)
+    for i, row in enumerate(rows):
+        size = row_size(row)
+        if chunk and (
+            chunk_size + size > max_bytes
+            or (max_rows is not None and len(chunk) >= max_rows)
+        ):
+            yield (start, chunk)
+            start, chunk, chunk_size = (i, [], 0)
+        chunk.append(row)
+        chunk_size += size
+    if chunk:
+        yield (start, chunk)
+
+
+def map_table(
+    request_fn: Callable[[Dict], T],
+    header: List[str],
+    rows: List[List[str]],
+    max_bytes: int = MAX_REQUEST_BYTES,
+    max_workers: int = MAX_WORKERS,
+) -> List[Tuple[int, T]]:
+    """Calls a function concurrently on chunks of a table.
+
+    Args:
+        request_fn: Function that makes a request for a `table` item.
+        header: The table's column names.
+        rows: The table rows, as lists of cell values.
+        max_bytes: The maximum size of the rows in each request.
+        max_workers: The maximum number of concurrent requests.
+
+    Returns:
+        A list of (start, result) pairs in the original row order, where
+        `start` is the index of the chunk's first row.
+    """
+    headers = [{"name": name} for name in header]
+    max_rows = max(MAX_TABLE_VALUES // max(len(header), 1), 1)
+
+    def to_table(chunk: List[List[str]]) -> Dict:
+        return {
+            "headers": headers,
+            "rows": [
+                {"values": [{"string_value": cell} for cell in row]} for row in chunk
+            ],
+        }
+
+    chunks = list(split_rows(rows, max_bytes, max_rows))
+    with ThreadPoolExecutor(max_workers) as executor:
+        results = executor.map(
+            lambda chunk: request_fn(to_table(chunk)), [chunk for _, chunk in chunks]
+        )
+        return [(start, result) for (start, _), result in zip(chunks, results)]
+
+
+def inspect_table(
+    project: str,
+    header: List[str],
+    rows: List[List[str]],
+    inspect_config: Dict,
+    max_bytes: int = MAX_REQUEST_BYTES,
+    max_workers: int = MAX_WORKERS,
+    prescreener: Optional[prescreen.Prescreener] = None,
+) -> List[google.cloud.dlp_v2.Finding]:
+    """Inspects a table of any size for sensitive data.
+
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        header: The table's column names.
+        rows: The table rows, as lists of cell values.
+        inspect_config: The inspect configuration for every request.
+        max_bytes: The maximum size of the rows in each request.
+        max_workers: The maximum number of concurrent requests.
+        prescreener: Optional prescreener to skip rows that can't have findings.
+
+    Returns:
+        The findings of all the requests, where each finding's row index
+        refers to the original table.
+    """
+    dlp = get_client()
+    parent = f"projects/{project}"
+
+    def inspect(table: Dict) -> List[google.cloud.dlp_v2.Finding]:
+        response = dlp.inspect_content(
+            request={
+                "parent": parent,
+                "inspect_config": inspect_config,
+                "item": {"table": table},
+            }
+        )
+        return list(response.result.findings)
+
+    # Keep track of the original index of the rows that are sent.
+    row_indices = [
+        i
+        for i, row in enumerate(rows)
+        if prescreener is None or prescreener.might_match(*row)
+    ]
+    if len(row_indices) < len(rows):
+        rows = [rows[i] for i in row_indices]
+
+    findings = []
+    for start, chunk_findings in map_table(
+        inspect, header, rows, max_bytes, max_workers
+    ):
+        for finding in chunk_findings:
+            for content_location in finding.location.content_locations:
+                table_location = content_location.record_location.table_location
+                table_location.row_index = row_indices[start + table_location.row_index]
+            findings.append(finding)
+    return findings
+
+
+def deidentify_table(
+    project: str,
+    header: List[str],
+    rows: List[List[str]],
+    deidentify_config: Dict,
+    inspect_config: Optional[Dict] = None,
+    max_bytes: int = MAX_REQUEST_BYTES,
+    max_workers: int = MAX_WORKERS,
+) -> List[List[str]]:
+    """De-identifies a table of any size.
+
+    Args:
+        project: The Google Cloud project id to use as a parent resource.
+        header: The table's column names.
+        rows: The table rows, as lists of cell values.
+        deidentify_config: The de-identify configuration for every request.
+        inspect_config: The optional inspect configuration for every request.
+        max_bytes: The maximum size of the rows in each request.
+        max_workers: The maximum number of concurrent requests.
+
+    Returns:
+        The de-identified rows in the original order, as lists of cell values.
+    """
+    dlp = get_client()
+    parent = f"projects/{project}"
+
+    def deidentify(table: Dict) -> List[List[str]]:
+        response = dlp.deidentify_content(
+            request={
+                "parent": parent,
+                "deidentify_config": deidentify_config,
+                "inspect_config": inspect_config,
+                "item": {"table": table},
+            }
+        )
+        return [
+            [value.string_value for value in row.values]
+            for row in response.item.table.rows
+        ]
+
+    return [
+        row
+        for _, chunk_rows in map_table(deidentify, header, rows, max_bytes, max_workers)
+        for row in chunk_rows
+    ]
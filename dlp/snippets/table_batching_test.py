@@ -0,0 +1,76 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import google.cloud.dlp_v2
+
+import table_batching
+
+GCLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
+
+
+def test_row_size() -> None:
+    row = ["robertfrost@xyz.com", "4232342345", ""]
+    table = google.cloud.dlp_v2.Table(
+        rows=[{"values": [{"string_value": cell} for cell in row]}]
+    )
+    assert (
+        table_batching.row_size(row) == google.cloud.dlp_v2.Table.pb(table).ByteSize()
+    )
+
+
+def test_split_rows() -> None:
+    rows = [["a" * 100] for _ in range(10)]
+    row_size = table_batching.row_size(rows[0])
+
+    chunks = list(table_batching.split_rows(rows, max_bytes=3 * row_size))
+
+    assert [(start, len(chunk)) for start, chunk in chunks] == [
+        (0, 3),
+        (3, 3),
+        (6, 3),
+        (9, 1),
+    ]
+
+
+def test_map_table_max_values() -> None:
+    header = [str(i) for i in range(10)]
+    rows = [["a"] * len(header) for _ in range(100000)]
+
+    results = table_batching.map_table(
+        lambda table: len(table["rows"]) * len(table["headers"]), header, rows
+    )
+
+    assert max(num_values for _, num_values in results) <= 50000
+    assert sum(num_values for _, num_values in results) == 100000 * len(header)
+
+
+def test_inspect_table() -> None:
+    rows = [["robertfrost@xyz.com"], ["nothing here"]] * 5
+    row_size = table_batching.row_size(rows[0])
+
+    findings = table_batching.inspect_table(
+        GCLOUD_PROJECT,
+        ["email"],
+        rows,
+        {"info_types": [{"name": "EMAIL_ADDRESS"}]},
+        max_bytes=2 * row_size,
+    )
+
+    row_indices = sorted(
+        finding.location.content_locations[0].record_location.table_location.row_index
+        for finding in findings
+    )
+    assert row_indices == [0, 2, 4, 6, 8]
@@ -0,0 +1,618 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Transfers whole DICOM studies with DICOMweb.
+
+Studies are retrieved as a multipart/related stream, which is split into
+DICOM instance files as it's downloaded, so a study never needs to fit in
+memory. The series of a study can also be retrieved in parallel.
+
+Directories of DICOM files are stored with concurrent STOW-RS requests, each
+one with a batch of instances of the same study. The files are streamed into
+the requests, and the status of each instance is read from the responses.
+Requests that fail with a transient status, like 429 or 503, or that fail to
+connect are retried with exponential backoff. Files that can't be read or
+stored are reported as failed, and the rest are still stored.
+
+For example:
+
+    python dicomweb_bulk.py --dataset_id=my-dataset --dicom_store_id=my-store \\
+        retrieve-study --study_uid=1.2.3 --output_dir=study/ --parallel_series
+
+    python dicomweb_bulk.py --dataset_id=my-dataset --dicom_store_id=my-store \\
+        store-instances path/to/archive/
+"""
+
+import argparse
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import dataclasses
+import email.message
+import os
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import uuid
+
+from google.auth.transport.requests import AuthorizedSession
+import pydicom
+import pydicom.errors
+import requests
+
+import healthcare_client
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_BATCH_BYTES = 64 * 1024 * 1024  # 64 MB
+MAX_WORKERS = 8
+MAX_OPEN_BATCHES = 100
+MAX_ATTEMPTS = 5
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+DICOM_MULTIPART = 'multipart/related; type="application/dicom"; transfer-syntax=*'
+SERIES_INSTANCE_UID = "0020000E"
+FAILED_SOP_SEQUENCE = "00081198"
+REFERENCED_SOP_SEQUENCE = "00081199"
+REFERENCED_SOP_INSTANCE_UID = "00081155"
+FAILURE_REASON = "00081197"
+
+
+def dicomweb_url(
+    project_id: str, location: str, dataset_id: str, dicom_store_id: str
+) -> str:
+    """Returns the URL of a DICOM store's DICOMweb API."""
+    return (
+        f"{healthcare_client.BASE_URL}/projects/{project_id}/locations/{location}"
+        f"/datasets/{dataset_id}/dicomStores/{dicom_store_id}/dicomWeb"
+    )
+
+
+def content_type_param(content_type: str, param: str) -> Optional[str]:
+    """Gets a parameter of a Content-Type header, like the boundary."""
+    message = email.message.Message()
+    message["Content-Type"] = content_type
+    return message.get_param(param)
+
+
+def _parse_headers(data: bytes) -> dict:
+    headers = {}
+    for line in data.decode("latin-1").split("\r\n"):
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def iter_multipart(
+    chunks: Iterable[bytes], boundary: str
+) -> Iterator[Union[dict, bytes]]:
+    """Parses a multipart body incrementally, as the chunks arrive.
+
+    Args:
+      chunks: The body, in chunks of any size.
+      boundary: The boundary parameter of the body's Content-Type.
+
+    Yields:
+      For each part, a dict with its headers in lowercase, followed by its
+      content in one or more bytes chunks.
+    """
+    # A leading CRLF makes the first delimiter look like all the others.
+    delimiter = b"\r\n--" + boundary.encode("latin-1")
+    buffer = b"\r\n"
+    in_part = False
+    chunks = iter(chunks)
+    while True:
+        if in_part:
+            end = buffer.find(delimiter)
+            if end < 0:
+                # Keep enough bytes to find a delimiter split between chunks.
+                keep = len(delimiter) - 1
+                if len(buffer) > keep:
+                    yield buffer[:-keep]
+                    buffer = buffer[-keep:]
+            else:
+                if end:
+                    yield buffer[:end]
+                buffer = buffer[end:]
+                in_part = False
+                continue
+        else:
+            start = buffer.find(delimiter)
+            if start >= 0:
+                after = start + len(delimiter)
+                if buffer[after : after + 2] == b"--":
+                    return  # this is the closing delimiter
+                headers_end = buffer.find(b"\r\n\r\n", after)
+                if headers_end >= 0:
+                    yield _parse_headers(buffer[after:headers_end])
+                    buffer = buffer[headers_end + 4 :]
+                    in_part = True
+                    continue
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        buffer += chunk
+
+
+def save_multipart(response: requests.Response, output_dir: str) -> List[str]:
+    """Writes each part of a multipart response to its own file as it arrives.
+
+    Args:
+      response: A streamed response, like from `session.get(url, stream=True)`.
+      output_dir: The directory to write the files to.
+
+    Returns:
+      The paths of the files, numbered in order like "00000.dcm".
+    """
+    boundary = content_type_param(response.headers["Content-Type"], "boundary")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    f = None
+    try:
+        for item in iter_multipart(response.iter_content(CHUNK_SIZE), boundary):
+            if isinstance(item, dict):
+                if f:
+                    f.close()
+                paths.append(os.path.join(output_dir, f"{len(paths):05d}.dcm"))
+                f = open(paths[-1], "wb")
+            else:
+                f.write(item)
+    finally:
+        if f:
+            f.close()
+        response.close()
+    return paths
+
+
+def list_series(session: AuthorizedSession, url: str, study_uid: str) -> List[str]:
+    """Lists the series UIDs in a study.
+
+    Args:
+      session: The session for the requests.
+      url: The URL of the DICOM store's DICOMweb API.
+      study_uid: The study UID.
+
+    Returns:
+      The series UIDs.
+    """
+    response = session.get(
+        f"{url}/studies/{study_uid}/series",
+        params={"includefield": SERIES_INSTANCE_UID},
+        headers={"Accept": "application/dicom+json"},
+    )
+    response.raise_for_status()
+    return [series[SERIES_INSTANCE_UID]["Value"][0] for series in response.json()]
+
+
+def retrieve_study(
+    project_id: str,
+    location: str,
+    dataset_id: str,
+    dicom_store_id: str,
+    study_uid: str,
+    output_dir: str,
+    parallel_series: bool = False,
+    max_workers: int = MAX_WORKERS,
+) -> List[str]:
+    """Retrieves a study and writes each instance to a .dcm file.
+
+    Args:
+      project_id: The project ID or project number of the Cloud project you want
+        to use.
+      location: The name of the parent dataset's location.
+      dataset_id: The name of the parent dataset.
+      dicom_store_id: The name of the DICOM store.
+      study_uid: The study UID.
+      output_dir: The directory to write the files to.
+      parallel_series: Whether to retrieve the series in parallel, each one
+        into its own subdirectory named after the series UID.
+      max_workers: The maximum number of concurrent requests.
+
+    Returns:
+      The paths of the instance files.
+    """
+    session = healthcare_client.get_session(max_workers)
+    url = dicomweb_url(project_id, location, dataset_id, dicom_store_id)
+    study_url = f"{url}/studies/{study_uid}"
+
+    def retrieve(url: str, output_dir: str) -> List[str]:
+        response = session.get(url, headers={"Accept": DICOM_MULTIPART}, stream=True)
+        response.raise_for_status()
+        return save_multipart(response, output_dir)
+
+    if not parallel_series:
+        return retrieve(study_url, output_dir)
+
+    series_uids = list_series(session, url, study_uid)
+    with ThreadPoolExecutor(max_workers) as executor:
+        results = executor.map(
+            lambda series_uid: retrieve(
+                f"{study_url}/series/{series_uid}",
+                os.path.join(output_dir, series_uid),
+            ),
+            series_uids,
+        )
+        return [path for paths in results for path in paths]
+
+
+@dataclasses.dataclass
+class Instance:
+    """A DICOM instance file to store.
+
+    Attributes:
+      path: The path of the .dcm file.
+      study_uid: The instance's StudyInstanceUID.
+      sop_instance_uid: The instance's SOPInstanceUID.
+      size: The size of the file in bytes.
+    """
+
+    path: str
+    study_uid: str
+    sop_instance_uid: str
+    size: int
+
+
+@dataclasses.dataclass
+class InstanceStatus:
+    """The outcome of storing an instance.
+
+    Attributes:
+      path: The path of the .dcm file.
+      sop_instance_uid: The instance's SOPInstanceUID.
+      stored: Whether the instance was stored.
+      failure_reason: If it wasn't stored, the DICOM failure reason code from
+        the STOW-RS response, or the HTTP status code if there's none.
+      error: If it wasn't stored because of an error, like an invalid file or
+        a connection error, a description of the error.
+    """
+
+    path: str
+    sop_instance_uid: str
+    stored: bool
+    failure_reason: Optional[int] = None
+    error: Optional[str] = None
+
+
+def read_instance(path: str) -> Instance:
+    """Reads the UIDs of a DICOM file, without reading the pixel data."""
+    dataset = pydicom.dcmread(
+        path,
+        stop_before_pixels=True,
+        specific_tags=["StudyInstanceUID", "SOPInstanceUID"],
+    )
+    return Instance(
+        path,
+        dataset.StudyInstanceUID,
+        dataset.SOPInstanceUID,
+        os.path.getsize(path),
+    )
+
+
+def iter_files(paths: Iterable[str]) -> Iterator[str]:
+    """Yields the .dcm files in files and directories, recursively."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".dcm"):
+                    yield os.path.join(root, name)
+
+
+def batch_by_study(
+    instances: Iterable[Instance],
+    max_batch_bytes: int = MAX_BATCH_BYTES,
+    max_open_batches: int = MAX_OPEN_BATCHES,
+) -> Iterator[List[Instance]]:
+    """Groups instances of the same study into batches up to a size.
+
+    Args:
+      instances: The instances to batch.
+      max_batch_bytes: The maximum size of the files in each batch. A file
+        larger than this goes into a batch by itself.
+      max_open_batches: The maximum number of studies with a batch being
+        filled. When a new study would go over it, the oldest batch is
+        yielded, so archives with many interleaved studies use bounded memory.
+
+    Yields:
+      Batches of instances, all of them from the same study.
+    """
+    batches: Dict[str, List[Instance]] = {}
+    sizes: Dict[str, int] = {}
+    for instance in instances:
+        study_uid = instance.study_uid
+        if study_uid in batches and sizes[study_uid] + instance.size > max_batch_bytes:
+            yield batches.pop(study_uid)
+            del sizes[study_uid]
+        if study_uid not in batches:
+            if len(batches) >= max_open_batches:
+                # Dicts keep their insertion order, so this is the oldest batch.
+                oldest = next(iter(batches))
+                yield batches.pop(oldest)
+                del sizes[oldest]
+            batches[study_uid] = []
+            sizes[study_uid] = 0
+        batches[study_uid].append(instance)
+        sizes[study_uid] += instance.size
+    yield from batches.values()
+
+
+def iter_multipart_body(paths: Iterable[str], boundary: str) -> Iterator[bytes]:
+    """Streams DICOM files as a multipart/related body, one chunk at a time."""
+    for path in paths:
+        yield b"--%s\r\nContent-Type: application/dicom\r\n\r\n" % boundary.encode()
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+        yield b"\r\n"
+    yield b"--%s--\r\n" % boundary.encode()
+
+
+def _sequence_uids(response: Dict, tag: str) -> Dict[str, Optional[int]]:
+    """Maps the SOP instance UIDs in a response sequence to failure reasons."""
+    return {
+        item[REFERENCED_SOP_INSTANCE_UID]["Value"][0]: (
+            item.get(FAILURE_REASON, {}).get("Value", [None])[0]
+        )
+        for item in response.get(tag, {}).get("Value", [])
+    }
+
+
+def _failed(batch: List[Instance], error: Exception) -> List[InstanceStatus]:
+    """Reports every instance in a batch as failed because of an error."""
+    return [
+        InstanceStatus(
+            instance.path,
+            instance.sop_instance_uid,
+            False,
+            error=f"{type(error).__name__}: {error}",
+        )
+        for instance in batch
+    ]
+
+
+def store_batch(
+    session: AuthorizedSession,
+    url: str,
+    batch: List[Instance],
+    max_attempts: int = MAX_ATTEMPTS,
+) -> List[InstanceStatus]:
+    """Stores a batch of instances of a study with a single STOW-RS request.
+
+    The request is retried with exponential backoff if it fails with a
+    transient status, like 429 or 503, or if it fails to connect.
+
+    Args:
+      session: The session for the requests.
+      url: The URL of the DICOM store's DICOMweb API.
+      batch: Instances of the same study.
+      max_attempts: The maximum number of times to try the request.
+
+    Returns:
+      The status of each instance in the batch.
+    """
+    for attempt in range(max_attempts):
+        if attempt:
+            time.sleep(2 ** (attempt - 1) + random.random())
+        # The body is a stream, so it's created again for every attempt.
+        boundary = uuid.uuid4().hex
+        try:
+            response = session.post(
+                f"{url}/studies/{batch[0].study_uid}",
+                data=iter_multipart_body(
+                    [instance.path for instance in batch], boundary
+                ),
+                headers={
+                    "Content-Type": "multipart/related; "
+                    f'type="application/dicom"; boundary={boundary}',
+                    "Accept": "application/dicom+json",
+                },
+            )
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt + 1 < max_attempts:
+                continue
+            return _failed(batch, e)
+        if response.status_code not in RETRYABLE_STATUSES:
+            break
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+
+    stored = _sequence_uids(body, REFERENCED_SOP_SEQUENCE)
+    failed = _sequence_uids(body, FAILED_SOP_SEQUENCE)
+    statuses = []
+    for instance in batch:
+        uid = instance.sop_instance_uid
+        if uid in stored:
+            statuses.append(InstanceStatus(instance.path, uid, True))
+        else:
+            reason = failed.get(uid) or response.status_code
+            statuses.append(InstanceStatus(instance.path, uid, False, reason))
+    return statuses
+
+
+def store_instances(
+    project_id: str,
+    location: str,
+    dataset_id: str,
+    dicom_store_id: str,
+    paths: Iterable[str],
+    max_batch_bytes: int = MAX_BATCH_BYTES,
+    max_workers: int = MAX_WORKERS,
+) -> Iterator[InstanceStatus]:
+    """Stores the DICOM files in files and directories with STOW-RS.
+
+    Args:
+      project_id: The project ID or project number of the Cloud project you want
+        to use.
+      location: The name of the parent dataset's location.
+      dataset_id: The name of the parent dataset.
+      dicom_store_id: The name of the DICOM store.
+      paths: DICOM files, and directories with .dcm files.
+      max_batch_bytes: The maximum size of the files in each request.
+      max_workers: The maximum number of concurrent requests.
+
+    Yields:
+      The status of each instance, as the requests complete. Files that
+      aren't valid DICOM files are reported as failed, without a request.
+    """
+    session = healthcare_client.get_session(max_workers)
+    url = dicomweb_url(project_id, location, dataset_id, dicom_store_id)
+
+    invalid: List[InstanceStatus] = []
+
+    def read_instances() -> Iterator[Instance]:
+        for path in iter_files(paths):
+            try:
+                instance = read_instance(path)
+            except (pydicom.errors.InvalidDicomError, OSError, AttributeError) as e:
+                # The file isn't a DICOM file, can't be read, or lacks the UIDs.
+                error = f"{type(e).__name__}: {e}"
+                invalid.append(InstanceStatus(path, "", False, error=error))
+                continue
+            yield instance
+
+    def results(batch: List[Instance], future: Future) -> List[InstanceStatus]:
+        try:
+            return future.result()
+        except Exception as e:
+            # Report the batch as failed and keep storing the rest.
+            return _failed(batch, e)
+
+    # Only a few batches are in flight at a time.
+    pending: collections.deque[Tuple[List[Instance], Future]] = collections.deque()
+    with ThreadPoolExecutor(max_workers) as executor:
+        for batch in batch_by_study(read_instances(), max_batch_bytes):
+            future = executor.submit(store_batch, session, url, batch)
+            pending.append((batch, future))
+            yield from invalid
+            invalid.clear()
+            if len(pending) >= 2 * max_workers:
+                yield from results(*pending.popleft())
+        yield from invalid
+        while pending:
+            yield from results(*pending.popleft())
+
+
+def parse_command_line_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        "--project_id",
+        default=(os.environ.get("GOOGLE_CLOUD_PROJECT")),
+        help="GCP project name",
+    )
+
+    parser.add_argument("--location", default="us-central1", help="GCP location")
+
+    parser.add_argument("--dataset_id", default=None, help="Name of dataset")
+
+    parser.add_argument("--dicom_store_id", default=None, help="Name of DICOM store")
+
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="The maximum number of concurrent requests.",
+    )
+
+    command = parser.add_subparsers(dest="command")
+
+    retrieve_parser = command.add_parser("retrieve-study", help=retrieve_study.__doc__)
+    retrieve_parser.add_argument(
+        "--study_uid", default=None, help="Unique identifier for a study."
+    )
+    retrieve_parser.add_argument(
+        "--output_dir", default=".", help="Directory to write the instances to."
+    )
+    retrieve_parser.add_argument(
+        "--parallel_series",
+        action="store_true",
+        help="Retrieve the series of the study in parallel.",
+    )
+
+    store_parser = command.add_parser("store-instances", help=store_instances.__doc__)
+    store_parser.add_argument(
+        "--max_batch_bytes",
+        type=int,
+        default=MAX_BATCH_BYTES,
+        help="The maximum size of the files in each request.",
+    )
+    store_parser.add_argument(
+        "paths", nargs="+", help="DICOM files, or directories with .dcm files."
+    )
+
+    parser.set_defaults(usage=parser.format_usage())
+
+    return parser.parse_args()
+
+
+def run_command(args):
+    """Calls the program using the specified command."""
+    if args.project_id is None:
+        print(
+            "You must specify a project ID or set the "
+            '"GOOGLE_CLOUD_PROJECT" environment variable.'
+        )
+        return
+
+    elif args.command == "retrieve-study":
+        paths = retrieve_study(
+            args.project_id,
+            args.location,
+            args.dataset_id,
+            args.dicom_store_id,
+            args.study_uid,
+            args.output_dir,
+            args.parallel_series,
+            args.max_workers,
+        )
+        print(f"Retrieved {len(paths)} instances to {args.output_dir}")
+
+    elif args.command == "store-instances":
+        stored, failed = (0, 0)
+        for status in store_instances(
+            args.project_id,
+            args.location,
+            args.dataset_id,
+            args.dicom_store_id,
+            args.paths,
+            args.max_batch_bytes,
+            args.max_workers,
+        ):
+            if status.stored:
+                stored += 1
+            else:
+                failed += 1
+                reason = status.error or status.failure_reason
+                print(f"Failed to store {status.path}: {reason}")
+        print(f"Stored {stored} instances, {failed} failed.")
+
+    else:
+        print(args.usage)
+
+
+def main():
+    args = parse_command_line_args()
+    run_command(args)
+
+
+if __name__ == "__main__":
+    main()
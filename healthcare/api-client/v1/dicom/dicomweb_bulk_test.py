@@ -0,0 +1,228 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+from unittest import mock
+
+import pytest
+import requests
+
+import dicomweb_bulk
+
+BOUNDARY = "c7f4a5b2"
+PARTS = [bytes(range(256)) * 4, b"", b"\r\n--c7f4a5b\r\n" * 10]
+BODY = (
+    b"".join(
+        b"--%s\r\nContent-Type: application/dicom\r\n\r\n%s\r\n"
+        % (BOUNDARY.encode(), part)
+        for part in PARTS
+    )
+    + b"--%s--\r\n" % BOUNDARY.encode()
+)
+
+
+def split(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, len(BODY)])
+def test_iter_multipart(chunk_size):
+    parts = []
+    for item in dicomweb_bulk.iter_multipart(split(BODY, chunk_size), BOUNDARY):
+        if isinstance(item, dict):
+            assert item == {"content-type": "application/dicom"}
+            parts.append(b"")
+        else:
+            parts[-1] += item
+
+    assert parts == PARTS
+
+
+def test_save_multipart(tmp_path):
+    response = mock.MagicMock()
+    response.headers = {
+        "Content-Type": f'multipart/related; type="application/dicom"; '
+        f"boundary={BOUNDARY}"
+    }
+    response.iter_content.return_value = split(BODY, 64)
+
+    paths = dicomweb_bulk.save_multipart(response, str(tmp_path))
+
+    assert [os.path.basename(path) for path in paths] == [
+        "00000.dcm",
+        "00001.dcm",
+        "00002.dcm",
+    ]
+    for path, part in zip(paths, PARTS):
+        with open(path, "rb") as f:
+            assert f.read() == part
+    response.close.assert_called_once()
+
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "resources")
+DCM_FILE = os.path.join(RESOURCES, "dicom_00000001_000.dcm")
+
+
+def test_read_instance():
+    instance = dicomweb_bulk.read_instance(DCM_FILE)
+
+    assert instance.study_uid.startswith("1.3.6.1.4.1.11129.5.5.")
+    assert instance.sop_instance_uid.startswith("1.3.6.1.4.1.11129.5.5.")
+    assert instance.size == os.path.getsize(DCM_FILE)
+
+
+def test_batch_by_study():
+    instances = [
+        dicomweb_bulk.Instance(f"{i}.dcm", study_uid, str(i), 10)
+        for i, study_uid in enumerate("ababaa")
+    ]
+
+    batches = list(dicomweb_bulk.batch_by_study(instances, max_batch_bytes=20))
+
+    assert [[instance.path for instance in batch] for batch in batches] == [
+        ["0.dcm", "2.dcm"],
+        ["1.dcm", "3.dcm"],
+        ["4.dcm", "5.dcm"],
+    ]
+
+
+def test_batch_by_study_max_open_batches():
+    instances = [
+        dicomweb_bulk.Instance(f"{i}.dcm", study_uid, str(i), 10)
+        for i, study_uid in enumerate("abcbc")
+    ]
+
+    batches = list(
+        dicomweb_bulk.batch_by_study(instances, max_batch_bytes=100, max_open_batches=2)
+    )
+
+    # Starting a batch for "c" yields the oldest open batch, for "a".
+    assert [[instance.path for instance in batch] for batch in batches] == [
+        ["0.dcm"],
+        ["1.dcm", "3.dcm"],
+        ["2.dcm", "4.dcm"],
+    ]
+
+
+def test_store_batch(tmp_path):
+    batch = []
+    for i, part in enumerate(PARTS):
+        path = tmp_path / f"{i}.dcm"
+        path.write_bytes(part)
+        batch.append(dicomweb_bulk.Instance(str(path), "1.2", f"1.2.{i}", len(part)))
+    session = mock.MagicMock()
+    session.post.return_value.status_code = 202
+    session.post.return_value.json.return_value = {
+        "00081199": {"vr": "SQ", "Value": [{"00081155": {"Value": ["1.2.0"]}}]},
+        "00081198": {
+            "vr": "SQ",
+            "Value": [{"00081155": {"Value": ["1.2.1"]}, "00081197": {"Value": [272]}}],
+        },
+    }
+
+    statuses = dicomweb_bulk.store_batch(session, "url", batch)
+
+    assert [(status.stored, status.failure_reason) for status in statuses] == [
+        (True, None),
+        (False, 272),
+        (False, 202),
+    ]
+    url = session.post.call_args.args[0]
+    assert url == "url/studies/1.2"
+    headers = session.post.call_args.kwargs["headers"]
+    boundary = dicomweb_bulk.content_type_param(headers["Content-Type"], "boundary")
+    body = session.post.call_args.kwargs["data"]
+    parts = [
+        item
+        for item in dicomweb_bulk.iter_multipart(body, boundary)
+        if not isinstance(item, dict)
+    ]
+    assert b"".join(parts) == b"".join(PARTS)
+
+
+def stored_response(*uids):
+    response = mock.MagicMock(status_code=200)
+    response.json.return_value = {
+        "00081199": {
+            "vr": "SQ",
+            "Value": [{"00081155": {"Value": [uid]}} for uid in uids],
+        },
+    }
+    return response
+
+
+@mock.patch("time.sleep")
+def test_store_batch_retries(sleep, tmp_path):
+    path = tmp_path / "0.dcm"
+    path.write_bytes(PARTS[0])
+    batch = [dicomweb_bulk.Instance(str(path), "1.2", "1.2.0", len(PARTS[0]))]
+    session = mock.MagicMock()
+    session.post.side_effect = [
+        requests.exceptions.ConnectionError("connection reset"),
+        mock.MagicMock(status_code=429),
+        stored_response("1.2.0"),
+    ]
+
+    statuses = dicomweb_bulk.store_batch(session, "url", batch)
+
+    assert [status.stored for status in statuses] == [True]
+    assert session.post.call_count == 3
+    assert sleep.call_count == 2
+
+
+@mock.patch("time.sleep")
+def test_store_batch_connection_error(sleep, tmp_path):
+    path = tmp_path / "0.dcm"
+    path.write_bytes(PARTS[0])
+    batch = [dicomweb_bulk.Instance(str(path), "1.2", "1.2.0", len(PARTS[0]))]
+    session = mock.MagicMock()
+    session.post.side_effect = requests.exceptions.ConnectionError("refused")
+
+    statuses = dicomweb_bulk.store_batch(session, "url", batch, max_attempts=2)
+
+    assert [(status.stored, status.error) for status in statuses] == [
+        (False, "ConnectionError: refused")
+    ]
+
+
+@mock.patch("healthcare_client.get_session")
+def test_store_instances_invalid_file(get_session, tmp_path):
+    with open(DCM_FILE, "rb") as f:
+        (tmp_path / "valid.dcm").write_bytes(f.read())
+    (tmp_path / "invalid.dcm").write_bytes(b"not a DICOM file")
+    instance = dicomweb_bulk.read_instance(DCM_FILE)
+    get_session.return_value.post.return_value = stored_response(
+        instance.sop_instance_uid
+    )
+
+    statuses = dicomweb_bulk.store_instances(
+        "project", "location", "dataset", "store", [str(tmp_path)]
+    )
+
+    assert sorted(
+        (os.path.basename(status.path), status.stored, status.error is None)
+        for status in statuses
+    ) == [("invalid.dcm", False, False), ("valid.dcm", True, True)]
+
+
+def test_run_command_without_command(capsys):
+    args = argparse.Namespace(
+        project_id="project", command=None, usage="usage: dicomweb_bulk.py"
+    )
+
+    dicomweb_bulk.run_command(args)
+
+    out, _ = capsys.readouterr()
+    assert "usage: dicomweb_bulk.py" in out
@@ -0,0 +1,65 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A shared Cloud Healthcare API session for processes that make many calls.
+
+The samples create a new client for every call, so each sample is complete
+on its own. The bulk transfer samples make many requests from many threads,
+so they get their session here instead, and the credentials and the
+connections are set up once and reused:
+
+- The credentials are loaded once, and their access token is shared and only
+  refreshed when it expires.
+- Connections are kept alive, in a connection pool shared by all threads.
+"""
+
+import functools
+
+import google.auth
+import google.auth.credentials
+from google.auth.transport.requests import AuthorizedSession
+import requests
+
+BASE_URL = "https://healthcare.googleapis.com/v1"
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+# Maximum number of connections kept alive by the session, this should be at
+# least the number of threads making concurrent requests.
+POOL_MAXSIZE = 32
+
+
+@functools.lru_cache(maxsize=None)
+def get_credentials() -> google.auth.credentials.Credentials:
+    """Gets the application default credentials, shared by all clients."""
+    credentials, _ = google.auth.default(scopes=SCOPES)
+    return credentials
+
+
+@functools.lru_cache(maxsize=None)
+def get_session(pool_maxsize: int = POOL_MAXSIZE) -> AuthorizedSession:
+    """Gets an authorized session shared by all threads.
+
+    Args:
+      pool_maxsize: The maximum number of connections kept alive.
+
+    Returns:
+      An authorized requests session for the Healthcare API REST endpoints,
+      like the DICOMweb and FHIR endpoints.
+    """
+    session = AuthorizedSession(get_credentials())
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize
+    )
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,448 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Loads many FHIR resources from files, in concurrent bundles.
+
+Resources are read as a stream from NDJSON files, with one resource per line,
+and JSON files, with a single resource or a Bundle. They are packed into batch
+or transaction bundles up to a size limit, and the bundles are executed
+concurrently.
+
+Resources with an ID are created or updated with PUT, so references to them
+work across bundles. Creating a resource with PUT requires the FHIR store to
+have enableUpdateCreate set, pass --no_update_create to create them with POST
+instead, which assigns new IDs.
+
+Entries that reference each other with "urn:uuid:" full URLs, like in a
+transaction Bundle file, are always kept in the same bundle. Only transactions
+resolve these references, so such groups are executed as their own
+transaction bundles even when loading with batch bundles.
+
+Failed entries with a transient status, like 429 or 503, and requests that
+fail to connect are retried with exponential backoff. For batch bundles, only
+the failed entries are retried, transaction bundles are retried as a whole.
+Entries that still fail are reported, and the load continues.
+
+For example:
+
+    python fhir_bulk_load.py --dataset_id=my-dataset --fhir_store_id=my-store \\
+        path/to/resources/
+"""
+
+import argparse
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import dataclasses
+import json
+import os
+import pathlib
+import random
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.auth.transport.requests import AuthorizedSession
+import requests
+
+import fhir_search
+import healthcare_client
+
+# The API accepts bundles up to 50 MB, smaller bundles spread the load better.
+MAX_BUNDLE_BYTES = 5 * 1024 * 1024
+MAX_BUNDLE_ENTRIES = 1000
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 5
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+Entry = Dict[str, Any]
+
+
+@dataclasses.dataclass
+class LoadResult:
+    """The outcome of a load.
+
+    Attributes:
+      succeeded: Number of entries that succeeded.
+      failed: (entry, status) pairs for the entries that failed, where the
+        status is like "400 Bad Request".
+    """
+
+    succeeded: int = 0
+    failed: List[Tuple[Entry, str]] = dataclasses.field(default_factory=list)
+
+
+def to_entry(
+    resource: Dict[str, Any],
+    full_url: Optional[str] = None,
+    update_create: bool = True,
+) -> Entry:
+    """Creates a bundle entry that creates or updates a resource.
+
+    Args:
+      resource: The FHIR resource.
+      full_url: The entry's full URL, if other entries reference it.
+      update_create: Whether resources with an ID are created or updated with
+        PUT, which requires enableUpdateCreate on the FHIR store. Otherwise
+        they are created with POST.
+
+    Returns:
+      The bundle entry.
+    """
+    entry = {"resource": resource}
+    if full_url:
+        entry["fullUrl"] = full_url
+    if "id" in resource and update_create:
+        url = f"{resource['resourceType']}/{resource['id']}"
+        entry["request"] = {"method": "PUT", "url": url}
+    else:
+        entry["request"] = {"method": "POST", "url": resource["resourceType"]}
+    return entry
+
+
+def _references(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "reference" and isinstance(item, str):
+                yield item
+            else:
+                yield from _references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _references(item)
+
+
+def group_entries(entries: List[Entry]) -> List[List[Entry]]:
+    """Groups entries that reference each other by "urn:uuid:" full URLs.
+
+    Args:
+      entries: The entries of a bundle.
+
+    Returns:
+      The groups of entries that must be in the same bundle, in order.
+    """
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    by_full_url = {
+        entry["fullUrl"]: i
+        for i, entry in enumerate(entries)
+        if entry.get("fullUrl", "").startswith("urn:uuid:")
+    }
+    for i, entry in enumerate(entries):
+        for reference in _references(entry.get("resource", {})):
+            if reference in by_full_url:
+                parent[find(i)] = find(by_full_url[reference])
+
+    groups = collections.defaultdict(list)
+    for i, entry in enumerate(entries):
+        groups[find(i)].append(entry)
+    return list(groups.values())
+
+
+def read_entries(
+    paths: Iterable[str], update_create: bool = True
+) -> Iterator[List[Entry]]:
+    """Reads the resources in files and directories as bundle entries.
+
+    Args:
+      paths: NDJSON and JSON files, and directories with such files.
+      update_create: Whether resources with an ID are created with PUT.
+
+    Yields:
+      Groups of entries that must be in the same bundle.
+    """
+    for path in paths:
+        path = pathlib.Path(path)
+        files = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for file in files:
+            if file.suffix == ".ndjson":
+                with open(file) as f:
+                    for line in f:
+                        if line.strip():
+                            yield [
+                                to_entry(json.loads(line), update_create=update_create)
+                            ]
+            elif file.suffix == ".json":
+                with open(file) as f:
+                    resource = json.load(f)
+                if resource["resourceType"] != "Bundle":
+                    yield [to_entry(resource, update_create=update_create)]
+                    continue
+                entries = [
+                    (
+                        entry
+                        if "request" in entry
+                        else to_entry(
+                            entry["resource"], entry.get("fullUrl"), update_create
+                        )
+                    )
+                    for entry in resource.get("entry", [])
+                ]
+                yield from group_entries(entries)
+
+
+def pack_bundles(
+    groups: Iterable[List[Entry]],
+    bundle_type: str = "batch",
+    max_bytes: int = MAX_BUNDLE_BYTES,
+    max_entries: int = MAX_BUNDLE_ENTRIES,
+) -> Iterator[Dict[str, Any]]:
+    """Packs groups of entries into bundles just under the size limits.
+
+    Args:
+      groups: Groups of entries that must be in the same bundle.
+      bundle_type: "batch" or "transaction".
+      max_bytes: The maximum size of the entries in each bundle.
+      max_entries: The maximum number of entries in each bundle.
+
+    Yields:
+      The bundles. A group larger than the limits goes into a bundle by
+      itself. For batch bundles, groups with more than one entry reference
+      each other, so each goes into a transaction bundle by itself.
+    """
+
+    def bundle(entries: List[Entry]) -> Dict[str, Any]:
+        return {"resourceType": "Bundle", "type": bundle_type, "entry": entries}
+
+    entries, size = ([], 0)
+    for group in groups:
+        if bundle_type == "batch" and len(group) > 1:
+            # Batches don't resolve references between their entries.
+            yield {"resourceType": "Bundle", "type": "transaction", "entry": group}
+            continue
+        group_size = sum(len(json.dumps(entry)) for entry in group)
+        if entries and (
+            size + group_size > max_bytes or len(entries) + len(group) > max_entries
+        ):
+            yield bundle(entries)
+            entries, size = ([], 0)
+        entries.extend(group)
+        size += group_size
+    if entries:
+        yield bundle(entries)
+
+
+def _status_code(status: str) -> Optional[int]:
+    code = status.split()[0]
+    return int(code) if code.isdigit() else None
+
+
+def _post_bundle(
+    session: AuthorizedSession, fhir_store_url: str, bundle: Dict[str, Any]
+) -> List[str]:
+    """Posts a bundle and returns the status of each of its entries."""
+    entries = bundle["entry"]
+    try:
+        response = session.post(
+            fhir_store_url,
+            headers=fhir_search.FHIR_HEADERS,
+            data=json.dumps(bundle),
+        )
+    except requests.exceptions.RequestException as e:
+        # The request didn't complete, like for a connection reset.
+        return [f"{type(e).__name__}: {e}"] * len(entries)
+    if not response.ok:
+        # The whole bundle failed, like for a transaction or a quota error.
+        return [f"{response.status_code} {response.reason}"] * len(entries)
+    return [entry["response"]["status"] for entry in response.json()["entry"]]
+
+
+def execute_bundle(
+    session: AuthorizedSession,
+    fhir_store_url: str,
+    bundle: Dict[str, Any],
+    max_attempts: int = MAX_ATTEMPTS,
+) -> LoadResult:
+    """Executes a bundle, retrying the entries that failed transiently.
+
+    Requests that fail to connect are retried like transient statuses.
+
+    Args:
+      session: The session for the requests.
+      fhir_store_url: The URL of the FHIR store's REST API.
+      bundle: A batch or transaction bundle.
+      max_attempts: The maximum number of times to try each entry.
+
+    Returns:
+      The outcome of the bundle's entries.
+    """
+    result = LoadResult()
+    entries = bundle["entry"]
+    for attempt in range(max_attempts):
+        statuses = _post_bundle(session, fhir_store_url, dict(bundle, entry=entries))
+
+        retries = []
+        for entry, status in zip(entries, statuses):
+            code = _status_code(status)
+            if code is not None and code < 300:
+                result.succeeded += 1
+            elif (
+                code is None or code in RETRYABLE_STATUSES
+            ) and attempt + 1 < max_attempts:
+                retries.append(entry)
+            else:
+                result.failed.append((entry, status))
+        if not retries:
+            break
+        entries = retries
+        time.sleep(2**attempt + random.random())
+    return result
+
+
+def load(
+    project_id: str,
+    location: str,
+    dataset_id: str,
+    fhir_store_id: str,
+    paths: Iterable[str],
+    bundle_type: str = "batch",
+    max_bytes: int = MAX_BUNDLE_BYTES,
+    max_workers: int = MAX_WORKERS,
+    update_create: bool = True,
+) -> LoadResult:
+    """Loads the resources in files and directories into a FHIR store.
+
+    Args:
+      project_id: The project ID or project number of the Cloud project you want
+        to use.
+      location: The name of the parent dataset's location.
+      dataset_id: The name of the parent dataset.
+      fhir_store_id: The name of the FHIR store.
+      paths: NDJSON and JSON files, and directories with such files.
+      bundle_type: "batch" or "transaction".
+      max_bytes: The maximum size of each bundle.
+      max_workers: The maximum number of concurrent requests.
+      update_create: Whether resources with an ID are created with PUT, which
+        requires enableUpdateCreate on the FHIR store.
+
+    Returns:
+      The outcome of all the entries.
+    """
+    session = healthcare_client.get_session(max_workers)
+    url = fhir_search.fhir_store_url(project_id, location, dataset_id, fhir_store_id)
+    groups = read_entries(paths, update_create)
+    bundles = pack_bundles(groups, bundle_type, max_bytes)
+
+    result = LoadResult()
+
+    def add(bundle: Dict[str, Any], future: Future) -> None:
+        try:
+            bundle_result = future.result()
+        except Exception as e:
+            # Record the bundle's entries as failed and keep loading the rest.
+            status = f"{type(e).__name__}: {e}"
+            result.failed.extend((entry, status) for entry in bundle["entry"])
+            return
+        result.succeeded += bundle_result.succeeded
+        result.failed.extend(bundle_result.failed)
+
+    # Only a few bundles are in memory at a time.
+    pending: collections.deque[Tuple[Dict[str, Any], Future]] = collections.deque()
+    with ThreadPoolExecutor(max_workers) as executor:
+        for bundle in bundles:
+            future = executor.submit(execute_bundle, session, url, bundle)
+            pending.append((bundle, future))
+            if len(pending) >= 2 * max_workers:
+                add(*pending.popleft())
+        while pending:
+            add(*pending.popleft())
+    return result
+
+
+def parse_command_line_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        "--project_id",
+        default=os.environ.get("GOOGLE_CLOUD_PROJECT"),
+        help="GCP project name",
+    )
+
+    parser.add_argument("--location", default="us-central1", help="GCP location")
+
+    parser.add_argument("--dataset_id", default=None, help="Name of dataset")
+
+    parser.add_argument("--fhir_store_id", default=None, help="Name of FHIR store")
+
+    parser.add_argument(
+        "--bundle_type",
+        default="batch",
+        choices=["batch", "transaction"],
+        help="The type of the bundles to execute",
+    )
+
+    parser.add_argument(
+        "--max_bytes",
+        type=int,
+        default=MAX_BUNDLE_BYTES,
+        help="The maximum size of each bundle",
+    )
+
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="The maximum number of concurrent requests",
+    )
+
+    parser.add_argument(
+        "--no_update_create",
+        dest="update_create",
+        action="store_false",
+        help="Create resources with POST, for FHIR stores without "
+        "enableUpdateCreate. The resources get new IDs.",
+    )
+
+    parser.add_argument(
+        "paths", nargs="+", help="NDJSON and JSON files, or directories with them"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    if args.project_id is None:
+        print(
+            "You must specify a project ID or set the "
+            '"GOOGLE_CLOUD_PROJECT" environment variable.'
+        )
+        return
+
+    result = load(
+        args.project_id,
+        args.location,
+        args.dataset_id,
+        args.fhir_store_id,
+        args.paths,
+        args.bundle_type,
+        args.max_bytes,
+        args.max_workers,
+        args.update_create,
+    )
+    print(f"Loaded {result.succeeded} resources, {len(result.failed)} failed.")
+    for entry, status in result.failed:
+        print(f"{entry['request']['method']} {entry['request']['url']}: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from unittest import mock
+
+import requests
+
+import fhir_bulk_load
+
+
+def test_to_entry():
+    assert fhir_bulk_load.to_entry({"resourceType": "Patient", "id": "a"}) == {
+        "resource": {"resourceType": "Patient", "id": "a"},
+        "request": {"method": "PUT", "url": "Patient/a"},
+    }
+    assert fhir_bulk_load.to_entry({"resourceType": "Patient"})["request"] == {
+        "method": "POST",
+        "url": "Patient",
+    }
+    entry = fhir_bulk_load.to_entry(
+        {"resourceType": "Patient", "id": "a"}, update_create=False
+    )
+    assert entry["request"] == {"method": "POST", "url": "Patient"}
+
+
+def test_read_entries(tmp_path):
+    patients = [{"resourceType": "Patient", "id": str(i)} for i in range(3)]
+    with open(tmp_path / "patients.ndjson", "w") as f:
+        f.writelines(json.dumps(patient) + "\n" for patient in patients)
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": [
+            {"fullUrl": "urn:uuid:1", "resource": {"resourceType": "Patient"}},
+            {"resource": {"resourceType": "Patient", "id": "3"}},
+            {
+                "resource": {
+                    "resourceType": "Observation",
+                    "subject": {"reference": "urn:uuid:1"},
+                }
+            },
+        ],
+    }
+    with open(tmp_path / "bundle.json", "w") as f:
+        json.dump(bundle, f)
+
+    groups = list(fhir_bulk_load.read_entries([str(tmp_path)]))
+
+    # The Observation references the first Patient, so they stay together.
+    assert [len(group) for group in groups] == [2, 1, 1, 1, 1]
+    assert [entry["request"]["method"] for entry in groups[0]] == ["POST", "POST"]
+
+
+def test_pack_bundles():
+    groups = [[fhir_bulk_load.to_entry({"resourceType": "Patient"})]] * 10
+    group_size = len(json.dumps(groups[0][0]))
+
+    bundles = list(
+        fhir_bulk_load.pack_bundles(groups, "transaction", max_bytes=4 * group_size)
+    )
+
+    assert [len(bundle["entry"]) for bundle in bundles] == [4, 4, 2]
+    assert {bundle["type"] for bundle in bundles} == {"transaction"}
+
+
+def test_pack_bundles_references_in_batch():
+    patient = fhir_bulk_load.to_entry({"resourceType": "Patient"}, "urn:uuid:1")
+    observation = fhir_bulk_load.to_entry(
+        {"resourceType": "Observation", "subject": {"reference": "urn:uuid:1"}}
+    )
+    other = fhir_bulk_load.to_entry({"resourceType": "Patient"})
+
+    bundles = list(
+        fhir_bulk_load.pack_bundles([[other], [patient, observation], [other]])
+    )
+
+    # Only transactions resolve the reference, so the group is executed alone.
+    assert [(bundle["type"], len(bundle["entry"])) for bundle in bundles] == [
+        ("transaction", 2),
+        ("batch", 2),
+    ]
+
+
+def response(*statuses):
+    response = mock.MagicMock(ok=True)
+    response.json.return_value = {
+        "entry": [{"response": {"status": status}} for status in statuses]
+    }
+    return response
+
+
+@mock.patch("time.sleep")
+def test_execute_bundle_retries_failed_entries(sleep):
+    entries = [
+        fhir_bulk_load.to_entry({"resourceType": "Patient", "id": str(i)})
+        for i in range(3)
+    ]
+    session = mock.MagicMock()
+    session.post.side_effect = [
+        response("201 Created", "429 Too Many Requests", "400 Bad Request"),
+        response("200 OK"),
+    ]
+
+    result = fhir_bulk_load.execute_bundle(
+        session, "url", {"resourceType": "Bundle", "type": "batch", "entry": entries}
+    )
+
+    assert result.succeeded == 2
+    assert result.failed == [(entries[2], "400 Bad Request")]
+    retried = json.loads(session.post.call_args_list[1].kwargs["data"])
+    assert retried["entry"] == [entries[1]]
+
+
+@mock.patch("time.sleep")
+def test_execute_bundle_retries_connection_errors(sleep):
+    entries = [fhir_bulk_load.to_entry({"resourceType": "Patient"})]
+    session = mock.MagicMock()
+    session.post.side_effect = [
+        requests.exceptions.ConnectionError("connection reset"),
+        response("201 Created"),
+    ]
+
+    result = fhir_bulk_load.execute_bundle(
+        session, "url", {"resourceType": "Bundle", "type": "batch", "entry": entries}
+    )
+
+    assert result.succeeded == 1
+    assert result.failed == []
+
+
+@mock.patch("time.sleep")
+def test_execute_bundle_gives_up(sleep):
+    entries = [fhir_bulk_load.to_entry({"resourceType": "Patient"})]
+    session = mock.MagicMock()
+    session.post.side_effect = requests.exceptions.ConnectionError("refused")
+
+    result = fhir_bulk_load.execute_bundle(
+        session,
+        "url",
+        {"resourceType": "Bundle", "type": "batch", "entry": entries},
+        max_attempts=2,
+    )
+
+    assert result.succeeded == 0
+    assert result.failed == [(entries[0], "ConnectionError: refused")]
+
+
+@mock.patch("healthcare_client.get_session")
+def test_load_continues_after_failed_bundle(get_session, tmp_path):
+    with open(tmp_path / "patients.ndjson", "w") as f:
+        f.writelines(json.dumps({"resourceType": "Patient"}) + "\n" for _ in range(4))
+    get_session.return_value.post.side_effect = [
+        ValueError("invalid response"),
+        response("201 Created", "201 Created"),
+    ]
+    entry_size = len(json.dumps(fhir_bulk_load.to_entry({"resourceType": "Patient"})))
+
+    result = fhir_bulk_load.load(
+        "project",
+        "location",
+        "dataset",
+        "store",
+        [str(tmp_path)],
+        max_bytes=2 * entry_size,
+        max_workers=1,
+    )
+
+    assert result.succeeded == 2
+    assert [status for _, status in result.failed] == [
+        "ValueError: invalid response"
+    ] * 2
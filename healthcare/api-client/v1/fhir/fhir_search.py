@@ -0,0 +1,286 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Walks through all the pages of FHIR search results.
+
+Search results come in Bundle pages, with a link to the next page. The pages
+are fetched lazily, one at a time, and the next page is fetched in the
+background while the current one is processed. This walks any number of
+resources with the memory of a couple of pages.
+
+For example, to write all the Patient resources as NDJSON:
+
+    python fhir_search.py --dataset_id=my-dataset --fhir_store_id=my-store \\
+        search --resource_type=Patient --output=patients.ndjson
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+from google.auth.transport.requests import AuthorizedSession
+
+import healthcare_client
+
+FHIR_HEADERS = {"Content-Type": "application/fhir+json;charset=utf-8"}
+
+
+def fhir_store_url(
+    project_id: str, location: str, dataset_id: str, fhir_store_id: str
+) -> str:
+    """Returns the URL of a FHIR store's REST API."""
+    return (
+        f"{healthcare_client.BASE_URL}/projects/{project_id}/locations/{location}"
+        f"/datasets/{dataset_id}/fhirStores/{fhir_store_id}/fhir"
+    )
+
+
+def next_page_url(bundle: Dict[str, Any]) -> Optional[str]:
+    """Returns the URL of the next page of a search Bundle, if any."""
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next":
+            return link["url"]
+    return None
+
+
+def iter_pages(
+    url: str,
+    params: Optional[Dict[str, str]] = None,
+    method: str = "GET",
+    session: Optional[AuthorizedSession] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Fetches all the pages of a search, prefetching the next page.
+
+    Args:
+      url: The URL of the search, like `{fhir_store_url}/Patient`.
+      params: The search parameters.
+      method: "GET" sends the parameters in the URL, "POST" sends them in the
+        body to `{url}/_search`. The next pages are always fetched with GET.
+      session: The session for the requests, defaults to the shared session.
+
+    Yields:
+      The search result Bundles, one per page.
+    """
+    session = session or healthcare_client.get_session()
+
+    def fetch(method: str, url: str, **kwargs: Any) -> Dict[str, Any]:
+        response = session.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    if method == "POST":
+        first_page = dict(
+            method="POST",
+            url=f"{url}/_search",
+            data=params,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+    else:
+        first_page = dict(method="GET", url=url, params=params, headers=FHIR_HEADERS)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = executor.submit(fetch, **first_page)
+        while page is not None:
+            bundle = page.result()
+            url = next_page_url(bundle)
+            page = (
+                executor.submit(fetch, "GET", url, headers=FHIR_HEADERS)
+                if url
+                else None
+            )
+            yield bundle
+
+
+def iter_resources(pages: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Yields the resources in the entries of each Bundle page."""
+    for bundle in pages:
+        for entry in bundle.get("entry", []):
+            yield entry["resource"]
+
+
+def search_resources(
+    project_id: str,
+    location: str,
+    dataset_id: str,
+    fhir_store_id: str,
+    resource_type: str,
+    params: Optional[Dict[str, str]] = None,
+    method: str = "GET",
+) -> Iterator[Dict[str, Any]]:
+    """Searches for resources in a FHIR store, through all the result pages.
+
+    Args:
+      project_id: The project ID or project number of the Cloud project you want
+        to use.
+      location: The name of the parent dataset's location.
+      dataset_id: The name of the parent dataset.
+      fhir_store_id: The name of the FHIR store.
+      resource_type: A valid FHIR resource type, like "Patient".
+      params: The search parameters, like {"family:exact": "Smith"}.
+      method: "GET" or "POST", like the searchResources GET and POST methods.
+
+    Yields:
+      The matching resources.
+    """
+    url = fhir_store_url(project_id, location, dataset_id, fhir_store_id)
+    yield from iter_resources(iter_pages(f"{url}/{resource_type}", params, method))
+
+
+def get_patient_everything(
+    project_id: str,
+    location: str,
+    dataset_id: str,
+    fhir_store_id: str,
+    patient_id: str,
+    params: Optional[Dict[str, str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Gets all the resources in a patient compartment, through all the pages.
+
+    Args:
+      project_id: The project ID or project number of the Cloud project you want
+        to use.
+      location: The name of the parent dataset's location.
+      dataset_id: The name of the parent dataset.
+      fhir_store_id: The name of the FHIR store.
+      patient_id: The ID of the Patient resource.
+      params: Optional parameters, like {"_type": "Observation,Encounter"}.
+
+    Yields:
+      The resources in the patient compartment.
+    """
+    url = fhir_store_url(project_id, location, dataset_id, fhir_store_id)
+    yield from iter_resources(
+        iter_pages(f"{url}/Patient/{patient_id}/$everything", params)
+    )
+
+
+def write_ndjson(resources: Iterable[Dict[str, Any]], f: TextIO) -> int:
+    """Writes resources as newline-delimited JSON, one resource per line.
+
+    Args:
+      resources: The resources to write, like from `search_resources`.
+      f: A text file to write to.
+
+    Returns:
+      The number of resources written.
+    """
+    count = 0
+    for resource in resources:
+        f.write(json.dumps(resource, separators=(",", ":")))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def parse_command_line_args():
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        "--project_id",
+        default=os.environ.get("GOOGLE_CLOUD_PROJECT"),
+        help="GCP project name",
+    )
+
+    parser.add_argument("--location", default="us-central1", help="GCP location")
+
+    parser.add_argument("--dataset_id", default=None, help="Name of dataset")
+
+    parser.add_argument("--fhir_store_id", default=None, help="Name of FHIR store")
+
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="NDJSON file to write the resources to, defaults to stdout",
+    )
+
+    command = parser.add_subparsers(dest="command")
+
+    search_parser = command.add_parser("search", help=search_resources.__doc__)
+    search_parser.add_argument(
+        "--resource_type",
+        default=None,
+        help="The type of resource. First letter must be capitalized",
+    )
+    search_parser.add_argument(
+        "--method", default="GET", choices=["GET", "POST"], help="The search method"
+    )
+    search_parser.add_argument(
+        "params",
+        nargs="*",
+        help="Search parameters, like family:exact=Smith",
+    )
+
+    everything_parser = command.add_parser(
+        "patient-everything", help=get_patient_everything.__doc__
+    )
+    everything_parser.add_argument(
+        "--patient_id", default=None, help="Identifier for a Patient resource"
+    )
+
+    return parser.parse_args()
+
+
+def run_command(args):
+    """Calls the program using the specified command."""
+    if args.project_id is None:
+        print(
+            "You must specify a project ID or set the "
+            '"GOOGLE_CLOUD_PROJECT" environment variable.'
+        )
+        return
+
+    if args.command == "search":
+        resources = search_resources(
+            args.project_id,
+            args.location,
+            args.dataset_id,
+            args.fhir_store_id,
+            args.resource_type,
+            dict(param.split("=", 1) for param in args.params),
+            args.method,
+        )
+    elif args.command == "patient-everything":
+        resources = get_patient_everything(
+            args.project_id,
+            args.location,
+            args.dataset_id,
+            args.fhir_store_id,
+            args.patient_id,
+        )
+    else:
+        print("Please specify a command.")
+        return
+
+    if args.output:
+        with open(args.output, "w") as f:
+            count = write_ndjson(resources, f)
+    else:
+        count = write_ndjson(resources, sys.stdout)
+    print(f"Wrote {count} resources.", file=sys.stderr)
+
+
+def main():
+    args = parse_command_line_args()
+    run_command(args)
+
+
+if __name__ == "__main__":
+    main()
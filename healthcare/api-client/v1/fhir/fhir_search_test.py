@@ -0,0 +1,74 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+from unittest import mock
+
+import fhir_search
+
+URL = "https://healthcare.googleapis.com/v1/fhir/Patient"
+
+
+def page(ids, next_url=None):
+    bundle = {
+        "resourceType": "Bundle",
+        "entry": [{"resource": {"resourceType": "Patient", "id": id}} for id in ids],
+    }
+    if next_url:
+        bundle["link"] = [{"relation": "next", "url": next_url}]
+    response = mock.MagicMock()
+    response.json.return_value = bundle
+    return response
+
+
+def test_iter_pages():
+    session = mock.MagicMock()
+    session.request.side_effect = [
+        page(["a", "b"], f"{URL}?page=2"),
+        page(["c"], f"{URL}?page=3"),
+        page([]),
+    ]
+
+    pages = fhir_search.iter_pages(URL, {"name": "Smith"}, session=session)
+    resources = fhir_search.iter_resources(pages)
+
+    assert [resource["id"] for resource in resources] == ["a", "b", "c"]
+    assert [call.args for call in session.request.call_args_list] == [
+        ("GET", URL),
+        ("GET", f"{URL}?page=2"),
+        ("GET", f"{URL}?page=3"),
+    ]
+    assert session.request.call_args_list[0].kwargs["params"] == {"name": "Smith"}
+
+
+def test_iter_pages_post():
+    session = mock.MagicMock()
+    session.request.side_effect = [page(["a"], f"{URL}?page=2"), page(["b"])]
+
+    pages = list(fhir_search.iter_pages(URL, {"name": "Smith"}, "POST", session))
+
+    assert len(pages) == 2
+    first, second = session.request.call_args_list
+    assert first.args == ("POST", f"{URL}/_search")
+    assert first.kwargs["data"] == {"name": "Smith"}
+    assert second.args == ("GET", f"{URL}?page=2")
+
+
+def test_write_ndjson():
+    resources = [{"resourceType": "Patient", "id": "a"}, {"resourceType": "Patient"}]
+    f = io.StringIO()
+
+    assert fhir_search.write_ndjson(resources, f) == 2
+    assert [json.loads(line) for line in f.getvalue().splitlines()] == resources
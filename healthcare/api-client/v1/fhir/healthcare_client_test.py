@@ -0,0 +1,42 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import pytest
+
+import healthcare_client
+
+
+@pytest.fixture(autouse=True)
+def credentials():
+    healthcare_client.get_credentials.cache_clear()
+    healthcare_client.get_session.cache_clear()
+    with mock.patch("google.auth.default") as default:
+        default.return_value = (mock.MagicMock(), "project")
+        yield default
+    healthcare_client.get_credentials.cache_clear()
+    healthcare_client.get_session.cache_clear()
+
+
+def test_get_credentials(credentials):
+    assert healthcare_client.get_credentials() is healthcare_client.get_credentials()
+    credentials.assert_called_once_with(scopes=healthcare_client.SCOPES)
+
+
+def test_get_session():
+    session = healthcare_client.get_session(pool_maxsize=4)
+
+    assert session is healthcare_client.get_session(pool_maxsize=4)
+    assert session.get_adapter(healthcare_client.BASE_URL)._pool_maxsize == 4
@@ -25,13 +25,16 @@ The land cover labels for the training dataset come from the ESA WorldCover.
 
 from __future__ import annotations
 
+import asyncio
 from collections.abc import Iterable
+import logging
+import math
 
+import aiohttp
 import apache_beam as beam
 from apache_beam.options.pipeline_options import PipelineOptions
 import ee
 import numpy as np
-import requests
 
 from serving import data
 
@@ -39,6 +42,8 @@ from serving import data
 POINTS_PER_CLASS = 100
 PATCH_SIZE = 128
 MAX_REQUESTS = 20  # default EE request quota
+MAX_REQUESTS_PER_WORKER = 5  # concurrent requests from each worker
+MAX_BATCH_SIZE = 64  # points fetched together, nearby points share downloads
 
 # Simplified polygons covering most land areas in the world.
 WORLD_POLYGONS = [
@@ -105,10 +110,16 @@ def get_training_example(
     Returns: An (inputs, labels) pair of NumPy arrays.
     """
     data.ee_init()
-    return (
-        data.get_input_patch(2020, lonlat, patch_size),
-        data.get_label_patch(lonlat, patch_size),
-    )
+
+    async def get_patches() -> list[np.ndarray]:
+        # Fetch the inputs and labels concurrently through the shared rate limiter.
+        return await asyncio.gather(
+            data.get_input_patch_async(2020, lonlat, patch_size),
+            data.get_label_patch_async(lonlat, patch_size),
+        )
+
+    (inputs, labels) = data.get_fetcher().run(get_patches())
+    return (inputs, labels)
 
 
 def try_get_example(
@@ -117,8 +128,43 @@ def try_get_example(
     """Wrapper over `get_training_examples` that allows it to simply log errors instead of crashing."""
     try:
         yield get_training_example(lonlat, patch_size)
-    except requests.exceptions.HTTPError as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.exception(e)
+
+
+def get_training_examples(
+    points: list[tuple[float, float]], patch_size: int = PATCH_SIZE
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Gets (inputs, labels) training examples for year 2020 for many points.
+
+    Nearby points are fetched together from Earth Engine in shared tiles.
+
+    Args:
+        points: A list of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patch.
+
+    Returns: A list of (inputs, labels) pairs of NumPy arrays.
+    """
+    data.ee_init()
+    inputs = data.get_input_patches(2020, points, patch_size)
+    labels = data.get_label_patches(points, patch_size)
+    return list(zip(inputs, labels))
+
+
+def try_get_examples(
+    points: list[tuple[float, float]],
+    patch_size: int = PATCH_SIZE,
+    max_requests: int = MAX_REQUESTS_PER_WORKER,
+) -> Iterable[tuple[np.ndarray, np.ndarray]]:
+    """Wrapper over `get_training_examples` that falls back to one point at a time on errors."""
+    # Each worker only uses its own share of the Earth Engine request quota.
+    data.get_fetcher(max_requests)
+    try:
+        yield from get_training_examples(points, patch_size)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         logging.exception(e)
+        for lonlat in points:
+            yield from try_get_example(lonlat, patch_size)
 
 
 def serialize_tensorflow(inputs: np.ndarray, labels: np.ndarray) -> bytes:
@@ -158,6 +204,8 @@ def run_tensorflow(
     This fetches data from Earth Engine and creates a TFRecords dataset.
     We use `max_requests` to limit the number of concurrent requests to Earth Engine
     to avoid quota issues. You can request for an increas of quota if you need it.
+    The requests are split among the workers, each worker makes at most
+    `MAX_REQUESTS_PER_WORKER` concurrent requests.
 
     Args:
         data_path: Directory path to save the TFRecord files.
@@ -170,12 +218,16 @@ def run_tensorflow(
     # Equally divide the number of points by the number of concurrent requests.
     num_points = max(int(points_per_class / max_requests), 1)
 
+    # Every worker process has its own rate limiter, so split the quota among them.
+    num_workers = math.ceil(max_requests / MAX_REQUESTS_PER_WORKER)
+    worker_requests = max(max_requests // num_workers, 1)
+
     beam_options = PipelineOptions(
         beam_args,
         save_main_session=True,
         setup_file="./setup.py",
-        max_num_workers=max_requests,  # distributed runners
-        direct_num_workers=max(max_requests, 20),  # direct runner
+        max_num_workers=num_workers,  # distributed runners
+        direct_num_workers=num_workers,  # direct runner
         disk_size_gb=50,
     )
     with beam.Pipeline(options=beam_options) as pipeline:
@@ -184,7 +236,9 @@ def run_tensorflow(
             | "🌱 Make seeds" >> beam.Create(range(max_requests))
             | "📌 Sample points" >> beam.FlatMap(sample_points, polygons, num_points)
             | "🃏 Reshuffle" >> beam.Reshuffle()
-            | "📑 Get examples" >> beam.FlatMap(try_get_example, patch_size)
+            | "🗂️ Batch points" >> beam.BatchElements(max_batch_size=MAX_BATCH_SIZE)
+            | "📑 Get examples"
+            >> beam.FlatMap(try_get_examples, patch_size, worker_requests)
             | "✍🏽 Serialize" >> beam.MapTuple(serialize_tensorflow)
             | "📚 Write TFRecords"
             >> beam.io.WriteToTFRecord(
@@ -195,7 +249,6 @@ def run_tensorflow(
 
 if __name__ == "__main__":
     import argparse
-    import logging
 
     logging.getLogger().setLevel(logging.INFO)
 
@@ -0,0 +1,85 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from aiohttp import web
+import numpy as np
+import pytest
+
+import create_dataset
+from serving import batching
+from serving import data
+
+
+async def fake_input_patch(
+    year: int, lonlat: tuple[float, float], patch_size: int
+) -> np.ndarray:
+    return np.zeros((patch_size, patch_size, 13))
+
+
+async def fake_label_patch(lonlat: tuple[float, float], patch_size: int) -> np.ndarray:
+    return np.ones((patch_size, patch_size, 1))
+
+
+@mock.patch.object(data, "get_label_patch_async", fake_label_patch)
+@mock.patch.object(data, "get_input_patch_async", fake_input_patch)
+@mock.patch.object(data, "ee_init")
+def test_get_training_example(ee_init: mock.Mock) -> None:
+    # Beam calls this from worker threads, which have no current event loop.
+    with ThreadPoolExecutor(2) as executor:
+        examples = [
+            create_dataset.get_training_example((1.0, 2.0), 8),
+            executor.submit(
+                create_dataset.get_training_example, (1.0, 2.0), 8
+            ).result(),
+        ]
+
+    for inputs, labels in examples:
+        assert inputs.shape == (8, 8, 13)
+        assert labels.shape == (8, 8, 1)
+
+
+def test_micro_batcher_missing_predictions() -> None:
+    # A model that drops the last example must fail the request, not hang it.
+    batcher = batching.MicroBatcher(lambda batch: batch[:-1], max_wait_seconds=0)
+    with pytest.raises(ValueError):
+        batcher.predict(np.zeros(3))
+
+
+def test_fetcher_retries_server_errors() -> None:
+    statuses = [503, 500, 200]
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(status=statuses.pop(0), body=b"ok")
+
+    async def start_server() -> web.AppRunner:
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "localhost", 0).start()
+        return runner
+
+    fetcher = data.Fetcher(max_retries=2)
+    runner = fetcher.run(start_server())
+    port = runner.addresses[0][1]
+    with mock.patch.object(data.random, "uniform", return_value=0):
+        content = fetcher.run(fetcher.fetch(lambda: f"http://localhost:{port}/"))
+    fetcher.run(runner.cleanup())
+    assert content == b"ok"
+    assert statuses == []
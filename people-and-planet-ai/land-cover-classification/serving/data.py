@@ -20,18 +20,42 @@ trained on exactly the same data that will be used for predictions.
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable, Coroutine
+import functools
 import io
-
+import math
+import os
+import random
+import threading
+import time
+from typing import TypeVar
+
+import aiohttp
 import ee
-from google.api_core import exceptions, retry
 import google.auth
 import numpy as np
 from numpy.lib.recfunctions import structured_to_unstructured
-import requests
+
+T = TypeVar("T")
 
 
 SCALE = 10  # meters per pixel
 
+# Batched downloads group nearby points into tiles of at most this many pixels
+# per side, which keeps requests under the Earth Engine download size limit.
+MAX_TILE_SIZE = 512
+METERS_PER_DEGREE = 111_320  # at the equator
+
+# Concurrent requests to Earth Engine from each process, override them with
+# environment variables.
+MAX_REQUESTS = int(os.environ.get("EE_MAX_REQUESTS", 20))  # default EE request quota
+REQUESTS_PER_SECOND = float(os.environ.get("EE_REQUESTS_PER_SECOND", 10))
+MAX_RETRIES = 10
+MAX_BACKOFF = 60  # seconds
+# Throttling and transient server errors, these are retried.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 def ee_init() -> None:
     """Authenticate and initialize Earth Engine with the default credentials."""
@@ -145,14 +169,62 @@ def get_label_patch(lonlat: tuple[float, float], patch_size: int) -> np.ndarray:
     return structured_to_unstructured(patch)
 
 
-@retry.Retry(deadline=10 * 60)  # seconds
+async def get_input_patch_async(
+    year: int, lonlat: tuple[float, float], patch_size: int
+) -> np.ndarray:
+    """Same as `get_input_patch`, but as a coroutine for the `Fetcher` event loop."""
+    image = get_input_image(year)
+    patch = await get_patch_async(image, lonlat, patch_size, SCALE)
+    return structured_to_unstructured(patch)
+
+
+async def get_label_patch_async(
+    lonlat: tuple[float, float], patch_size: int
+) -> np.ndarray:
+    """Same as `get_label_patch`, but as a coroutine for the `Fetcher` event loop."""
+    image = get_label_image()
+    patch = await get_patch_async(image, lonlat, patch_size, SCALE)
+    return structured_to_unstructured(patch)
+
+
+def get_input_patches(
+    year: int, points: list[tuple[float, float]], patch_size: int
+) -> list[np.ndarray]:
+    """Gets the inputs patches of pixels for many points at once.
+
+    args:
+        year: Year of interest, a median composite is used.
+        points: A list of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patch.
+
+    Returns: The pixel values of each inputs patch, in the same order as `points`.
+    """
+    image = get_input_image(year)
+    patches = get_patches(image, points, patch_size, SCALE)
+    return [structured_to_unstructured(patch) for patch in patches]
+
+
+def get_label_patches(
+    points: list[tuple[float, float]], patch_size: int
+) -> list[np.ndarray]:
+    """Gets the labels patches of pixels for many points at once.
+
+    args:
+        points: A list of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patch.
+
+    Returns: The pixel values of each labels patch, in the same order as `points`.
+    """
+    image = get_label_image()
+    patches = get_patches(image, points, patch_size, SCALE)
+    return [structured_to_unstructured(patch) for patch in patches]
+
+
 def get_patch(
     image: ee.Image, lonlat: tuple[float, float], patch_size: int, scale: int
 ) -> np.ndarray:
     """Fetches a patch of pixels from Earth Engine.
 
-    It retries if we get error "429: Too Many Requests".
-
     Args:
         image: Image to get the patch from.
         lonlat: A (longitude, latitude) pair for the point of interest.
@@ -160,25 +232,320 @@ def get_patch(
         scale: Number of meters per pixel.
 
     Raises:
-        requests.exceptions.RequestException
+        aiohttp.ClientError
+        asyncio.TimeoutError
 
     Returns: The requested patch of pixels as a NumPy array with shape (width, height, bands).
     """
+    return get_fetcher().run(get_patch_async(image, lonlat, patch_size, scale))
+
+
+async def get_patch_async(
+    image: ee.Image, lonlat: tuple[float, float], patch_size: int, scale: int
+) -> np.ndarray:
+    """Same as `get_patch`, but as a coroutine for the `Fetcher` event loop."""
     point = ee.Geometry.Point(lonlat)
-    url = image.getDownloadURL(
+    return await download_npy(
+        image,
+        region=point.buffer(scale * patch_size / 2, 1).bounds(1),
+        dimensions=(patch_size, patch_size),
+    )
+
+
+def get_patches(
+    image: ee.Image,
+    points: list[tuple[float, float]],
+    patch_size: int,
+    scale: int,
+    max_tile_size: int = MAX_TILE_SIZE,
+) -> list[np.ndarray]:
+    """Fetches patches of pixels for many points, sharing downloads for nearby points.
+
+    Points are grouped into tiles of at most `max_tile_size` pixels per side.
+    Each tile is fetched once, and every point's patch is sliced out of it.
+    Points that don't share a tile with any other point fall back to `get_patch`.
+    All the downloads run concurrently within the Earth Engine request quota.
+
+    Tiles use a regular longitude/latitude grid with the pixel size at the
+    tile's latitude, so patches may be off by a fraction of a pixel compared
+    to the ones from `get_patch`.
+
+    Args:
+        image: Image to get the patches from.
+        points: A list of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patches.
+        scale: Number of meters per pixel.
+        max_tile_size: Maximum size in pixels for each side of a tile.
+
+    Raises:
+        aiohttp.ClientError
+        asyncio.TimeoutError
+
+    Returns: The requested patches as NumPy arrays, in the same order as `points`.
+    """
+
+    async def get_group(indices: list[int]) -> list[np.ndarray]:
+        if len(indices) == 1:
+            return [await get_patch_async(image, points[indices[0]], patch_size, scale)]
+
+        (lons, lats) = np.array([points[i] for i in indices], dtype=float).T
+        (lon_step, lat_step) = pixel_size_degrees(lats.mean(), scale)
+        west = lons.min() - lon_step * patch_size / 2
+        north = lats.max() + lat_step * patch_size / 2
+        cols = np.round((lons - lons.min()) / lon_step).astype(int)
+        rows = np.round((lats.max() - lats) / lat_step).astype(int)
+        (width, height) = (cols.max() + patch_size, rows.max() + patch_size)
+        region = ee.Geometry.Rectangle(
+            [west, north - lat_step * height, west + lon_step * width, north],
+            geodesic=False,
+        )
+        tile = await download_npy(image, region, (width, height))
+        return [
+            tile[row : row + patch_size, col : col + patch_size]
+            for row, col in zip(rows, cols)
+        ]
+
+    async def get_all(groups: list[list[int]]) -> list[list[np.ndarray]]:
+        return await asyncio.gather(*[get_group(indices) for indices in groups])
+
+    groups = group_points(points, patch_size, scale, max_tile_size)
+    results = get_fetcher().run(get_all(groups))
+    patches: list[np.ndarray] = [np.empty(0)] * len(points)
+    for indices, group_patches in zip(groups, results):
+        for i, patch in zip(indices, group_patches):
+            patches[i] = patch
+    return patches
+
+
+def group_points(
+    points: list[tuple[float, float]], patch_size: int, scale: int, max_tile_size: int
+) -> list[list[int]]:
+    """Groups nearby points so all their patches fit into a single tile.
+
+    Args:
+        points: A list of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patches.
+        scale: Number of meters per pixel.
+        max_tile_size: Maximum size in pixels for each side of a tile.
+
+    Returns: A list of groups, each group being a list of indices into `points`.
+    """
+    # Points within the same grid cell are at most `cell_size` pixels apart,
+    # so their patches always fit in a tile of `max_tile_size` pixels.
+    cell_size = max_tile_size - patch_size
+    if cell_size <= 0:
+        return [[i] for i in range(len(points))]
+
+    groups: dict[tuple[int, int], list[int]] = {}
+    lat_cell = pixel_size_degrees(0, scale)[1] * cell_size
+    for i, (lon, lat) in enumerate(points):
+        row = math.floor(lat / lat_cell)
+        # Use the latitude closest to the equator in the row to size the cell,
+        # that's where a degree of longitude spans the most pixels.
+        row_lat = min(abs(row * lat_cell), abs((row + 1) * lat_cell))
+        lon_cell = pixel_size_degrees(row_lat, scale)[0] * cell_size
+        groups.setdefault((row, math.floor(lon / lon_cell)), []).append(i)
+    return list(groups.values())
+
+
+def pixel_size_degrees(latitude: float, scale: int) -> tuple[float, float]:
+    """Gets the approximate size of a pixel in degrees at a given latitude.
+
+    Args:
+        latitude: Latitude in degrees.
+        scale: Number of meters per pixel.
+
+    Returns: A (longitude, latitude) pair with the pixel size in degrees.
+    """
+    lat_step = scale / METERS_PER_DEGREE
+    lon_step = lat_step / max(math.cos(math.radians(latitude)), 1e-6)
+    return (lon_step, lat_step)
+
+
+async def download_npy(
+    image: ee.Image, region: ee.Geometry, dimensions: tuple[int, int]
+) -> np.ndarray:
+    """Downloads a region of an image from Earth Engine as a NumPy array.
+
+    The request goes through the process-wide `Fetcher` rate limiter, which
+    retries throttling, transient server errors and dropped connections.
+
+    Args:
+        image: Image to get the pixels from.
+        region: Region of the image to download.
+        dimensions: A (width, height) pair with the output size in pixels.
+
+    Raises:
+        aiohttp.ClientError
+        asyncio.TimeoutError
+
+    Returns: The requested pixels as a structured NumPy array.
+    """
+    get_url = functools.partial(
+        image.getDownloadURL,
         {
-            "region": point.buffer(scale * patch_size / 2, 1).bounds(1),
-            "dimensions": [patch_size, patch_size],
+            "region": region,
+            "dimensions": [int(x) for x in dimensions],
             "format": "NPY",
-        }
+        },
     )
+    content = await get_fetcher().fetch(get_url)
+    return np.load(io.BytesIO(content), allow_pickle=True)
 
-    # If we get "429: Too Many Requests" errors, it's safe to retry the request.
-    # The Retry library only works with `google.api_core` exceptions.
-    response = requests.get(url)
-    if response.status_code == 429:
-        raise exceptions.TooManyRequests(response.text)
 
-    # Still raise any other exceptions to make sure we got valid data.
-    response.raise_for_status()
-    return np.load(io.BytesIO(response.content), allow_pickle=True)
+class TokenBucket:
+    """Token bucket rate limiter with adaptive rate.
+
+    Every "429: Too Many Requests" halves the rate, and every successful
+    request increases it a little, up to `max_rate`.
+    This is an additive-increase/multiplicative-decrease (AIMD) scheme.
+
+    It must be created within the event loop that uses it.
+    """
+
+    def __init__(self, max_rate: float, burst: int) -> None:
+        self.max_rate = max_rate
+        self.min_rate = max_rate / 100
+        self.rate = max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self) -> None:
+        """Slowly increases the rate after a successful request."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def on_throttled(self) -> None:
+        """Halves the rate and drains the bucket after being throttled."""
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+
+
+class Fetcher:
+    """Fetches URLs concurrently with a shared rate limiter and connection pool.
+
+    All fetches run in a single event loop in a background thread, so many
+    threads (like Apache Beam DoFns) can keep the quota saturated without
+    overshooting it.
+
+    Use `get_fetcher` to get the process-wide instance instead of creating one.
+    """
+
+    def __init__(
+        self,
+        max_requests: int = MAX_REQUESTS,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        max_retries: int = MAX_RETRIES,
+    ) -> None:
+        self.max_requests = max_requests
+        self.max_retries = max_retries
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.run(self._start(requests_per_second))
+
+    async def _start(self, requests_per_second: float) -> None:
+        # Locks and semaphores must be created within the loop that uses them,
+        # older Python versions bind them to the current thread's event loop.
+        self.limiter = TokenBucket(requests_per_second, burst=self.max_requests)
+        self.semaphore = asyncio.Semaphore(self.max_requests)
+        connector = aiohttp.TCPConnector(limit=self.max_requests)
+        self.session = aiohttp.ClientSession(connector=connector)
+
+    def run(self, coroutine: Coroutine[None, None, T]) -> T:
+        """Runs a coroutine in the fetcher's event loop and waits for its result.
+
+        This is safe to call from any thread, except from the event loop itself.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def fetch(self, get_url: Callable[[], str]) -> bytes:
+        """Fetches the contents of a URL, retrying on throttling and transient errors.
+
+        Responses with a status in `RETRY_STATUSES` and connection errors are
+        retried up to `max_retries` times. Only "429: Too Many Requests" slows
+        down the rate limiter.
+
+        Getting the URL itself is an Earth Engine request, like `getDownloadURL`,
+        so it runs in a separate thread and also counts towards the quota.
+
+        Args:
+            get_url: Function that returns the URL to fetch.
+
+        Raises:
+            aiohttp.ClientError
+            asyncio.TimeoutError
+
+        Returns: The response contents.
+        """
+        await self.limiter.acquire()
+        async with self.semaphore:
+            url = await asyncio.to_thread(get_url)
+
+        attempt = 0
+        while True:
+            retry_after = ""
+            await self.limiter.acquire()
+            async with self.semaphore:
+                try:
+                    async with self.session.get(url) as response:
+                        if (
+                            response.status not in RETRY_STATUSES
+                            or attempt >= self.max_retries
+                        ):
+                            response.raise_for_status()
+                            self.limiter.on_success()
+                            return await response.read()
+                        if response.status == 429:
+                            self.limiter.on_throttled()
+                        retry_after = response.headers.get("Retry-After", "")
+                except aiohttp.ClientConnectionError:
+                    if attempt >= self.max_retries:
+                        raise
+
+            # Exponential backoff with jitter, unless the server tells us how long.
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = min(2**attempt, MAX_BACKOFF) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+_fetcher: Fetcher | None = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher(max_requests: int = MAX_REQUESTS) -> Fetcher:
+    """Gets the process-wide fetcher, creating it on first use.
+
+    Every process has its own fetcher, so pipelines with many workers must
+    split the Earth Engine request quota among them.
+
+    Args:
+        max_requests: This process's share of the concurrent request quota,
+            only used when the fetcher is created.
+
+    Returns: The process-wide fetcher.
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            requests_per_second = REQUESTS_PER_SECOND * max_requests / MAX_REQUESTS
+            _fetcher = Fetcher(max_requests, requests_per_second)
+        return _fetcher
@@ -21,13 +21,18 @@ import flask
 import numpy as np
 import tensorflow as tf
 
-import data  # noqa: I100
+from batching import MicroBatcher  # noqa: I100
+import data
+from responses import make_response
 
 app = flask.Flask(__name__)
 
 # Set this environment variable when deploying the model.
 MODEL = tf.keras.models.load_model(os.environ["MODEL_PATH"])
 
+# Concurrent requests are predicted together in batches.
+BATCHER = MicroBatcher(lambda inputs_batch: MODEL.predict(inputs_batch, verbose=0))
+
 # Initialize Earth Engine as the service starts.
 data.ee_init()
 
@@ -53,8 +58,12 @@ def predict(lon: float, lat: float, year: int) -> flask.Response:
     Optional query parameters:
         patch-size: Size in pixels of the surrounding square patch.
 
+    Optional headers:
+        Accept: application/json (default), application/x-npy,
+            application/x-npz, or application/octet-stream.
+
     Returns:
-        A JSON response with the predictions if successful, or an error otherwise.
+        A response with the predictions if successful, or a JSON error otherwise.
     """
 
     # Optional HTTP request parameters.
@@ -64,12 +73,14 @@ def predict(lon: float, lat: float, year: int) -> flask.Response:
     try:
         # Get predictions from the model.
         inputs = data.get_input_patch(year, (lon, lat), patch_size)
-        inputs_batch = np.stack([inputs])
-        probabilities = MODEL.predict(inputs_batch)[0]
+        probabilities = BATCHER.predict(inputs)
         predictions = probabilities.argmax(axis=-1).astype(np.uint8)
 
-        # Return the model predictions.
-        return {"predictions": predictions.tolist()}
+        # Return the model predictions, the response format depends on
+        # the "Accept" header, JSON by default.
+        return make_response(
+            {"predictions": predictions}, flask.request.accept_mimetypes
+        )
 
     # Anything could go wrong in Python, so we protect the server against
     # any exception and send a valid response with a human-readable error
@@ -0,0 +1,100 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Content negotiation for responses with NumPy arrays.
+
+Clients choose the format with the HTTP "Accept" header, JSON is the default.
+    application/json: {name: nested lists} object.
+    application/x-npy: a single array as a NumPy .npy file.
+    application/x-npz: all the arrays as an uncompressed NumPy .npz file.
+    application/octet-stream: a single array as a raw little-endian buffer,
+        with its shape in the "X-Array-Shape" header, like "128,128,2",
+        and its dtype in the "X-Array-Dtype" header, like "<f4".
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import io
+
+import flask
+import numpy as np
+from werkzeug.datastructures import MIMEAccept
+
+JSON = "application/json"
+NPY = "application/x-npy"
+NPZ = "application/x-npz"
+RAW = "application/octet-stream"
+MIMETYPES = [JSON, NPY, NPZ, RAW]  # JSON first so it's the default
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+def make_response(
+    arrays: dict[str, np.ndarray], accept: MIMEAccept
+) -> flask.Response | tuple[dict, int]:
+    """Creates a response with the arrays in the format the client accepts.
+
+    Args:
+        arrays: Named arrays to send.
+        accept: The request's accepted mimetypes, like `flask.request.accept_mimetypes`.
+
+    Returns: A Flask response, or a JSON error and a 406 status code if the
+        format only supports one array.
+    """
+    mimetype = accept.best_match(MIMETYPES, default=JSON)
+    if mimetype == JSON:
+        return flask.jsonify({name: array.tolist() for name, array in arrays.items()})
+
+    if mimetype == NPZ:
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return flask.Response(buffer.getvalue(), mimetype=NPZ)
+
+    if len(arrays) != 1:
+        names = ", ".join(arrays.keys())
+        return ({"error": f"{mimetype} only supports one array, got: {names}"}, 406)
+    [array] = arrays.values()
+
+    # Make sure the array is contiguous and little-endian, this is a no-op
+    # for arrays that already are, which is the case for most platforms.
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+    if mimetype == NPY:
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(
+            header, np.lib.format.header_data_from_array_1_0(array)
+        )
+        chunks = iter_chunks(array, header.getvalue())
+        return flask.Response(chunks, mimetype=NPY)
+
+    response = flask.Response(iter_chunks(array), mimetype=RAW)
+    response.headers["X-Array-Shape"] = ",".join(str(x) for x in array.shape)
+    response.headers["X-Array-Dtype"] = array.dtype.str
+    return response
+
+
+def iter_chunks(array: np.ndarray, header: bytes = b"") -> Iterator[bytes]:
+    """Streams the array's memory in chunks, without a full copy of the array.
+
+    Args:
+        array: A C-contiguous array.
+        header: Optional bytes to send before the array data.
+
+    Yields: Chunks of bytes.
+    """
+    if header:
+        yield header
+    data = memoryview(array).cast("B")
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i : i + CHUNK_SIZE].tobytes()
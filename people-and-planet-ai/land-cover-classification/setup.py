@@ -20,6 +20,7 @@ setup(
     url="https://github.com/GoogleCloudPlatform/python-docs-samples/tree/main/people-and-planet-ai/land-cover-classification",
     packages=["serving"],
     install_requires=[
+        "aiohttp==3.8.5",
         "apache-beam[gcp]==2.46.0",
         "earthengine-api==0.1.358",
         "tensorflow==2.12.0",
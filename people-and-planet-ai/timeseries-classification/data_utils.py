@@ -88,30 +88,50 @@ def label_data(data: pd.DataFrame, labels: pd.DataFrame) -> pd.DataFrame:
     )
 
 
-def generate_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
-    # Pandas assigns NaN (Not-a-Number) if a value is missing.
-    # If is_fishing equals itself it means it's populated because (NaN != NaN).
-    # For the training data points, we only get points where we have a label.
+def training_windows(data: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Gets the inputs windows and labels for all the labeled points at once.
+
+    The inputs for each point are the past `PADDING` time steps plus the point
+    itself. Instead of slicing the DataFrame for every point, we create a single
+    strided view over the inputs with every window, so no data is copied
+    until we select the labeled points.
+
+    Args:
+        data: Labeled data for a single vessel, sorted by timestamp.
+
+    Returns:
+        A dictionary with arrays of shape (num_points, PADDING + 1, 1) for each
+        input, and an array of shape (num_points, 1, 1) for the labels.
+    """
     padding = trainer.PADDING
-    training_point_indices = (
-        data[padding:].query("is_fishing == is_fishing").index.tolist()
-    )
-    for point_index in training_point_indices:
-        # For the inputs, we grab the past data and the data point itself.
-        inputs = (
-            data.drop(columns=["is_fishing"])
-            .loc[point_index - padding : point_index]
-            .to_dict("list")
-        )
-        # For the outputs, we only grab the label from the data point itself.
-        outputs = (
-            data[["is_fishing"]]
-            .loc[point_index:point_index]
-            .astype("int8")
-            .to_dict("list")
-        )
+    input_names = [name for name in data.columns if name != "is_fishing"]
+    labels = data["is_fishing"].to_numpy()
 
-        yield {
-            name: np.reshape(values, (len(values), 1))
-            for name, values in {**inputs, **outputs}.items()
+    # Pandas assigns NaN (Not-a-Number) if a value is missing.
+    # For the training data points, we only get points where we have a label,
+    # and that have enough past data to fill the padding.
+    (point_indices,) = np.nonzero(~np.isnan(labels[padding:]))
+    if len(data) <= padding or len(point_indices) == 0:
+        return {
+            **{name: np.empty((0, padding + 1, 1)) for name in input_names},
+            "is_fishing": np.empty((0, 1, 1), dtype=np.int8),
         }
+
+    #   [time_steps, features] --> [time_steps - padding, features, padding + 1]
+    values = data[input_names].to_numpy(dtype=np.float64)
+    windows = np.lib.stride_tricks.sliding_window_view(values, padding + 1, axis=0)
+    inputs = windows[point_indices]
+    return {
+        **{name: inputs[:, i, :, None] for i, name in enumerate(input_names)},
+        "is_fishing": labels[point_indices + padding]
+        .astype(np.int8)
+        .reshape(-1, 1, 1),
+    }
+
+
+def generate_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
+    # For the inputs, we grab the past data and the data point itself.
+    # For the outputs, we only grab the label from the data point itself.
+    batch = training_windows(data)
+    for i in range(len(batch["is_fishing"])):
+        yield {name: values[i] for name, values in batch.items()}
@@ -69,6 +69,52 @@ def test_serialize_deserialize() -> None:
         assert set(outputs.keys()) == set(trainer.OUTPUTS_SPEC.keys())
 
 
+@mock.patch.object(trainer, "PADDING", 2)
+def test_training_windows() -> None:
+    data = pd.DataFrame(
+        {
+            "speed": [0.0, 1.0, 2.0, 3.0, 4.0],
+            "is_fishing": [1.0, np.nan, 0.0, np.nan, 1.0],
+        }
+    )
+    windows = data_utils.training_windows(data)
+    assert windows["speed"].shape == (2, 3, 1)
+    assert windows["is_fishing"].shape == (2, 1, 1)
+    np.testing.assert_array_equal(windows["speed"][:, :, 0], [[0, 1, 2], [2, 3, 4]])
+    np.testing.assert_array_equal(windows["is_fishing"][:, 0, 0], [0, 1])
+
+
+@mock.patch.object(trainer, "PADDING", 2)
+def test_streaming_predictor() -> None:
+    class FakeModel:
+        # Sums the speed over each window, so predictions depend on alignment.
+        def predict(self, inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+            speed = inputs["speed"][0, :, 0]
+            windows = np.lib.stride_tricks.sliding_window_view(speed, 3)
+            return {"is_fishing": windows.sum(axis=-1)[None]}
+
+    rng = np.random.default_rng(0)
+    size = 100
+    inputs = {
+        "timestamp": np.sort(1.4e9 + rng.random(size) * 3600 * 30),
+        **{name: rng.random(size) for name in trainer.INPUTS_SPEC.keys()},
+    }
+    expected = predict.predict(FakeModel(), inputs)
+
+    predictor = predict.StreamingPredictor(FakeModel())
+    chunks = np.array_split(np.arange(size), 25)
+    results = pd.concat(
+        [
+            predictor.predict(123, {name: values[i] for name, values in inputs.items()})
+            for i in chunks
+        ]
+    )
+    assert len(results) > 0
+    np.testing.assert_allclose(
+        results["is_fishing"], expected["is_fishing"][: len(results)]
+    )
+
+
 @mock.patch.object(trainer, "PADDING", 2)
 def test_e2e_local() -> None:
     with tempfile.TemporaryDirectory() as temp_dir:
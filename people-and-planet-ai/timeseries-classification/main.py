@@ -154,5 +154,31 @@ def run_predict() -> dict:
         return {"error": f"{type(e).__name__}: {e}"}
 
 
+@app.route("/predict-streaming", methods=["POST"])
+def run_predict_streaming() -> dict:
+    import predict
+
+    try:
+        args = flask.request.get_json() or {}
+        params = {
+            "model_dir": args.get("model_dir", f"{TRAINING_DIR}/model"),
+            "mmsi": int(args["mmsi"]),
+            "inputs": args["inputs"],
+        }
+        predictions = predict.run_streaming(**params)
+
+        return {
+            "method": "predict-streaming",
+            "model_dir": params["model_dir"],
+            "mmsi": params["mmsi"],
+            "input_shapes": {
+                name: np.shape(values) for name, values in params["inputs"].items()
+            },
+            "predictions": predictions,
+        }
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
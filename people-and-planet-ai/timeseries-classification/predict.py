@@ -14,6 +14,11 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
+from dataclasses import dataclass
+import math
+import threading
+import weakref
 
 import numpy as np
 import pandas as pd
@@ -22,7 +27,12 @@ from tensorflow import keras
 import data_utils
 import trainer
 
+# Maximum number of vessels to keep streaming state for.
+MAX_TRACKS = 10000
+
 model: keras.Model | None = None
+streaming_predictor: StreamingPredictor | None = None
+streaming_lock = threading.Lock()
 
 
 def predict(model: keras.Model, inputs: dict[str, np.ndarray]) -> pd.DataFrame:
@@ -47,3 +57,131 @@ def run(model_dir: str, inputs: dict[str, list[float]]) -> dict[str, np.ndarray]
         model = keras.models.load_model(model_dir)
 
     return predict(model, inputs).to_dict("list")
+
+
+@dataclass
+class TrackState:
+    """Streaming state for a single vessel track."""
+
+    # Raw data points still needed to resample the next time steps.
+    points: pd.DataFrame
+    # Index of the first time step of the track.
+    first_step: int
+    # Index of the last time step that was already predicted.
+    last_predicted_step: int
+
+
+class StreamingPredictor:
+    """Incrementally predicts vessel tracks as new data points arrive.
+
+    The model only needs the past `PADDING` time steps for each prediction,
+    so instead of resampling and predicting the whole track on every request,
+    we keep only the raw data points for the last `PADDING` time steps of each
+    vessel. New data points are resampled together with them, and only the new
+    time steps are predicted.
+
+    A time step is only predicted once data points for later time steps arrive,
+    since new data points could still change its resampled values.
+    Data points for each vessel are expected to arrive in chronological order.
+
+    It's safe to use from multiple threads. Requests for the same vessel run
+    one at a time, and requests for different vessels run concurrently.
+    """
+
+    def __init__(self, model: keras.Model, max_tracks: int = MAX_TRACKS) -> None:
+        self.model = model
+        self.max_tracks = max_tracks
+        self.tracks: OrderedDict[int, TrackState] = OrderedDict()
+        # Guards `tracks` and `track_locks`, the per-vessel locks are dropped
+        # as soon as no request is using them.
+        self.lock = threading.Lock()
+        self.track_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def predict(self, mmsi: int, inputs: dict[str, np.ndarray]) -> pd.DataFrame:
+        """Adds new data points to a vessel track and predicts the new time steps.
+
+        Args:
+            mmsi: Vessel identifier.
+            inputs: New raw data points, including their "timestamp" in seconds.
+
+        Returns: The new resampled time steps with their "is_fishing" predictions.
+        """
+        with self.lock:
+            track_lock = self.track_locks.setdefault(mmsi, threading.Lock())
+        with track_lock:
+            return self._predict(mmsi, inputs)
+
+    def _predict(self, mmsi: int, inputs: dict[str, np.ndarray]) -> pd.DataFrame:
+        new_points = pd.DataFrame(inputs)
+        with self.lock:
+            state = self.tracks.pop(mmsi, None)
+        if state is None:
+            first_step = time_step(new_points["timestamp"].min())
+            state = TrackState(new_points, first_step, first_step - 1)
+            points = new_points.sort_values("timestamp", kind="stable")
+        else:
+            points = pd.concat([state.points, new_points]).sort_values(
+                "timestamp", kind="stable"
+            )
+
+        # Resample the kept and new data points, and only predict the completed
+        # time steps that have enough past time steps to fill the padding.
+        # The latest time step with data is still open, and so are any
+        # missing time steps before it since they are interpolated from it.
+        data = data_utils.with_fixed_time_steps(points.to_dict("list"))
+        steps = points["timestamp"].map(time_step).to_numpy()
+        data_first_step = steps[0]
+        closed_steps = steps[steps < steps[-1]]
+        last_step = closed_steps[-1] if len(closed_steps) > 0 else data_first_step - 1
+        start_step = max(
+            state.last_predicted_step + 1, state.first_step + trainer.PADDING
+        )
+        if start_step <= last_step:
+            start = start_step - data_first_step - trainer.PADDING
+            end = last_step - data_first_step + 1
+            window = data[start:end]
+            inputs_batch = {
+                name: np.reshape(window[name].to_numpy(), (1, len(window), 1))
+                for name in trainer.INPUTS_SPEC.keys()
+            }
+            predictions = self.model.predict(inputs_batch)
+            result = window[trainer.PADDING :].assign(
+                is_fishing=predictions["is_fishing"][0]
+            )
+            state.last_predicted_step = int(last_step)
+        else:
+            result = data[:0].assign(is_fishing=[])
+
+        # Keep the data points for the time steps the next prediction needs,
+        # plus the time step before them to interpolate any missing time steps.
+        keep_from_step = state.last_predicted_step + 1 - trainer.PADDING
+        previous_steps = steps[steps < keep_from_step]
+        if len(previous_steps) > 0:
+            keep_from_step = previous_steps[-1]
+        state.points = points[steps >= keep_from_step]
+
+        with self.lock:
+            self.tracks[mmsi] = state
+            while len(self.tracks) > self.max_tracks:
+                self.tracks.popitem(last=False)
+        return result
+
+
+def time_step(timestamp: float) -> int:
+    """Gets the index of the time step a Unix timestamp falls into."""
+    return math.floor(timestamp / data_utils.TIME_STEP_INTERVAL.total_seconds())
+
+
+def run_streaming(
+    model_dir: str, mmsi: int, inputs: dict[str, list[float]]
+) -> dict[str, np.ndarray]:
+    # Cache the model and streaming state so they persist across requests,
+    # the server handles requests in multiple threads.
+    global model, streaming_predictor
+    with streaming_lock:
+        if model is None:
+            model = keras.models.load_model(model_dir)
+        if streaming_predictor is None:
+            streaming_predictor = StreamingPredictor(model)
+
+    return streaming_predictor.predict(mmsi, inputs).to_dict("list")
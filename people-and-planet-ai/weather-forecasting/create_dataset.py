@@ -16,23 +16,29 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterator
+import asyncio
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta
+import json
 import logging
+import math
 import random
 import uuid
 
+import aiohttp
 import apache_beam as beam
 from apache_beam.io.filesystems import FileSystems
 from apache_beam.options.pipeline_options import PipelineOptions
 import ee
 import numpy as np
-import requests
 
 # Default values.
 NUM_DATES = 100
 MAX_REQUESTS = 20  # default EE request quota
+MAX_REQUESTS_PER_WORKER = 5  # concurrent requests from each worker
 MIN_BATCH_SIZE = 100
+SHARD_SIZE = 1024  # examples per shard for the "shards" data format
+DATA_FORMATS = ["npz", "shards"]
 
 # Constants.
 NUM_BINS = 10
@@ -108,21 +114,76 @@ def get_training_example(
     """
     from weather import data
 
-    return (
-        data.get_inputs_patch(date, point, patch_size),
-        data.get_labels_patch(date, point, patch_size),
-    )
+    async def get_patches() -> list[np.ndarray]:
+        # Fetch the inputs and labels concurrently through the shared rate limiter.
+        return await asyncio.gather(
+            data.get_inputs_patch_async(date, point, patch_size),
+            data.get_labels_patch_async(date, point, patch_size),
+        )
+
+    (inputs, labels) = data.get_fetcher().run(get_patches())
+    return (inputs, labels)
 
 
 def try_get_example(date: datetime, point: tuple) -> Iterator[tuple]:
     """Wrapper over `get_training_examples` that allows it to simply log errors instead of crashing."""
     try:
         yield get_training_example(date, point)
-    except (requests.exceptions.HTTPError, ee.ee_exception.EEException) as e:
+    except (
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+        ee.ee_exception.EEException,
+    ) as e:
         logging.error(f"🛑 failed to get example: {date} {point}")
         logging.exception(e)
 
 
+def get_training_examples(
+    date: datetime, points: list[tuple], patch_size: int = PATCH_SIZE
+) -> list[tuple]:
+    """Gets (inputs, labels) training examples for many points on the same date.
+
+    Nearby points are fetched together from Earth Engine in shared tiles.
+
+    Args:
+        date: The date of interest.
+        points: A list of (longitude, latitude) coordinates.
+        patch_size: Size in pixels of the surrounding square patch.
+
+    Returns: A list of (inputs, labels) pairs of NumPy arrays.
+    """
+    from weather import data
+
+    inputs = data.get_inputs_patches(date, points, patch_size)
+    labels = data.get_labels_patches(date, points, patch_size)
+    return list(zip(inputs, labels))
+
+
+def try_get_examples(
+    iso_date: str,
+    points: Iterable[tuple],
+    max_requests: int = MAX_REQUESTS_PER_WORKER,
+) -> Iterator[tuple]:
+    """Wrapper over `get_training_examples` that falls back to one point at a time on errors."""
+    from weather import data
+
+    # Each worker only uses its own share of the Earth Engine request quota.
+    data.get_fetcher(max_requests)
+    date = datetime.fromisoformat(iso_date)
+    points = list(points)
+    try:
+        yield from get_training_examples(date, points)
+    except (
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+        ee.ee_exception.EEException,
+    ) as e:
+        logging.error(f"🛑 failed to get examples: {date} {len(points)} points")
+        logging.exception(e)
+        for point in points:
+            yield from try_get_example(date, point)
+
+
 def write_npz(batch: list[tuple[np.ndarray, np.ndarray]], data_path: str) -> str:
     """Writes an (inputs, labels) batch into a compressed NumPy file.
 
@@ -141,19 +202,102 @@ def write_npz(batch: list[tuple[np.ndarray, np.ndarray]], data_path: str) -> str
     return filename
 
 
+def write_shard(inputs: np.ndarray, labels: np.ndarray, data_path: str) -> str:
+    """Writes a shard of examples in a columnar format that can be memory-mapped.
+
+    Each column is written as its own uncompressed NumPy file, with all the
+    examples stacked along the first axis. A small JSON index file is written
+    last, so readers only ever see complete shards.
+
+        <data_path>/<shard>.inputs.npy  [num_examples, height, width, bands]
+        <data_path>/<shard>.labels.npy  [num_examples, height, width, bands]
+        <data_path>/<shard>.json        {"num_examples": int, "columns": {...}}
+
+    Args:
+        inputs: Stacked inputs of all the examples in the shard.
+        labels: Stacked labels of all the examples in the shard.
+        data_path: Directory path to save files to.
+
+    Returns: The filename of the shard index file.
+    """
+    shard = FileSystems.join(data_path, str(uuid.uuid4()))
+    columns = {"inputs": inputs, "labels": labels}
+    for name, values in columns.items():
+        with FileSystems.create(f"{shard}.{name}.npy") as f:
+            np.lib.format.write_array(f, values, allow_pickle=False)
+
+    index = {
+        "num_examples": len(inputs),
+        "columns": {
+            name: {"shape": values.shape[1:], "dtype": values.dtype.str}
+            for name, values in columns.items()
+        },
+    }
+    filename = f"{shard}.json"
+    with FileSystems.create(filename) as f:
+        f.write(json.dumps(index).encode("utf-8"))
+    logging.info(filename)
+    return filename
+
+
+class WriteShards(beam.DoFn):
+    """Writes examples into fixed-size shards as they arrive.
+
+    Examples are preallocated into contiguous column buffers, so only
+    a single shard is kept in memory at any time per worker thread.
+    """
+
+    def __init__(self, data_path: str, shard_size: int = SHARD_SIZE) -> None:
+        self.data_path = data_path
+        self.shard_size = shard_size
+
+    def start_bundle(self) -> None:
+        self.inputs: np.ndarray | None = None
+        self.labels: np.ndarray | None = None
+        self.size = 0
+
+    def process(self, example: tuple[np.ndarray, np.ndarray]) -> Iterator[str]:
+        inputs, labels = example
+        if self.inputs is None or self.labels is None:
+            self.inputs = np.empty((self.shard_size, *inputs.shape), inputs.dtype)
+            self.labels = np.empty((self.shard_size, *labels.shape), labels.dtype)
+        self.inputs[self.size] = inputs
+        self.labels[self.size] = labels
+        self.size += 1
+        if self.size == self.shard_size:
+            yield self.flush()
+
+    def finish_bundle(self) -> Iterator[beam.utils.windowed_value.WindowedValue]:
+        if self.size > 0:
+            yield beam.transforms.window.GlobalWindows.windowed_value(self.flush())
+
+    def flush(self) -> str:
+        assert self.inputs is not None and self.labels is not None
+        filename = write_shard(
+            self.inputs[: self.size], self.labels[: self.size], self.data_path
+        )
+        self.size = 0
+        return filename
+
+
 def run(
     data_path: str,
     num_dates: int = NUM_DATES,
     num_bins: int = NUM_BINS,
     max_requests: int = MAX_REQUESTS,
     min_batch_size: int = MIN_BATCH_SIZE,
+    data_format: str = "npz",
+    shard_size: int = SHARD_SIZE,
     beam_args: list[str] | None = None,
 ) -> None:
     """Runs an Apache Beam pipeline to create a dataset.
 
-    This fetches data from Earth Engine and writes compressed NumPy files.
+    This fetches data from Earth Engine and writes compressed NumPy files,
+    or uncompressed columnar shards that can be memory-mapped for training.
     We use `max_requests` to limit the number of concurrent requests to Earth Engine
     to avoid quota issues. You can request for an increas of quota if you need it.
+    The requests are split among the workers, each worker makes at most
+    `MAX_REQUESTS_PER_WORKER` concurrent requests.
 
     Args:
         data_path: Directory path to save the data files.
@@ -161,28 +305,49 @@ def run(
         num_bins: Number of bins to bucketize values.
         max_requests: Limit the number of concurrent requests to Earth Engine.
         min_batch_size: Minimum number of examples to write per data file.
+        data_format: Either "npz" for compressed NumPy files, or "shards".
+        shard_size: Number of examples per shard for the "shards" data format.
         beam_args: Apache Beam command line arguments to parse as pipeline options.
     """
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"data_format must be one of {DATA_FORMATS}: {data_format}")
+
     random_dates = [
         START_DATE + (END_DATE - START_DATE) * random.random() for _ in range(num_dates)
     ]
 
+    # Every worker process has its own rate limiter, so split the quota among them.
+    num_workers = math.ceil(max_requests / MAX_REQUESTS_PER_WORKER)
+    worker_requests = max(max_requests // num_workers, 1)
+
     beam_options = PipelineOptions(
         beam_args,
         save_main_session=True,
-        direct_num_workers=max(max_requests, MAX_REQUESTS),  # direct runner
-        max_num_workers=max_requests,  # distributed runners
+        direct_num_workers=num_workers,  # direct runner
+        max_num_workers=num_workers,  # distributed runners
     )
     with beam.Pipeline(options=beam_options) as pipeline:
-        (
+        examples = (
             pipeline
             | "📆 Random dates" >> beam.Create(random_dates)
             | "📌 Sample points" >> beam.FlatMap(sample_points, num_bins)
-            | "🃏 Reshuffle" >> beam.Reshuffle()
-            | "📑 Get example" >> beam.FlatMapTuple(try_get_example)
-            | "🗂️ Batch examples" >> beam.BatchElements(min_batch_size)
-            | "📝 Write NPZ files" >> beam.Map(write_npz, data_path)
+            # Dates are keyed as strings since GroupByKey needs deterministic keys.
+            | "🔑 Key by date"
+            >> beam.MapTuple(lambda date, point: (date.isoformat(), point))
+            | "🗂️ Group points by date" >> beam.GroupByKey()
+            | "📑 Get examples" >> beam.FlatMapTuple(try_get_examples, worker_requests)
         )
+        if data_format == "shards":
+            (
+                examples
+                | "📝 Write shards" >> beam.ParDo(WriteShards(data_path, shard_size))
+            )
+        else:
+            (
+                examples
+                | "🗂️ Batch examples" >> beam.BatchElements(min_batch_size)
+                | "📝 Write NPZ files" >> beam.Map(write_npz, data_path)
+            )
 
 
 def main() -> None:
@@ -220,6 +385,18 @@ def main() -> None:
         default=MIN_BATCH_SIZE,
         help="Minimum number of examples to write per data file.",
     )
+    parser.add_argument(
+        "--data-format",
+        choices=DATA_FORMATS,
+        default="npz",
+        help="Write compressed NumPy files, or uncompressed columnar shards.",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=SHARD_SIZE,
+        help="Number of examples per shard for the shards data format.",
+    )
     args, beam_args = parser.parse_known_args()
 
     run(
@@ -228,6 +405,8 @@ def main() -> None:
         num_bins=args.num_bins,
         max_requests=args.max_requests,
         min_batch_size=args.min_batch_size,
+        data_format=args.data_format,
+        shard_size=args.shard_size,
         beam_args=beam_args,
     )
 
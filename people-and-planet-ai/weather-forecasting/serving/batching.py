@@ -0,0 +1,102 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Dynamic micro-batching for model predictions.
+
+Models are much more efficient predicting batches than single examples,
+so concurrent requests are queued for a few milliseconds and predicted together.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import Future
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Default values, override them with environment variables.
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 64))
+MAX_WAIT_SECONDS = float(os.environ.get("MAX_WAIT_MS", 5)) / 1000
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into batches.
+
+    Requests are grouped into buckets by their inputs shape, like the patch size,
+    so every bucket can be stacked into a single batch without any padding.
+    Each bucket is predicted with a single call to `predict_batch`,
+    and the results are sent back to each request.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_seconds: float = MAX_WAIT_SECONDS,
+    ) -> None:
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.requests: queue.Queue[tuple[np.ndarray, Future]] = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        """Predicts a single request, batched with any other concurrent requests.
+
+        Args:
+            inputs: Inputs for a single example, without the batch dimension.
+
+        Returns: The predictions for the example.
+        """
+        future: Future = Future()
+        self.requests.put((np.asarray(inputs), future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            # Wait for the first request, and then wait a little longer for more.
+            requests = [self.requests.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(requests) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    requests.append(self.requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            buckets: dict[tuple, list[tuple[np.ndarray, Future]]] = {}
+            for inputs, future in requests:
+                buckets.setdefault(inputs.shape, []).append((inputs, future))
+            for bucket in buckets.values():
+                self._predict_bucket(bucket)
+
+    def _predict_bucket(self, bucket: list[tuple[np.ndarray, Future]]) -> None:
+        try:
+            predictions = self.predict_batch(np.stack([x for (x, _) in bucket]))
+            if len(predictions) != len(bucket):
+                raise ValueError(
+                    f"Expected {len(bucket)} predictions, got {len(predictions)}"
+                )
+            for (_, future), prediction in zip(bucket, predictions):
+                future.set_result(prediction)
+        except Exception as e:
+            for _, future in bucket:
+                if not future.done():
+                    future.set_exception(e)
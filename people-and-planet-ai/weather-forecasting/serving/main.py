@@ -12,17 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import annotations
+
 from datetime import datetime
 import os
 
-from flask import Flask, request
-
+from flask import Flask, request, Response
 from weather.data import get_inputs_patch
 from weather.model import WeatherModel
 
+from batching import MicroBatcher
+from responses import make_response
+
 app = Flask(__name__)
 
-MODEL = WeatherModel.from_pretrained("model")
+MODEL = WeatherModel.from_pretrained("model").prepare_for_inference()
+
+# Concurrent requests are predicted together in batches.
+BATCHER = MicroBatcher(MODEL.predict_batch)
 
 
 def to_bool(x: str) -> bool:
@@ -39,19 +46,22 @@ def ping() -> dict:
 
 
 @app.route("/predict/<iso_date>/<float(signed=True):lat>,<float(signed=True):lon>")
-def predict(iso_date: str, lat: float, lon: float) -> dict:
+def predict(iso_date: str, lat: float, lon: float) -> Response | tuple[dict, int]:
     # Optional HTTP request parameters.
     #   https://en.wikipedia.org/wiki/Query_string
     patch_size = request.args.get("patch-size", 128, type=int)
     include_inputs = request.args.get("include-inputs", False, type=to_bool)
 
     date = datetime.fromisoformat(iso_date)
-    inputs = get_inputs_patch(date, (lon, lat), patch_size).tolist()
-    predictions = MODEL.predict(inputs).tolist()
+    inputs = get_inputs_patch(date, (lon, lat), patch_size)
+    predictions = BATCHER.predict(inputs)
 
+    # The response format depends on the "Accept" header, JSON by default.
     if include_inputs:
-        return {"inputs": inputs, "predictions": predictions}
-    return {"predictions": predictions}
+        arrays = {"inputs": inputs, "predictions": predictions}
+    else:
+        arrays = {"predictions": predictions}
+    return make_response(arrays, request.accept_mimetypes)
 
 
 if __name__ == "__main__":
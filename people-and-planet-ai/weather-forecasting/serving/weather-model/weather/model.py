@@ -16,9 +16,11 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+import threading
 from typing import Any as AnyType
 
-from datasets.arrow_dataset import Dataset
 import numpy as np
 import torch
 from transformers import PretrainedConfig, PreTrainedModel
@@ -81,6 +83,7 @@ class WeatherModel(PreTrainedModel):
             torch.nn.Linear(config.num_hidden2, config.num_outputs),
             torch.nn.ReLU(),  # precipitation cannot be negative
         )
+        self.inference: InferenceState | None = None
 
     def forward(
         self, inputs: torch.Tensor, labels: torch.Tensor | None = None
@@ -110,29 +113,116 @@ class WeatherModel(PreTrainedModel):
         return {"loss": loss, "logits": predictions}
 
     @staticmethod
-    def create(inputs: Dataset, **kwargs: AnyType) -> WeatherModel:
+    def create(inputs: Iterable[AnyType], **kwargs: AnyType) -> WeatherModel:
         """Creates a new WeatherModel calculating the
-        mean and standard deviation from a dataset."""
-        data = np.array(inputs, np.float32)
-        mean = data.mean(axis=(0, 1, 2))[None, None, None, :]
-        std = data.std(axis=(0, 1, 2))[None, None, None, :]
-        config = WeatherConfig(mean.tolist(), std.tolist(), **kwargs)
+        mean and standard deviation from a dataset.
+
+        The inputs can be any iterable of examples or batches of examples,
+        they're only read once and never loaded into memory all at once.
+        """
+        mean, std = mean_std(inputs)
+        config = WeatherConfig(
+            mean[None, None, None, :].tolist(),
+            std[None, None, None, :].tolist(),
+            **kwargs,
+        )
         return WeatherModel(config)
 
+    def prepare_for_inference(
+        self, device: str | None = None, torchscript: bool = False
+    ) -> WeatherModel:
+        """Prepares the model for fast repeated predictions.
+
+        This moves the model to the device and sets it to evaluation mode once,
+        instead of on every `predict_batch` call.
+
+        Args:
+            device: Device to run predictions on, defaults to a GPU if available.
+            torchscript: Whether or not to compile the model with TorchScript.
+
+        Returns: The model itself.
+        """
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.to(device).eval()
+        layers = self.layers
+        if torchscript:
+            layers = torch.jit.optimize_for_inference(torch.jit.script(layers))
+        self.inference = InferenceState(torch.device(device), layers)
+        return self
+
     def predict(self, inputs: AnyType) -> np.ndarray:
         """Predicts a single request."""
-        return self.predict_batch(torch.as_tensor([inputs]))[0]
+        return self.predict_batch(np.asarray(inputs)[None])[0]
 
     def predict_batch(self, inputs_batch: AnyType) -> np.ndarray:
-        """Predicts a batch of requests."""
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        model = self.to(device)
-        with torch.no_grad():
-            outputs = model(torch.as_tensor(inputs_batch, device=device))
-            predictions = outputs["logits"]
+        """Predicts a batch of requests.
+
+        NumPy float32 arrays are used directly without copying on CPU.
+        On GPU, they're copied through a reusable pinned memory buffer
+        for each batch shape to make the transfer asynchronous.
+        """
+        if self.inference is None:
+            self.prepare_for_inference()
+        assert self.inference is not None
+
+        inputs = torch.from_numpy(np.ascontiguousarray(inputs_batch, np.float32))
+        with self.inference.lock, torch.inference_mode():
+            if self.inference.device.type == "cuda":
+                buffer = self.inference.pinned_buffers.get(inputs.shape)
+                if buffer is None:
+                    buffer = torch.empty(inputs.shape, dtype=inputs.dtype).pin_memory()
+                    self.inference.pinned_buffers[inputs.shape] = buffer
+                buffer.copy_(inputs)
+                inputs = buffer.to(self.inference.device, non_blocking=True)
+
+            predictions = self.inference.layers(inputs)
             return predictions.cpu().numpy()
 
 
+@dataclass
+class InferenceState:
+    """Device and layers prepared for predictions, see `prepare_for_inference`."""
+
+    device: torch.device
+    layers: torch.nn.Module
+    pinned_buffers: dict[torch.Size, torch.Tensor] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def mean_std(batches: Iterable[AnyType]) -> tuple[np.ndarray, np.ndarray]:
+    """Calculates the mean and standard deviation of every channel in a single pass.
+
+    This merges the statistics of each batch as they come with the
+    parallel variant of Welford's algorithm, so it works on datasets
+    larger than memory. For more information:
+        https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
+
+    Args:
+        batches: Iterable of arrays with channels as the last dimension.
+
+    Returns: A (mean, std) pair with one value per channel.
+    """
+    count = 0
+    mean = np.zeros(0)
+    m2 = np.zeros(0)
+    for batch in batches:
+        values = np.asarray(batch, np.float64)
+        values = values.reshape(-1, values.shape[-1])
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        if count == 0:
+            count, mean, m2 = (len(values), batch_mean, batch_m2)
+            continue
+        total = count + len(values)
+        delta = batch_mean - mean
+        mean = mean + delta * len(values) / total
+        m2 = m2 + batch_m2 + delta**2 * count * len(values) / total
+        count = total
+    std = np.sqrt(m2 / max(count, 1))
+    return (mean.astype(np.float32), std.astype(np.float32))
+
+
 class Normalization(torch.nn.Module):
     """Preprocessing normalization layer with z-score."""
 
@@ -16,21 +16,25 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from glob import glob
+import json
 import os
+import random
 
 from datasets.arrow_dataset import Dataset
 from datasets.dataset_dict import DatasetDict
 import numpy as np
+import torch
 from transformers import Trainer, TrainingArguments
 
 from weather.model import WeatherModel
 
-
 # Default values.
 EPOCHS = 100
 BATCH_SIZE = 512
 TRAIN_TEST_RATIO = 0.9
+STATS_BATCH_SIZE = 4096  # examples to read at once for the mean and std
 
 # Constants.
 NUM_DATASET_READ_PROC = 16  # number of processes to read data files in parallel
@@ -61,27 +65,112 @@ def read_dataset(data_path: str, train_test_ratio: float) -> DatasetDict:
     return dataset.train_test_split(train_size=train_test_ratio, shuffle=True)
 
 
-def augmented(dataset: Dataset) -> Dataset:
-    """Augments dataset by rotating and flipping the examples."""
-
-    def augment(values: list) -> np.ndarray:
-        transformed = [
-            np.rot90(values, 0, (1, 2)),
-            np.rot90(values, 1, (1, 2)),
-            np.rot90(values, 2, (1, 2)),
-            np.rot90(values, 3, (1, 2)),
-            np.flip(np.rot90(values, 0, (1, 2)), axis=1),
-            np.flip(np.rot90(values, 1, (1, 2)), axis=1),
-            np.flip(np.rot90(values, 2, (1, 2)), axis=1),
-            np.flip(np.rot90(values, 3, (1, 2)), axis=1),
-        ]
-        return np.concatenate(transformed)
-
-    return dataset.map(
-        lambda batch: {key: augment(values) for key, values in batch.items()},
-        batched=True,
-        num_proc=NUM_DATASET_PROC,
-    )
+class ShardedDataset(torch.utils.data.Dataset):
+    """Memory-mapped dataset from the columnar shards written by `create_dataset.py`.
+
+    Examples are read from disk only when accessed, so datasets can be
+    larger than the host memory.
+    """
+
+    def __init__(self, data_path: str) -> None:
+        self.shards = []
+        sizes = []
+        for index_file in sorted(glob(os.path.join(data_path, "*.json"))):
+            with open(index_file) as f:
+                index = json.load(f)
+            prefix = index_file.removesuffix(".json")
+            self.shards.append(
+                {name: f"{prefix}.{name}.npy" for name in index["columns"]}
+            )
+            sizes.append(index["num_examples"])
+        self.offsets = np.cumsum([0] + sizes)
+        self.columns: dict[int, dict[str, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getitem__(self, i: int) -> dict[str, np.ndarray]:
+        shard = int(np.searchsorted(self.offsets, i, side="right")) - 1
+        columns = self.shard_columns(shard)
+        offset = i - self.offsets[shard]
+        return {name: np.asarray(values[offset]) for name, values in columns.items()}
+
+    def shard_columns(self, shard: int) -> dict[str, np.ndarray]:
+        """Opens the memory-mapped columns of a shard on first use."""
+        if shard not in self.columns:
+            self.columns[shard] = {
+                name: np.load(filename, mmap_mode="r")
+                for name, filename in self.shards[shard].items()
+            }
+        return self.columns[shard]
+
+    def __getstate__(self) -> dict:
+        # Data loader workers open their own memory maps instead of copying them.
+        return {**self.__dict__, "columns": {}}
+
+
+def read_shards(
+    data_path: str, train_test_ratio: float
+) -> dict[str, torch.utils.data.Dataset]:
+    """Reads columnar shards into memory-mapped train/test splits."""
+    dataset = ShardedDataset(data_path)
+    indices = list(range(len(dataset)))
+    random.shuffle(indices)
+    train_size = int(len(indices) * train_test_ratio)
+    return {
+        "train": torch.utils.data.Subset(dataset, indices[:train_size]),
+        "test": torch.utils.data.Subset(dataset, indices[train_size:]),
+    }
+
+
+class AugmentedDataset(torch.utils.data.Dataset):
+    """Augments a dataset on the fly by rotating and flipping the examples.
+
+    Every time an example is read, one of its 8 rotations and flips is chosen
+    at random, so the augmented examples are never all in memory at once.
+    """
+
+    def __init__(self, dataset: torch.utils.data.Dataset) -> None:
+        self.dataset = dataset
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def __getitem__(self, i: int) -> dict[str, np.ndarray]:
+        rotations = random.randrange(4)
+        flip = random.random() < 0.5
+        example = self.dataset[i]
+        return {
+            key: augment(np.asarray(values), rotations, flip)
+            for key, values in example.items()
+        }
+
+
+def augment(values: np.ndarray, rotations: int, flip: bool) -> np.ndarray:
+    """Rotates and optionally flips a single (height, width, channels) example."""
+    values = np.rot90(values, rotations, (0, 1))
+    if flip:
+        values = np.flip(values, axis=0)
+    return np.ascontiguousarray(values, np.float32)
+
+
+def augmented(dataset: Dataset) -> torch.utils.data.Dataset:
+    """Augments dataset by rotating and flipping the examples on the fly."""
+    if isinstance(dataset, Dataset):
+        dataset = dataset.with_format("numpy")
+    return AugmentedDataset(dataset)
+
+
+def iter_inputs(
+    dataset: torch.utils.data.Dataset, batch_size: int = STATS_BATCH_SIZE
+) -> Iterator[np.ndarray]:
+    """Reads the inputs of a dataset in batches, without loading them all at once."""
+    for start in range(0, len(dataset), batch_size):
+        end = min(start + batch_size, len(dataset))
+        if isinstance(dataset, Dataset):
+            yield dataset.with_format("numpy")[start:end]["inputs"]
+        else:
+            yield np.stack([dataset[i]["inputs"] for i in range(start, end)])
 
 
 def run(
@@ -110,10 +199,14 @@ def run(
     print(f"train_test_ratio: {train_test_ratio}")
     print("-" * 40)
 
-    dataset = read_dataset(data_path, train_test_ratio)
+    # Columnar shards are memory-mapped, NPZ files are loaded into memory.
+    if glob(os.path.join(data_path, "*.json")):
+        dataset = read_shards(data_path, train_test_ratio)
+    else:
+        dataset = read_dataset(data_path, train_test_ratio)
     print(dataset)
 
-    model = WeatherModel.create(dataset["train"]["inputs"])
+    model = WeatherModel.create(iter_inputs(dataset["train"]))
     print(model.config)
     print(model)
 
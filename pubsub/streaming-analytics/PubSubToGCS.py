@@ -15,6 +15,8 @@
 # [START pubsub_to_gcs]
 import argparse
 from datetime import datetime
+import gzip
+import hashlib
 import logging
 import random
 
@@ -88,23 +90,134 @@ class WriteToGCS(DoFn):
                 f.write(f"{message_body},{publish_time}\n".encode())
 
 
-def run(input_topic, output_path, window_size=1.0, num_shards=5, pipeline_args=None):
+class WriteCompressedToGCS(DoFn):
+    """Streams windowed messages into compressed files in Google Cloud Storage.
+
+    This runs before any grouping, so messages are written as they arrive and no
+    window has to fit in memory. Each bundle keeps one open file per window and
+    starts a new one every `max_file_bytes` uncompressed bytes or
+    `max_file_records` messages. Files are named after the window and a hash of
+    their first message, so a retried bundle rewrites the same objects instead of
+    duplicating data. An object only becomes visible once its upload completes.
+    """
+
+    EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+    def __init__(
+        self,
+        output_path,
+        compression="gzip",
+        max_file_bytes=64 * 1024 * 1024,
+        max_file_records=1000000,
+    ):
+        if compression not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.output_path = output_path
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        self.max_file_records = max_file_records
+
+    def setup(self):
+        # Reuse a single client for all the files written by this DoFn.
+        self.gcs = io.gcsio.GcsIO()
+
+    def start_bundle(self):
+        # Open files for this bundle, by window.
+        self.files = {}
+
+    def compress(self, f):
+        """Wraps a file object to compress everything written to it."""
+        if self.compression == "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor().stream_writer(f, closefd=False)
+        # A fixed mtime makes the file contents deterministic on retries.
+        return gzip.GzipFile(fileobj=f, mode="wb", mtime=0)
+
+    def open_file(self, window, first_line):
+        """Opens a new file for a window, named after its first message."""
+        ts_format = "%H:%M"
+        window_start = window.start.to_utc_datetime().strftime(ts_format)
+        window_end = window.end.to_utc_datetime().strftime(ts_format)
+        shard_id = hashlib.sha256(first_line).hexdigest()[:16]
+        extension = self.EXTENSIONS[self.compression]
+        filename = "-".join([self.output_path, window_start, window_end, shard_id])
+
+        f = self.gcs.open(filename=f"{filename}.{extension}", mode="w")
+        return {"file": f, "writer": self.compress(f), "bytes": 0, "records": 0}
+
+    def close_file(self, window):
+        """Finishes the compressed stream and uploads the file."""
+        state = self.files.pop(window)
+        state["writer"].close()
+        state["file"].close()
+
+    def process(self, element, window=DoFn.WindowParam):
+        """Write a message to the current file of its window."""
+        message_body, publish_time = element
+        line = f"{message_body},{publish_time}\n".encode()
+        if window not in self.files:
+            self.files[window] = self.open_file(window, line)
+
+        state = self.files[window]
+        state["writer"].write(line)
+        state["bytes"] += len(line)
+        state["records"] += 1
+        if (
+            state["bytes"] >= self.max_file_bytes
+            or state["records"] >= self.max_file_records
+        ):
+            self.close_file(window)
+
+    def finish_bundle(self):
+        for window in list(self.files):
+            self.close_file(window)
+
+
+def run(
+    input_topic,
+    output_path,
+    window_size=1.0,
+    num_shards=5,
+    pipeline_args=None,
+    compression=None,
+    max_file_bytes=64 * 1024 * 1024,
+    max_file_records=1000000,
+):
     # Set `save_main_session` to True so DoFns can access globally imported modules.
     pipeline_options = PipelineOptions(
         pipeline_args, streaming=True, save_main_session=True
     )
 
     with Pipeline(options=pipeline_options) as pipeline:
-        (
+        messages = (
             pipeline
             # Because `timestamp_attribute` is unspecified in `ReadFromPubSub`, Beam
             # binds the publish time returned by the Pub/Sub server for each message
             # to the element's timestamp parameter, accessible via `DoFn.TimestampParam`.
             # https://beam.apache.org/releases/pydoc/current/apache_beam.io.gcp.pubsub.html#apache_beam.io.gcp.pubsub.ReadFromPubSub
             | "Read from Pub/Sub" >> io.ReadFromPubSub(topic=input_topic)
-            | "Window into" >> GroupMessagesByFixedWindows(window_size, num_shards)
-            | "Write to GCS" >> ParDo(WriteToGCS(output_path))
         )
+        if compression:
+            (
+                messages
+                # Write each message as it arrives, without grouping the window.
+                | "Window into fixed intervals"
+                >> WindowInto(FixedWindows(int(window_size * 60)))
+                | "Add timestamp to windowed elements" >> ParDo(AddTimestamp())
+                | "Write to GCS"
+                >> ParDo(
+                    WriteCompressedToGCS(
+                        output_path, compression, max_file_bytes, max_file_records
+                    )
+                )
+            )
+        else:
+            (
+                messages
+                | "Window into" >> GroupMessagesByFixedWindows(window_size, num_shards)
+                | "Write to GCS" >> ParDo(WriteToGCS(output_path))
+            )
 
 
 if __name__ == "__main__":
@@ -130,7 +243,25 @@ if __name__ == "__main__":
         "--num_shards",
         type=int,
         default=5,
-        help="Number of shards to use when writing windowed elements to GCS.",
+        help="Number of shards to use when writing windowed elements to GCS. "
+        "Unused with --compression.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd"],
+        help="Stream messages into compressed files, zstd requires `zstandard`.",
+    )
+    parser.add_argument(
+        "--max_file_bytes",
+        type=int,
+        default=64 * 1024 * 1024,
+        help="Start a new compressed file after this many uncompressed bytes.",
+    )
+    parser.add_argument(
+        "--max_file_records",
+        type=int,
+        default=1000000,
+        help="Start a new compressed file after this many messages.",
     )
     known_args, pipeline_args = parser.parse_known_args()
 
@@ -140,5 +271,8 @@ if __name__ == "__main__":
         known_args.window_size,
         known_args.num_shards,
         pipeline_args,
+        known_args.compression,
+        known_args.max_file_bytes,
+        known_args.max_file_records,
     )
 # [END pubsub_to_gcs]
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
 import os
 from unittest import mock
 import uuid
@@ -66,3 +67,47 @@ def test_pubsub_to_gcs():
 
     # Clean up.
     gcs_client.delete_batch(list(files))
+
+
+@mock.patch("apache_beam.Pipeline", TestPipeline)
+@mock.patch(
+    "apache_beam.io.ReadFromPubSub",
+    lambda topic: (
+        TestStream()
+        .advance_watermark_to(0)
+        .add_elements([TimestampedValue(b"a", 1575937195)])
+        .add_elements([TimestampedValue(b"b", 1575937196)])
+        .add_elements([TimestampedValue(b"c", 1575937197)])
+        .advance_watermark_to_infinity()
+    ),
+)
+def test_pubsub_to_gcs_compressed():
+    PubSubToGCS.run(
+        input_topic="unused",  # mocked by TestStream
+        output_path=f"gs://{BUCKET}/pubsub/{UUID}-compressed/output",
+        window_size=1,  # 1 minute
+        num_shards=1,
+        pipeline_args=[
+            "--project",
+            PROJECT,
+            "--temp_location",
+            TempDir().get_path(),
+        ],
+        compression="gzip",
+        max_file_records=2,
+    )
+
+    # Check that every message was written, at most two per file.
+    gcs_client = GcsIO()
+    files = gcs_client.list_prefix(f"gs://{BUCKET}/pubsub/{UUID}-compressed")
+    messages = []
+    for name in files:
+        assert name.endswith(".gz")
+        with gcs_client.open(name) as f:
+            lines = gzip.decompress(f.read()).decode().splitlines()
+        assert 0 < len(lines) <= 2
+        messages += [line.split(",")[0] for line in lines]
+    assert sorted(messages) == ["a", "b", "c"]
+
+    # Clean up.
+    gcs_client.delete_batch(list(files))